@@ -3,12 +3,18 @@ from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from dotenv import load_dotenv
 import logging
 
-from heimdal_data.api.routes import router as data_router, initialize_collectors, fetch_data_task
+from heimdal_data.api.routes import router as data_router, initialize_collectors, close_collectors, fetch_data_task
 from heimdal_data.api.routes_auth import router as auth_router
-from heimdal_data.database.database import init_db, check_db_connection
+from heimdal_data.api.pagination import NEXT_CURSOR_HEADER
+from heimdal_data.database.database import init_db, check_db_connection, close_db
+from heimdal_data.database.partitions import ensure_partitions, maintain_partitions
+from heimdal_data.database.compaction import compact, compaction_passes
+from heimdal_data.database.archive import archive, ARCHIVE_AFTER_MONTHS
+from heimdal_data.database.spool import spool
 
 # Load environment variables
 load_dotenv()
@@ -39,6 +45,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all methods
     allow_headers=["*"],  # Allow all headers
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Last-Modified"],  # Let browsers read the cursor and validators
 )
 
 # Include routers
@@ -48,6 +55,66 @@ app.include_router(auth_router)
 # Create scheduler
 scheduler = AsyncIOScheduler()
 
+def run_partition_maintenance():
+    """
+    Create upcoming partitions and remove data past the retention period.
+    """
+    try:
+        report = maintain_partitions()
+        logger.info(f"Partition maintenance completed: {report}")
+    except Exception as e:
+        logger.error(f"Error in partition maintenance: {e}")
+
+def run_compaction():
+    """
+    Downsample old hashtag trends and SEO data to daily and weekly rows.
+    """
+    if not compaction_passes():
+        return
+    
+    try:
+        report = compact()
+        for table, passes in report.items():
+            for compaction_pass in passes:
+                logger.info(
+                    f"Compacted {table} to {compaction_pass['resolution']} rows before {compaction_pass['cutoff']}: "
+                    f"{compaction_pass['rows_read']} rows into {compaction_pass['rows_written']}, "
+                    f"about {compaction_pass['bytes_reclaimed']} bytes reclaimed"
+                )
+    except Exception as e:
+        logger.error(f"Error in compaction: {e}")
+
+def run_archive():
+    """
+    Move old months of collected data from the database to the Parquet archive.
+    """
+    if ARCHIVE_AFTER_MONTHS <= 0:
+        return
+    
+    try:
+        report = archive()
+        for table, months in report["tables"].items():
+            for month in months:
+                logger.info(
+                    f"Archived {month['rows']} rows of {table} from {month['month']} to {month['file']}, "
+                    f"{month['deleted']} rows deleted from the database"
+                )
+    except Exception as e:
+        logger.error(f"Error in archiving: {e}")
+
+def replay_spool():
+    """
+    Write data spooled during database outages to the database.
+    """
+    if not spool.pending_segments() and not spool.current:
+        return
+    
+    report = spool.replay()
+    if report["records"]:
+        logger.info(f"Replayed {report['records']} spooled records from {report['segments']} segments")
+    if report["error"]:
+        logger.warning(f"Spool replay stopped, database still unavailable: {report['error']}")
+
 @app.on_event("startup")
 async def startup_event():
     """
@@ -62,6 +129,14 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Error initializing database: {e}")
     
+    # Make sure the partitions for the coming months exist
+    try:
+        created = ensure_partitions()
+        if created:
+            logger.info(f"Created partitions: {', '.join(created)}")
+    except Exception as e:
+        logger.error(f"Error creating partitions: {e}")
+    
     # Check database connection
     if check_db_connection():
         logger.info("Database connection successful")
@@ -88,6 +163,42 @@ async def startup_event():
             replace_existing=True
         )
         
+        # Add the partition maintenance and retention job to the scheduler
+        partition_schedule = os.getenv("PARTITION_MAINTENANCE_SCHEDULE", "0 1 * * *")
+        scheduler.add_job(
+            run_partition_maintenance,
+            CronTrigger.from_crontab(partition_schedule),
+            id="partition_maintenance",
+            replace_existing=True
+        )
+        
+        # Add the compaction job to the scheduler
+        compaction_schedule = os.getenv("COMPACTION_SCHEDULE", "0 2 * * *")
+        scheduler.add_job(
+            run_compaction,
+            CronTrigger.from_crontab(compaction_schedule),
+            id="compaction",
+            replace_existing=True
+        )
+        
+        # Add the archive job to the scheduler
+        archive_schedule = os.getenv("ARCHIVE_SCHEDULE", "0 3 * * *")
+        scheduler.add_job(
+            run_archive,
+            CronTrigger.from_crontab(archive_schedule),
+            id="archive",
+            replace_existing=True
+        )
+        
+        # Add the spool replay job to the scheduler
+        replay_interval = int(os.getenv("SPOOL_REPLAY_INTERVAL", "60"))
+        scheduler.add_job(
+            replay_spool,
+            IntervalTrigger(seconds=replay_interval),
+            id="spool_replay",
+            replace_existing=True
+        )
+        
         # Start the scheduler
         scheduler.start()
         logger.info(f"Scheduler started with schedule: {schedule}")
@@ -105,6 +216,14 @@ async def shutdown_event():
     if scheduler.running:
         scheduler.shutdown()
         logger.info("Scheduler shut down")
+    
+    # Close the collectors and their connections
+    await close_collectors()
+    logger.info("Collectors closed")
+    
+    # Close the pooled database connections
+    await close_db()
+    logger.info("Database connections closed")
 
 @app.get("/")
 async def root():
@@ -118,7 +237,12 @@ async def root():
             "/api/data/trends",
             "/api/data/engagement",
             "/api/data/seo",
-            "/api/data/fetch"
+            "/api/data/trends/rollup",
+            "/api/data/engagement/rollup",
+            "/api/data/archive/{dataset}",
+            "/api/data/export/{dataset}",
+            "/api/data/fetch",
+            "/api/data/status"
         ],
         "auth_endpoints": [
             "/api/auth/callback",
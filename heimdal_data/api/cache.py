@@ -0,0 +1,371 @@
+import os
+import json
+import time
+import threading
+import logging
+from collections import OrderedDict, namedtuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from fastapi.responses import Response
+
+from heimdal_data.database.generations import dataset_generations
+from heimdal_data.api.serialization import dumps
+
+logger = logging.getLogger("response_cache")
+
+# Whether responses of the data endpoints are cached
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+
+# Redis URL to share the cache between processes, e.g. redis://localhost:6379/0, empty for an in-process cache
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "")
+
+# Seconds a cached response is served for at most, even if its data didn't change
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+
+# Maximum number of responses kept by the in-process cache, least recently used first out
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+
+# Seconds to wait for Redis before treating a lookup as a miss
+RESPONSE_CACHE_REDIS_TIMEOUT = float(os.getenv("RESPONSE_CACHE_REDIS_TIMEOUT", "0.05"))
+
+# Prefix of the Redis keys of the cache
+REDIS_KEY_PREFIX = "heimdal:response:"
+
+# Tables each cached endpoint reads from
+CACHED_ENDPOINTS = {
+    "trends": ("hashtag_trends",),
+    "engagement": ("social_engagement",),
+    "seo": ("seo_data",)
+}
+
+# Generations of the tables a response was built from, its headers and its JSON body
+CacheEntry = namedtuple("CacheEntry", ["generations", "headers", "body"])
+
+# Key of a response and the generations of its tables when it was looked up
+CacheSlot = namedtuple("CacheSlot", ["key", "generations"])
+
+def _redis_available() -> bool:
+    """
+    Check if the redis package needed for a shared cache is installed.
+    
+    Returns:
+        bool: True if Redis can be used, False otherwise.
+    """
+    try:
+        import redis.asyncio  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class MemoryCacheBackend:
+    """
+    Keeps cached responses in a dictionary of this process, least recently used first out.
+    """
+    
+    def __init__(self, max_size: Optional[int] = None):
+        """
+        Initialize the in-process cache.
+        
+        Args:
+            max_size (int, optional): Maximum number of responses to keep. Defaults to RESPONSE_CACHE_SIZE.
+        """
+        self.max_size = max_size or RESPONSE_CACHE_SIZE
+        self.entries: "OrderedDict[str, Tuple[float, CacheEntry]]" = OrderedDict()
+        self.generations: Dict[str, int] = {}
+        self.lock = threading.Lock()
+    
+    async def lookup(self, key: str, tables: Iterable[str]) -> Tuple[Tuple[int, ...], Optional[CacheEntry]]:
+        """
+        Get the current generations of tables and the cached response for a key.
+        
+        Args:
+            key (str): Cache key.
+            tables (Iterable[str]): Tables the response reads from.
+        
+        Returns:
+            Tuple[Tuple[int, ...], Optional[CacheEntry]]: The generations, and the response or None if it isn't cached or expired.
+        """
+        with self.lock:
+            generations = tuple(self.generations.get(table, 0) for table in tables)
+            cached = self.entries.get(key)
+            
+            if cached is None:
+                return generations, None
+            
+            expires, entry = cached
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return generations, None
+            
+            self.entries.move_to_end(key)
+            return generations, entry
+    
+    async def store(self, key: str, entry: CacheEntry, ttl: float):
+        """
+        Cache a response.
+        
+        Args:
+            key (str): Cache key.
+            entry (CacheEntry): The response.
+            ttl (float): Seconds to keep it for.
+        """
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, entry)
+            self.entries.move_to_end(key)
+            
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+    
+    def bump(self, tables: List[str]):
+        """
+        Advance the generations of tables, so responses built from them are stale.
+        
+        Args:
+            tables (List[str]): Names of the changed tables.
+        """
+        with self.lock:
+            for table in tables:
+                self.generations[table] = self.generations.get(table, 0) + 1
+    
+    def size(self) -> int:
+        """
+        Get the number of cached responses.
+        
+        Returns:
+            int: Number of responses, including expired ones not evicted yet.
+        """
+        return len(self.entries)
+
+class RedisCacheBackend:
+    """
+    Keeps cached responses in Redis, so all API processes share them.
+    
+    Responses expire in Redis after the TTL. Eviction when Redis is full follows its
+    maxmemory-policy, which should be allkeys-lru for a cache. Lookups and stores run
+    in the async routes and use the asyncio client, so waiting for Redis doesn't block
+    the event loop. Generations are bumped by the writers, which are synchronous.
+    """
+    
+    def __init__(self, url: str):
+        """
+        Initialize the Redis cache.
+        
+        Args:
+            url (str): Redis URL.
+        """
+        import redis
+        import redis.asyncio
+        
+        timeouts = {
+            "socket_timeout": RESPONSE_CACHE_REDIS_TIMEOUT, "socket_connect_timeout": RESPONSE_CACHE_REDIS_TIMEOUT
+        }
+        self.client = redis.asyncio.Redis.from_url(url, **timeouts)
+        self.sync_client = redis.Redis.from_url(url, **timeouts)
+    
+    async def lookup(self, key: str, tables: Iterable[str]) -> Tuple[Tuple[int, ...], Optional[CacheEntry]]:
+        """
+        Get the current generations of tables and the cached response for a key, in one round trip.
+        
+        Args:
+            key (str): Cache key.
+            tables (Iterable[str]): Tables the response reads from.
+        
+        Returns:
+            Tuple[Tuple[int, ...], Optional[CacheEntry]]: The generations, and the response or None if it isn't cached.
+        """
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.mget([f"{REDIS_KEY_PREFIX}generation:{table}" for table in tables])
+        pipeline.get(f"{REDIS_KEY_PREFIX}{key}")
+        generations, value = await pipeline.execute()
+        
+        generations = tuple(int(generation or 0) for generation in generations)
+        if value is None:
+            return generations, None
+        
+        # Stored as a JSON line with the generations and headers, followed by the body
+        meta, body = value.split(b"\n", 1)
+        meta = json.loads(meta)
+        return generations, CacheEntry(tuple(meta["generations"]), meta["headers"], body)
+    
+    async def store(self, key: str, entry: CacheEntry, ttl: float):
+        """
+        Cache a response.
+        
+        Args:
+            key (str): Cache key.
+            entry (CacheEntry): The response.
+            ttl (float): Seconds to keep it for.
+        """
+        meta = json.dumps({"generations": entry.generations, "headers": entry.headers}).encode()
+        await self.client.set(f"{REDIS_KEY_PREFIX}{key}", meta + b"\n" + entry.body, px=int(ttl * 1000))
+    
+    def bump(self, tables: List[str]):
+        """
+        Advance the generations of tables, so responses built from them are stale in every process.
+        
+        Args:
+            tables (List[str]): Names of the changed tables.
+        """
+        pipeline = self.sync_client.pipeline(transaction=False)
+        for table in tables:
+            pipeline.incr(f"{REDIS_KEY_PREFIX}generation:{table}")
+        pipeline.execute()
+    
+    def size(self) -> Optional[int]:
+        """
+        Get the number of cached responses.
+        
+        Returns:
+            Optional[int]: None, counting keys in Redis is too slow to report.
+        """
+        return None
+
+class ResponseCache:
+    """
+    Caches the JSON responses of the data endpoints until their data changes or they expire.
+    
+    Responses are keyed on the endpoint and its normalized query parameters, and
+    tagged with the generations of the tables they were read from. Writers bump
+    those generations through dataset_generations when they commit, which makes
+    every response built from the changed tables stale at once. A hit returns
+    the stored JSON body as is, without touching the database or serializing again.
+    """
+    
+    def __init__(self, backend=None, ttl: Optional[float] = None, enabled: Optional[bool] = None):
+        """
+        Initialize the response cache.
+        
+        Args:
+            backend (optional): MemoryCacheBackend or RedisCacheBackend. Defaults to Redis if RESPONSE_CACHE_URL is set.
+            ttl (float, optional): Seconds a response is served for at most. Defaults to RESPONSE_CACHE_TTL.
+            enabled (bool, optional): Whether responses are cached. Defaults to RESPONSE_CACHE_ENABLED.
+        """
+        self.enabled = RESPONSE_CACHE_ENABLED if enabled is None else enabled
+        self.ttl = ttl or RESPONSE_CACHE_TTL
+        self.backend = backend or self._default_backend()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+    
+    @staticmethod
+    def _default_backend():
+        """
+        Create the backend configured by RESPONSE_CACHE_URL.
+        
+        Returns:
+            MemoryCacheBackend or RedisCacheBackend: The backend.
+        """
+        if RESPONSE_CACHE_URL:
+            if _redis_available():
+                return RedisCacheBackend(RESPONSE_CACHE_URL)
+            logger.warning("RESPONSE_CACHE_URL is set but the redis package is not installed, caching in process")
+        
+        return MemoryCacheBackend()
+    
+    @staticmethod
+    def key(endpoint: str, params: Dict[str, Any]) -> str:
+        """
+        Build the cache key of a request.
+        
+        Args:
+            endpoint (str): Name of the endpoint in CACHED_ENDPOINTS.
+            params (Dict[str, Any]): Query parameters, parameters that are None are left out.
+        
+        Returns:
+            str: The key, the same for the same parameters in any order.
+        """
+        return f"{endpoint}?{urlencode(sorted((name, value) for name, value in params.items() if value is not None))}"
+    
+    async def lookup(self, endpoint: str, params: Dict[str, Any]) -> Tuple[Optional[Response], CacheSlot]:
+        """
+        Get the cached response of a request.
+        
+        Args:
+            endpoint (str): Name of the endpoint in CACHED_ENDPOINTS.
+            params (Dict[str, Any]): Query parameters.
+        
+        Returns:
+            Tuple[Optional[Response], CacheSlot]: The response or None on a miss, and the slot to store the response in.
+        """
+        if not self.enabled:
+            return None, CacheSlot(None, None)
+        
+        key = self.key(endpoint, params)
+        
+        try:
+            generations, entry = await self.backend.lookup(key, CACHED_ENDPOINTS[endpoint])
+        except Exception as e:
+            # The cache is an optimization, the endpoint works without it
+            self.errors += 1
+            logger.warning(f"Error reading the response cache: {e}")
+            return None, CacheSlot(None, None)
+        
+        if entry is None or tuple(entry.generations) != generations:
+            self.misses += 1
+            return None, CacheSlot(key, generations)
+        
+        self.hits += 1
+        return Response(
+            content=entry.body, media_type="application/json", headers={**entry.headers, "X-Cache": "HIT"}
+        ), CacheSlot(key, generations)
+    
+    async def store(self, slot: CacheSlot, content: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+        """
+        Build the JSON response of a request and cache it.
+        
+        The response is tagged with the generations from the lookup, so if the data
+        changed while it was being read, it is already stale when stored.
+        
+        Args:
+            slot (CacheSlot): Slot returned by lookup.
+            content (Any): Data to return, encoded with api.serialization.dumps.
+            headers (Dict[str, str], optional): Response headers. Defaults to None.
+        
+        Returns:
+            Response: The response.
+        """
+        headers = headers or {}
+        body = dumps(content)
+        response = Response(content=body, media_type="application/json", headers={**headers, "X-Cache": "MISS"})
+        
+        if slot.key is not None:
+            try:
+                await self.backend.store(slot.key, CacheEntry(slot.generations, headers, body), self.ttl)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Error writing the response cache: {e}")
+        
+        return response
+    
+    def invalidate(self, tables: List[str]):
+        """
+        Make the responses built from tables stale.
+        
+        Args:
+            tables (List[str]): Names of the changed tables.
+        """
+        if not self.enabled:
+            return
+        
+        self.backend.bump(tables)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the size and hit rate of the cache.
+        
+        Returns:
+            Dict[str, Any]: Backend, number of cached responses, hits, misses and errors.
+        """
+        return {
+            "enabled": self.enabled,
+            "backend": "redis" if isinstance(self.backend, RedisCacheBackend) else "memory",
+            "size": self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors
+        }
+
+# Shared response cache of the data endpoints, invalidated when collected data is saved
+response_cache = ResponseCache()
+dataset_generations.subscribe(response_cache.invalidate)
@@ -0,0 +1,105 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+# Headers repeated on a 304 response
+NOT_MODIFIED_HEADERS = ("ETag", "Last-Modified", "Cache-Control")
+
+def validator_headers(
+    key: str, count: int, newest_id: Optional[int], newest: Optional[datetime], sliding: bool = False
+) -> Dict[str, str]:
+    """
+    Build the validators of a response from a summary of the rows it was read from.
+    
+    Collectors stamp every row they insert or update with the collection time, and
+    compaction, archiving and retention change the number of rows, so the summary
+    changes whenever the data of the response can have changed.
+    
+    The newest timestamp only covers rows entering the range. Rows leaving a window
+    that slides with the current time don't change it, so such responses get no
+    Last-Modified header, and only their ETag, which includes the count, is checked.
+    
+    Args:
+        key (str): Endpoint and normalized query parameters of the request.
+        count (int): Number of rows in the queried range.
+        newest_id (int, optional): Highest id in the range.
+        newest (datetime, optional): Newest timestamp in the range.
+        sliding (bool, optional): Whether the range starts a number of days before now. Defaults to False.
+    
+    Returns:
+        Dict[str, str]: ETag, Cache-Control and, for fixed ranges, Last-Modified headers.
+    """
+    summary = f"{key}|{count}|{newest_id}|{newest.isoformat() if newest else ''}"
+    
+    # Weak, as the same data may be encoded differently by another version of the API
+    headers = {
+        "ETag": f'W/"{hashlib.sha1(summary.encode()).hexdigest()[:20]}"',
+        # Clients may store the response, but have to check it is still current before using it
+        "Cache-Control": "no-cache"
+    }
+    if newest and not sliding:
+        # Times without a time zone are stored in local time by SQLite
+        headers["Last-Modified"] = format_datetime(newest.astimezone(timezone.utc), usegmt=True)
+    
+    return headers
+
+def _opaque_tag(tag: str) -> str:
+    """
+    Get an entity tag without its weak prefix, for weak comparison.
+    
+    Args:
+        tag (str): Entity tag.
+    
+    Returns:
+        str: The quoted tag.
+    """
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+def is_not_modified(request: Request, headers: Mapping[str, str]) -> bool:
+    """
+    Check whether a client already has the current version of a response.
+    
+    If-None-Match takes precedence over If-Modified-Since, as in RFC 9110.
+    
+    Args:
+        request (Request): The request.
+        headers (Mapping[str, str]): Validator headers of the current response.
+    
+    Returns:
+        bool: True if a 304 Not Modified response can be sent.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = headers.get("ETag")
+        tags = {_opaque_tag(tag) for tag in if_none_match.split(",")}
+        return bool(etag) and ("*" in tags or _opaque_tag(etag) in tags)
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    last_modified = headers.get("Last-Modified")
+    if not if_modified_since or not last_modified:
+        return False
+    
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        # Unparseable dates are ignored
+        return False
+
+def not_modified_response(headers: Mapping[str, str]) -> Response:
+    """
+    Build a 304 Not Modified response.
+    
+    Args:
+        headers (Mapping[str, str]): Headers of the current response.
+    
+    Returns:
+        Response: The response, with the validators of the current response and no body.
+    """
+    return Response(
+        status_code=304, headers={name: headers[name] for name in NOT_MODIFIED_HEADERS if headers.get(name)}
+    )
@@ -0,0 +1,167 @@
+import io
+import os
+import csv
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from heimdal_data.database.database import reader_session
+from heimdal_data.database.models import HashtagTrend, SocialEngagement, SeoData
+from heimdal_data.database.terms import INTERNED_COLUMNS, term_id_query, select_with_terms
+from heimdal_data.api.serialization import dumps
+
+# Number of rows fetched from the server-side cursor and encoded at a time
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "5000"))
+
+# Compression level of gzipped exports, from 1 (fastest) to 9 (smallest)
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
+
+# Model and filterable columns per dataset of the export endpoint
+EXPORT_DATASETS = {
+    "trends": (HashtagTrend, ("platform", "hashtag")),
+    "engagement": (SocialEngagement, ("platform",)),
+    "seo": (SeoData, ("keyword",))
+}
+
+# Media type and file extension per export format
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv")
+}
+
+def export_query(model, start: Optional[datetime] = None, end: Optional[datetime] = None, filters: Optional[Dict[str, str]] = None):
+    """
+    Build the query for all columns of a data table in a range of time, with term ids replaced by their text.
+    
+    Ordered by timestamp only, which every data table has an index on, so the
+    rows can be streamed as they are read instead of after a sort.
+    
+    Args:
+        model: Model of the data table, e.g. HashtagTrend.
+        start (datetime, optional): Start of the range. Defaults to the oldest row.
+        end (datetime, optional): End of the range. Defaults to the newest row.
+        filters (Dict[str, str], optional): Values of columns, or of the text of interned columns, rows must have.
+    
+    Returns:
+        Select: The query.
+    """
+    table = model.__table__
+    interned = INTERNED_COLUMNS.get(table.name, {})
+    conditions = []
+    
+    for name, value in (filters or {}).items():
+        if name in interned:
+            # The term is looked up once, the rows are then found by its id
+            conditions.append(table.c[interned[name]] == term_id_query(value))
+        else:
+            conditions.append(table.c[name] == value)
+    
+    if start:
+        conditions.append(table.c.timestamp >= start)
+    if end:
+        conditions.append(table.c.timestamp < end)
+    
+    # Hashtag trends are partitioned by bucket, which is never after the timestamp
+    if "bucket" in table.c and end:
+        conditions.append(table.c.bucket < end)
+    
+    return select_with_terms(table).where(*conditions).order_by(table.c.timestamp)
+
+def _value(value: Any) -> Any:
+    """
+    Convert a database value for export.
+    
+    Args:
+        value (Any): Value read from the database.
+    
+    Returns:
+        Any: The value, with times as ISO strings.
+    """
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def ndjson_chunk(columns: List[str], rows: Iterable[Any]) -> bytes:
+    """
+    Encode rows as newline-delimited JSON, one object per row.
+    
+    Args:
+        columns (List[str]): Column names.
+        rows (Iterable[Any]): Rows in column order.
+    
+    Returns:
+        bytes: The encoded rows.
+    """
+    return b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+def csv_chunk(columns: List[str], rows: Iterable[Any], header: bool = False) -> bytes:
+    """
+    Encode rows as CSV.
+    
+    Args:
+        columns (List[str]): Column names.
+        rows (Iterable[Any]): Rows in column order.
+        header (bool, optional): Whether to start with a row of column names. Defaults to False.
+    
+    Returns:
+        bytes: The encoded rows, NULL values as empty fields.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    
+    if header:
+        writer.writerow(columns)
+    writer.writerows([_value(value) for value in row] for row in rows)
+    
+    return buffer.getvalue().encode()
+
+async def export_rows(query, output_format: str, fetch_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    Stream the rows of a query, encoded one fetch at a time.
+    
+    The rows are read through a server-side cursor on a reader session of its own,
+    as the stream outlives the request handler. Memory use depends on the fetch
+    size, not on the number of rows.
+    
+    Args:
+        query (Select): Export query.
+        output_format (str): "ndjson" or "csv".
+        fetch_size (int, optional): Number of rows per fetch. Defaults to EXPORT_FETCH_SIZE.
+    
+    Yields:
+        bytes: Encoded rows.
+    """
+    fetch_size = fetch_size or EXPORT_FETCH_SIZE
+    
+    async with reader_session() as db:
+        result = await db.stream(query.execution_options(yield_per=fetch_size))
+        columns = list(result.keys())
+        
+        if output_format == "csv":
+            # The header is sent even if there are no rows
+            yield csv_chunk(columns, [], header=True)
+        
+        async for rows in result.partitions(fetch_size):
+            yield csv_chunk(columns, rows) if output_format == "csv" else ndjson_chunk(columns, rows)
+
+async def gzip_stream(chunks: AsyncIterator[bytes], level: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    Compress a stream of chunks into one gzip stream.
+    
+    Each chunk is flushed, so the client receives data as soon as it is read
+    instead of when the compressor's buffer is full.
+    
+    Args:
+        chunks (AsyncIterator[bytes]): Chunks to compress.
+        level (int, optional): Compression level. Defaults to EXPORT_GZIP_LEVEL.
+    
+    Yields:
+        bytes: Compressed data.
+    """
+    # A window size of 16 + 15 makes zlib write a gzip header and trailer
+    compressor = zlib.compressobj(level or EXPORT_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if compressed:
+            yield compressed
+    
+    yield compressor.flush()
@@ -0,0 +1,176 @@
+import os
+import json
+import math
+import base64
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+
+# Largest page the data endpoints return, larger limits are cut to this size
+MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "1000"))
+
+# Response header holding the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Type of the sort value in the cursors of each data endpoint, a tuple for several sort columns
+CURSOR_SORT_TYPES = {
+    "trends": (datetime, int),
+    "engagement": datetime,
+    "seo": float
+}
+
+def page_size(limit: int) -> int:
+    """
+    Get the number of rows to return for a requested limit.
+    
+    Args:
+        limit (int): Requested number of rows.
+    
+    Returns:
+        int: The limit, between 1 and MAX_PAGE_SIZE.
+    """
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def _encode_value(value: Any) -> Any:
+    """
+    Convert a sort value to JSON.
+    
+    Args:
+        value (Any): Sort value.
+    
+    Returns:
+        Any: The value, with times as tagged ISO strings.
+    """
+    if isinstance(value, tuple):
+        return [_encode_value(item) for item in value]
+    if isinstance(value, datetime):
+        return {"t": value.isoformat()}
+    return value
+
+def _decode_value(value: Any, sort_type: type) -> Any:
+    """
+    Convert a sort value read from JSON back and check its type.
+    
+    The value ends up in a comparison with the sort column, where a value of
+    another type fails on PostgreSQL and silently matches nothing on SQLite.
+    
+    Args:
+        value (Any): Value from _encode_value.
+        sort_type (type): Type of the sort column, from CURSOR_SORT_TYPES.
+    
+    Returns:
+        Any: The sort value.
+    
+    Raises:
+        TypeError: If the value isn't of the type of the sort column.
+    """
+    if isinstance(sort_type, tuple):
+        if not isinstance(value, list) or len(value) != len(sort_type):
+            raise TypeError(f"sort value must have {len(sort_type)} parts")
+        return tuple(_decode_value(item, item_type) for item, item_type in zip(value, sort_type))
+    
+    if isinstance(value, dict):
+        value = datetime.fromisoformat(value["t"])
+    
+    # JSON writes whole floats with a fraction, but accept integers for float columns anyway
+    if sort_type is float and isinstance(value, int) and not isinstance(value, bool):
+        value = float(value)
+    
+    if not isinstance(value, sort_type) or isinstance(value, bool):
+        raise TypeError(f"sort value must be of type {sort_type.__name__}")
+    if isinstance(value, float) and not math.isfinite(value):
+        raise TypeError("sort value must be finite")
+    
+    return value
+
+def encode_cursor(endpoint: str, since: datetime, value: Any, last_id: int) -> str:
+    """
+    Build the cursor for the page after a row.
+    
+    The cursor holds the endpoint it belongs to, the start of the time window of the
+    first page, so later pages cover the same window, and the sort value and id of
+    the last row returned.
+    
+    Args:
+        endpoint (str): Data endpoint, a key of CURSOR_SORT_TYPES.
+        since (datetime): Start of the time window.
+        value (Any): Sort value of the last row.
+        last_id (int): Id of the last row.
+    
+    Returns:
+        str: The cursor, URL-safe base64.
+    """
+    payload = json.dumps([endpoint, since.isoformat(), _encode_value(value), last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, endpoint: str) -> Tuple[datetime, Any, int]:
+    """
+    Read a cursor built by encode_cursor for an endpoint.
+    
+    Args:
+        cursor (str): The cursor.
+        endpoint (str): Data endpoint the cursor was passed to.
+    
+    Returns:
+        Tuple[datetime, Any, int]: Start of the time window, sort value and id of the last row.
+    
+    Raises:
+        ValueError: If the cursor is malformed, belongs to another endpoint or has a sort value of the wrong type.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_endpoint, since, value, last_id = json.loads(payload)
+        if cursor_endpoint != endpoint:
+            raise ValueError(f"cursor belongs to {cursor_endpoint}")
+        if not isinstance(last_id, int) or isinstance(last_id, bool):
+            raise TypeError("id must be an integer")
+        return datetime.fromisoformat(since), _decode_value(value, CURSOR_SORT_TYPES[endpoint]), last_id
+    except (TypeError, KeyError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}") from e
+
+def seek_after(sort_column, id_column, after: Optional[Tuple[Any, int]]):
+    """
+    Build the condition for the rows after a cursor, for a descending sort on columns and the id.
+    
+    Written as a row comparison, so the database can start an index scan on
+    (sort columns, id) right after the last row instead of skipping over the
+    rows of earlier pages. Rows whose sort value is updated while a client pages,
+    such as re-collected trends and posts, can move past the cursor, so they may be
+    skipped or returned twice.
+    
+    Args:
+        sort_column: Column the rows are sorted by, or a tuple of columns.
+        id_column: Id column, breaking ties.
+        after (Optional[Tuple[Any, int]]): Sort value and id of the last row returned, or None for the first page.
+    
+    Returns:
+        Optional[ColumnElement]: The condition, or None for the first page.
+    """
+    if after is None:
+        return None
+    
+    value, last_id = after
+    if isinstance(sort_column, tuple):
+        return tuple_(*sort_column, id_column) < tuple_(*value, last_id)
+    return tuple_(sort_column, id_column) < tuple_(value, last_id)
+
+def next_cursor(rows: List[Any], limit: int, endpoint: str, since: datetime, key) -> Tuple[List[Any], Optional[str]]:
+    """
+    Split the rows of a query for limit + 1 rows into a page and the cursor of the next one.
+    
+    Args:
+        rows (List[Any]): Rows returned by the query.
+        limit (int): Page size.
+        endpoint (str): Data endpoint, a key of CURSOR_SORT_TYPES.
+        since (datetime): Start of the time window.
+        key (Callable[[Any], Tuple[Any, int]]): Gets the sort value and id of a row.
+    
+    Returns:
+        Tuple[List[Any], Optional[str]]: The page, and the cursor of the next page or None if it is the last page.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    
+    rows = rows[:limit]
+    return rows, encode_cursor(endpoint, since, *key(rows[-1]))
@@ -1,20 +1,43 @@
 import os
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Any, Callable, Awaitable, Optional, Tuple
 import asyncio
+import time
 from datetime import datetime, timedelta
 
-from heimdal_data.database.database import get_db
-from heimdal_data.database.models import HashtagTrend, SocialEngagement, SeoData
+from heimdal_data.database.database import get_async_db, reader_session, database_pool_stats
+from heimdal_data.database.spool import spool
+from heimdal_data.database.bulk import bulk_writer
+from heimdal_data.database.models import (
+    Term, HashtagTrend, SocialEngagement, SeoData, HashtagTrendRollup, EngagementRollup, trend_bucket
+)
+from heimdal_data.database.terms import term_id_query
+from heimdal_data.database.archive import query_archive
+from heimdal_data.database.generations import dataset_generations
+from heimdal_data.api.pagination import (
+    NEXT_CURSOR_HEADER, page_size, decode_cursor, seek_after, next_cursor
+)
+from heimdal_data.api.cache import response_cache
+from heimdal_data.api.conditional import validator_headers, is_not_modified, not_modified_response
+from heimdal_data.api.serialization import json_response, row_dicts
+from heimdal_data.api.export import EXPORT_DATASETS, EXPORT_FORMATS, export_query, export_rows, gzip_stream
 from heimdal_data.collectors.twitter_collector import TwitterCollector
 from heimdal_data.collectors.facebook_collector import FacebookCollector
 from heimdal_data.collectors.tiktok_collector import TikTokCollector
 from heimdal_data.collectors.google_trends_collector import GoogleTrendsCollector
+from heimdal_data.utils.rate_limiter import rate_limiter
+from heimdal_data.utils.resilience import circuit_breaker_stats
 
 # Create API router
 router = APIRouter(prefix="/api/data", tags=["data"])
 
+# Data collection settings
+CONCURRENT_COLLECTION = os.getenv("CONCURRENT_COLLECTION", "true").lower() == "true"
+DEFAULT_COLLECTOR_TIMEOUT = float(os.getenv("COLLECTOR_TIMEOUT", "600"))
+
 # Create collectors
 twitter_collector = None
 facebook_collector = None
@@ -71,169 +94,700 @@ def initialize_collectors():
     except Exception as e:
         print(f"Error initializing Google Trends collector: {e}")
 
-@router.get("/trends", response_model=List[Dict[str, Any]])
-async def get_trends(db: Session = Depends(get_db), limit: int = 50, days: int = 7):
+async def close_collectors():
     """
-    Get the latest hashtag trends.
+    Close all initialized collectors.
+    """
+    for collector in [twitter_collector, facebook_collector, tiktok_collector, google_trends_collector]:
+        if collector:
+            try:
+                await collector.close()
+            except Exception as e:
+                print(f"Error closing {collector.name} collector: {e}")
+
+def trends_query(
+    days: int = 7, limit: int = 50, platform: Optional[str] = None, hashtag: Optional[str] = None,
+    since: Optional[datetime] = None, after: Optional[Tuple[int, int]] = None
+):
+    """
+    Build the query for the columns of the latest hashtag trends, with their hashtag text.
+    
+    The trends are ordered by hour, newest first, and by engagement within an hour, so
+    the rows are read in order from ix_hashtag_trends_bucket_engagement_id, or
+    ix_hashtag_trends_platform_bucket_engagement_id when filtering by platform, or
+    ix_hashtag_trends_hashtag_bucket_engagement_id when filtering by hashtag.
     
     Args:
-        db (Session): Database session.
+        days (int, optional): Number of days to look back. Defaults to 7.
         limit (int, optional): Maximum number of trends to return. Defaults to 50.
+        platform (str, optional): Only return trends from this platform. Defaults to all platforms.
+        hashtag (str, optional): Only return this hashtag. Defaults to all hashtags.
+        since (datetime, optional): Start of the time window, instead of days. Defaults to None.
+        after (Tuple[Tuple[datetime, int], int], optional): Hour and engagement, and id of the last trend
+            of the previous page. Defaults to None.
+    
+    Returns:
+        Select: The query, returning id, platform, hashtag, engagement, timestamp and bucket.
+    """
+    # Calculate the date limit
+    date_limit = since or datetime.now() - timedelta(days=days)
+    
+    # The bucket condition is implied by the timestamp one, but lets PostgreSQL skip old partitions
+    query = select(
+        HashtagTrend.id, HashtagTrend.platform, Term.text.label("hashtag"), HashtagTrend.engagement,
+        HashtagTrend.timestamp, HashtagTrend.bucket
+    ).join(Term, Term.id == HashtagTrend.hashtag_id).where(
+        HashtagTrend.timestamp >= date_limit,
+        HashtagTrend.bucket >= trend_bucket(date_limit)
+    )
+    if platform:
+        query = query.where(HashtagTrend.platform == platform)
+    if hashtag:
+        # The hashtag is looked up once, the trends are then found by its id
+        query = query.where(HashtagTrend.hashtag_id == term_id_query(hashtag))
+    if after:
+        query = query.where(seek_after((HashtagTrend.bucket, HashtagTrend.engagement), HashtagTrend.id, after))
+    
+    return query.order_by(
+        HashtagTrend.bucket.desc(), HashtagTrend.engagement.desc(), HashtagTrend.id.desc()
+    ).limit(limit)
+
+def engagement_query(
+    days: int = 7, limit: int = 50, platform: Optional[str] = None,
+    since: Optional[datetime] = None, after: Optional[Tuple[datetime, int]] = None
+):
+    """
+    Build the query for the columns of the latest engagement statistics.
+    
+    Served by ix_social_engagement_timestamp_id, or ix_social_engagement_platform_timestamp_id
+    when filtering by platform.
+    
+    Args:
         days (int, optional): Number of days to look back. Defaults to 7.
+        limit (int, optional): Maximum number of engagement records to return. Defaults to 50.
+        platform (str, optional): Only return engagement from this platform. Defaults to all platforms.
+        since (datetime, optional): Start of the time window, instead of days. Defaults to None.
+        after (Tuple[datetime, int], optional): Time and id of the last record of the previous page. Defaults to None.
     
     Returns:
-        List[Dict[str, Any]]: List of hashtag trends.
+        Select: The query, returning the engagement columns of the API.
+    """
+    # Calculate the date limit
+    date_limit = since or datetime.now() - timedelta(days=days)
+    
+    query = select(
+        SocialEngagement.id, SocialEngagement.platform, SocialEngagement.post_type, SocialEngagement.post_id,
+        SocialEngagement.likes, SocialEngagement.comments, SocialEngagement.shares, SocialEngagement.reach,
+        SocialEngagement.content_snippet, SocialEngagement.timestamp
+    ).where(SocialEngagement.timestamp >= date_limit)
+    if platform:
+        query = query.where(SocialEngagement.platform == platform)
+    if after:
+        query = query.where(seek_after(SocialEngagement.timestamp, SocialEngagement.id, after))
+    
+    return query.order_by(SocialEngagement.timestamp.desc(), SocialEngagement.id.desc()).limit(limit)
+
+def seo_query(
+    days: int = 7, limit: int = 50, keyword: Optional[str] = None,
+    since: Optional[datetime] = None, after: Optional[Tuple[float, int]] = None
+):
+    """
+    Build the query for the columns of the latest SEO data, with their keyword text.
+    
+    Served by ix_seo_data_trend_score_id, or ix_seo_data_keyword_trend_score_id when
+    filtering by keyword. Rows without a trend score can't be placed in the order and
+    are left out.
+    
+    Args:
+        days (int, optional): Number of days to look back. Defaults to 7.
+        limit (int, optional): Maximum number of SEO records to return. Defaults to 50.
+        keyword (str, optional): Only return this keyword. Defaults to all keywords.
+        since (datetime, optional): Start of the time window, instead of days. Defaults to None.
+        after (Tuple[float, int], optional): Trend score and id of the last record of the previous page. Defaults to None.
+    
+    Returns:
+        Select: The query, returning the SEO columns of the API with the keyword.
+    """
+    # Calculate the date limit
+    date_limit = since or datetime.now() - timedelta(days=days)
+    
+    query = select(
+        SeoData.id, Term.text.label("keyword"), SeoData.trend_score, SeoData.volume, SeoData.difficulty,
+        SeoData.cpc, SeoData.competition, SeoData.source, SeoData.timestamp
+    ).join(Term, Term.id == SeoData.keyword_id).where(
+        SeoData.timestamp >= date_limit,
+        SeoData.trend_score.isnot(None)
+    )
+    if keyword:
+        # The keyword is looked up once, the SEO data is then found by its id
+        query = query.where(SeoData.keyword_id == term_id_query(keyword))
+    if after:
+        query = query.where(seek_after(SeoData.trend_score, SeoData.id, after))
+    
+    return query.order_by(SeoData.trend_score.desc(), SeoData.id.desc()).limit(limit)
+
+def summary_query(model, query):
+    """
+    Build the query for the number of rows, highest id and newest timestamp in the range of a data query.
+    
+    Uses the conditions of the data query without its order, limit and joins, so it is
+    answered from the same index without reading the rows.
+    
+    Args:
+        model: Model the data query reads, e.g. HashtagTrend.
+        query (Select): Data query for the first page.
+    
+    Returns:
+        Select: The query.
+    """
+    return select(func.count(), func.max(model.id), func.max(model.timestamp)).where(query.whereclause)
+
+def page_window(endpoint: str, days: int, cursor: Optional[str]) -> Tuple[datetime, Optional[Tuple[Any, int]]]:
+    """
+    Get the time window and the position of a page of a data endpoint.
+    
+    Args:
+        endpoint (str): Data endpoint, e.g. "trends".
+        days (int): Number of days to look back, used for the first page.
+        cursor (str, optional): Cursor returned with the previous page.
+    
+    Returns:
+        Tuple[datetime, Optional[Tuple[Any, int]]]: Start of the time window, and the sort
+            value and id of the last row of the previous page or None for the first page.
+    """
+    if not cursor:
+        return datetime.now() - timedelta(days=days), None
+    
+    try:
+        since, value, last_id = decode_cursor(cursor, endpoint)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    return since, (value, last_id)
+
+def trend_rollup_query(
+    resolution: str = "day", days: int = 7, limit: int = 500,
+    platform: Optional[str] = None, hashtag: Optional[str] = None
+):
+    """
+    Build the query for the columns of hashtag trends aggregated per hour or day.
+    
+    Args:
+        resolution (str, optional): "hour" or "day". Defaults to "day".
+        days (int, optional): Number of days to look back. Defaults to 7.
+        limit (int, optional): Maximum number of buckets to return. Defaults to 500.
+        platform (str, optional): Only return trends from this platform. Defaults to all platforms.
+        hashtag (str, optional): Only return this hashtag. Defaults to all hashtags.
+    
+    Returns:
+        Select: The query.
     """
     # Calculate the date limit
-    date_limit = datetime.now() - timedelta(days=days)
-    
-    # Query the database for hashtag trends
-    trends = db.query(HashtagTrend).filter(
-        HashtagTrend.timestamp >= date_limit
-    ).order_by(
-        HashtagTrend.engagement.desc()
-    ).limit(limit).all()
-    
-    # Convert to dictionary
-    result = []
-    for trend in trends:
-        result.append({
-            "id": trend.id,
-            "platform": trend.platform,
-            "hashtag": trend.hashtag,
-            "engagement": trend.engagement,
-            "timestamp": trend.timestamp.isoformat()
-        })
-    
-    return result
+    date_limit = trend_bucket(datetime.now() - timedelta(days=days))
+    
+    query = select(
+        HashtagTrendRollup.bucket, HashtagTrendRollup.resolution, HashtagTrendRollup.platform,
+        HashtagTrendRollup.hashtag, HashtagTrendRollup.engagement_sum, HashtagTrendRollup.engagement_max,
+        HashtagTrendRollup.sample_count, HashtagTrendRollup.latest_engagement, HashtagTrendRollup.latest_timestamp
+    ).where(
+        HashtagTrendRollup.resolution == resolution,
+        HashtagTrendRollup.bucket >= date_limit
+    )
+    if platform:
+        query = query.where(HashtagTrendRollup.platform == platform)
+    if hashtag:
+        query = query.where(HashtagTrendRollup.hashtag == hashtag)
+    
+    return query.order_by(
+        HashtagTrendRollup.bucket.desc(), HashtagTrendRollup.engagement_sum.desc()
+    ).limit(limit)
+
+def engagement_rollup_query(
+    days: int = 7, limit: int = 500, platform: Optional[str] = None, post_type: Optional[str] = None
+):
+    """
+    Build the query for the columns of engagement aggregated per day.
+    
+    Args:
+        days (int, optional): Number of days to look back. Defaults to 7.
+        limit (int, optional): Maximum number of buckets to return. Defaults to 500.
+        platform (str, optional): Only return engagement from this platform. Defaults to all platforms.
+        post_type (str, optional): Only return this post type. Defaults to all post types.
+    
+    Returns:
+        Select: The query.
+    """
+    # Calculate the date limit
+    date_limit = trend_bucket(datetime.now() - timedelta(days=days)).replace(hour=0)
+    
+    query = select(
+        EngagementRollup.bucket, EngagementRollup.resolution, EngagementRollup.platform, EngagementRollup.post_type,
+        EngagementRollup.likes_sum, EngagementRollup.comments_sum, EngagementRollup.shares_sum,
+        EngagementRollup.reach_sum, EngagementRollup.engagement_sum, EngagementRollup.engagement_max,
+        EngagementRollup.post_count, EngagementRollup.latest_engagement, EngagementRollup.latest_timestamp
+    ).where(
+        EngagementRollup.resolution == "day",
+        EngagementRollup.bucket >= date_limit
+    )
+    if platform:
+        query = query.where(EngagementRollup.platform == platform)
+    if post_type:
+        query = query.where(EngagementRollup.post_type == post_type)
+    
+    return query.order_by(
+        EngagementRollup.bucket.desc(), EngagementRollup.engagement_sum.desc()
+    ).limit(limit)
+
+@router.get("/trends", response_model=List[Dict[str, Any]])
+async def get_trends(
+    request: Request, limit: int = 50, days: int = 7, platform: Optional[str] = None, hashtag: Optional[str] = None,
+    cursor: Optional[str] = None
+):
+    """
+    Get the latest hashtag trends, newest hour first and highest engagement first within an hour.
+    
+    If there are more trends, the cursor of the next page is returned in the X-Next-Cursor header.
+    Responses are cached until hashtag trends are saved, see api/cache.py, and carry an
+    ETag, so a client that already has the current trends gets 304 Not Modified.
+    
+    Args:
+        request (Request): The request, for its conditional headers.
+        limit (int, optional): Maximum number of trends to return, at most API_MAX_PAGE_SIZE. Defaults to 50.
+        days (int, optional): Number of days to look back. Defaults to 7.
+        platform (str, optional): Only return trends from this platform. Defaults to all platforms.
+        hashtag (str, optional): Only return this hashtag. Defaults to all hashtags.
+        cursor (str, optional): Cursor of the page to return. Defaults to the first page.
+    
+    Returns:
+        List[Dict[str, Any]]: List of hashtag trends.
+    """
+    limit = page_size(limit)
+    since, after = page_window("trends", days, cursor)
+    
+    # The window of later pages is in the cursor, so days doesn't matter for them
+    params = {
+        "limit": limit, "days": None if cursor else days, "platform": platform, "hashtag": hashtag, "cursor": cursor
+    }
+    cached, slot = await response_cache.lookup("trends", params)
+    if cached:
+        return not_modified_response(cached.headers) if is_not_modified(request, cached.headers) else cached
+    
+    async with reader_session() as db:
+        # Check the validators first, so clients with the current trends don't cause them to be read
+        validators = validator_headers(response_cache.key("trends", params), *(await db.execute(
+            summary_query(HashtagTrend, trends_query(days, 0, platform, hashtag, since))
+        )).one(), sliding=cursor is None)
+        if is_not_modified(request, validators):
+            return not_modified_response(validators)
+        
+        # Query the database for hashtag trends, one more than the page to know if there is a next page
+        trends = (await db.execute(trends_query(days, limit + 1, platform, hashtag, since, after))).all()
+    trends, next_page = next_cursor(trends, limit, "trends", since, lambda row: ((row.bucket, row.engagement), row.id))
+    
+    headers = {**validators, NEXT_CURSOR_HEADER: next_page} if next_page else validators
+    return await response_cache.store(slot, row_dicts(trends), headers)
 
 @router.get("/engagement", response_model=List[Dict[str, Any]])
-async def get_engagement(db: Session = Depends(get_db), limit: int = 50, days: int = 7):
+async def get_engagement(
+    request: Request, limit: int = 50, days: int = 7, platform: Optional[str] = None, cursor: Optional[str] = None
+):
     """
-    Get the latest engagement statistics.
+    Get the latest engagement statistics, newest first.
+    
+    If there are more records, the cursor of the next page is returned in the X-Next-Cursor header.
+    Responses are cached until engagement statistics are saved, see api/cache.py, and carry an
+    ETag, so a client that already has the current records gets 304 Not Modified.
     
     Args:
-        db (Session): Database session.
-        limit (int, optional): Maximum number of engagement records to return. Defaults to 50.
+        request (Request): The request, for its conditional headers.
+        limit (int, optional): Maximum number of engagement records to return, at most API_MAX_PAGE_SIZE. Defaults to 50.
         days (int, optional): Number of days to look back. Defaults to 7.
+        platform (str, optional): Only return engagement from this platform. Defaults to all platforms.
+        cursor (str, optional): Cursor of the page to return. Defaults to the first page.
     
     Returns:
         List[Dict[str, Any]]: List of engagement statistics.
     """
-    # Calculate the date limit
-    date_limit = datetime.now() - timedelta(days=days)
-    
-    # Query the database for engagement statistics
-    engagements = db.query(SocialEngagement).filter(
-        SocialEngagement.timestamp >= date_limit
-    ).order_by(
-        SocialEngagement.timestamp.desc()
-    ).limit(limit).all()
-    
-    # Convert to dictionary
-    result = []
-    for engagement in engagements:
-        result.append({
-            "id": engagement.id,
-            "platform": engagement.platform,
-            "post_type": engagement.post_type,
-            "post_id": engagement.post_id,
-            "likes": engagement.likes,
-            "comments": engagement.comments,
-            "shares": engagement.shares,
-            "reach": engagement.reach,
-            "content_snippet": engagement.content_snippet,
-            "timestamp": engagement.timestamp.isoformat()
-        })
-    
-    return result
+    limit = page_size(limit)
+    since, after = page_window("engagement", days, cursor)
+    
+    params = {"limit": limit, "days": None if cursor else days, "platform": platform, "cursor": cursor}
+    cached, slot = await response_cache.lookup("engagement", params)
+    if cached:
+        return not_modified_response(cached.headers) if is_not_modified(request, cached.headers) else cached
+    
+    async with reader_session() as db:
+        # Check the validators first, so clients with the current records don't cause them to be read
+        validators = validator_headers(response_cache.key("engagement", params), *(await db.execute(
+            summary_query(SocialEngagement, engagement_query(days, 0, platform, since))
+        )).one(), sliding=cursor is None)
+        if is_not_modified(request, validators):
+            return not_modified_response(validators)
+        
+        # Query the database for engagement statistics, one more than the page to know if there is a next page
+        engagements = (await db.execute(engagement_query(days, limit + 1, platform, since, after))).all()
+    engagements, next_page = next_cursor(engagements, limit, "engagement", since, lambda row: (row.timestamp, row.id))
+    
+    headers = {**validators, NEXT_CURSOR_HEADER: next_page} if next_page else validators
+    return await response_cache.store(slot, row_dicts(engagements), headers)
 
 @router.get("/seo", response_model=List[Dict[str, Any]])
-async def get_seo_data(db: Session = Depends(get_db), limit: int = 50, days: int = 7):
+async def get_seo_data(
+    request: Request, limit: int = 50, days: int = 7, keyword: Optional[str] = None, cursor: Optional[str] = None
+):
     """
-    Get the latest SEO data.
+    Get the latest SEO data, highest trend score first.
+    
+    If there are more records, the cursor of the next page is returned in the X-Next-Cursor header.
+    Responses are cached until SEO data is saved, see api/cache.py, and carry an
+    ETag, so a client that already has the current records gets 304 Not Modified.
     
     Args:
-        db (Session): Database session.
-        limit (int, optional): Maximum number of SEO records to return. Defaults to 50.
+        request (Request): The request, for its conditional headers.
+        limit (int, optional): Maximum number of SEO records to return, at most API_MAX_PAGE_SIZE. Defaults to 50.
         days (int, optional): Number of days to look back. Defaults to 7.
+        keyword (str, optional): Only return this keyword. Defaults to all keywords.
+        cursor (str, optional): Cursor of the page to return. Defaults to the first page.
     
     Returns:
         List[Dict[str, Any]]: List of SEO data.
     """
-    # Calculate the date limit
-    date_limit = datetime.now() - timedelta(days=days)
-    
-    # Query the database for SEO data
-    seo_data = db.query(SeoData).filter(
-        SeoData.timestamp >= date_limit
-    ).order_by(
-        SeoData.trend_score.desc()
-    ).limit(limit).all()
-    
-    # Convert to dictionary
-    result = []
-    for data in seo_data:
-        result.append({
-            "id": data.id,
-            "keyword": data.keyword,
-            "trend_score": data.trend_score,
-            "volume": data.volume,
-            "difficulty": data.difficulty,
-            "cpc": data.cpc,
-            "competition": data.competition,
-            "source": data.source,
-            "timestamp": data.timestamp.isoformat()
-        })
-    
-    return result
-
-async def fetch_data_task():
+    limit = page_size(limit)
+    since, after = page_window("seo", days, cursor)
+    
+    params = {"limit": limit, "days": None if cursor else days, "keyword": keyword, "cursor": cursor}
+    cached, slot = await response_cache.lookup("seo", params)
+    if cached:
+        return not_modified_response(cached.headers) if is_not_modified(request, cached.headers) else cached
+    
+    async with reader_session() as db:
+        # Check the validators first, so clients with the current records don't cause them to be read
+        validators = validator_headers(response_cache.key("seo", params), *(await db.execute(
+            summary_query(SeoData, seo_query(days, 0, keyword, since))
+        )).one(), sliding=cursor is None)
+        if is_not_modified(request, validators):
+            return not_modified_response(validators)
+        
+        # Query the database for SEO data, one more than the page to know if there is a next page
+        seo_data = (await db.execute(seo_query(days, limit + 1, keyword, since, after))).all()
+    seo_data, next_page = next_cursor(seo_data, limit, "seo", since, lambda row: (row.trend_score, row.id))
+    
+    headers = {**validators, NEXT_CURSOR_HEADER: next_page} if next_page else validators
+    return await response_cache.store(slot, row_dicts(seo_data), headers)
+
+@router.get("/trends/rollup", response_model=List[Dict[str, Any]])
+async def get_trend_rollups(
+    db: AsyncSession = Depends(get_async_db), resolution: str = "day", days: int = 7, limit: int = 500,
+    platform: Optional[str] = None, hashtag: Optional[str] = None
+):
+    """
+    Get hashtag trends aggregated per hour or day.
+    
+    Answered from the rollup tables, so the cost depends on the number of buckets, not on the number of snapshots.
+    
+    Args:
+        db (AsyncSession): Database session.
+        resolution (str, optional): "hour" or "day". Defaults to "day".
+        days (int, optional): Number of days to look back. Defaults to 7.
+        limit (int, optional): Maximum number of buckets to return. Defaults to 500.
+        platform (str, optional): Only return trends from this platform. Defaults to all platforms.
+        hashtag (str, optional): Only return this hashtag. Defaults to all hashtags.
+    
+    Returns:
+        List[Dict[str, Any]]: Aggregated engagement per bucket, platform and hashtag.
+    """
+    if resolution not in ("hour", "day"):
+        raise HTTPException(status_code=400, detail="resolution must be 'hour' or 'day'")
+    
+    # Query the rollups for hashtag trends
+    rollups = (await db.execute(
+        trend_rollup_query(resolution, days, limit, platform, hashtag)
+    )).all()
+    
+    return json_response(row_dicts(rollups))
+
+@router.get("/engagement/rollup", response_model=List[Dict[str, Any]])
+async def get_engagement_rollups(
+    db: AsyncSession = Depends(get_async_db), days: int = 7, limit: int = 500,
+    platform: Optional[str] = None, post_type: Optional[str] = None
+):
+    """
+    Get engagement aggregated per day.
+    
+    Answered from the rollup tables, so the cost depends on the number of buckets, not on the number of posts.
+    
+    Args:
+        db (AsyncSession): Database session.
+        days (int, optional): Number of days to look back. Defaults to 7.
+        limit (int, optional): Maximum number of buckets to return. Defaults to 500.
+        platform (str, optional): Only return engagement from this platform. Defaults to all platforms.
+        post_type (str, optional): Only return this post type. Defaults to all post types.
+    
+    Returns:
+        List[Dict[str, Any]]: Aggregated engagement per day, platform and post type.
+    """
+    # Query the rollups for engagement
+    rollups = (await db.execute(
+        engagement_rollup_query(days, limit, platform, post_type)
+    )).all()
+    
+    return json_response(row_dicts(rollups))
+
+# Archived table, sort columns and returned columns per dataset of the archive endpoint,
+# the columns of the live endpoint rather than internal ones such as the compaction statistics
+ARCHIVE_DATASETS = {
+    "trends": ("hashtag_trends", ["bucket", "engagement"], list(trends_query().selected_columns.keys())),
+    "engagement": ("social_engagement", "timestamp", list(engagement_query().selected_columns.keys())),
+    "seo": ("seo_data", "trend_score", list(seo_query().selected_columns.keys()))
+}
+
+@router.get("/archive/{dataset}", response_model=List[Dict[str, Any]])
+async def get_archived_data(
+    dataset: str, start: Optional[datetime] = None, end: Optional[datetime] = None, limit: int = 100,
+    platform: Optional[str] = None, hashtag: Optional[str] = None, keyword: Optional[str] = None
+):
+    """
+    Get data that has been moved from the database to the Parquet archive.
+    
+    Only the archived months overlapping the range are read, see database/archive.py.
+    
+    Args:
+        dataset (str): "trends", "engagement" or "seo".
+        start (datetime, optional): Start of the range. Defaults to 30 days before the end.
+        end (datetime, optional): End of the range. Defaults to now.
+        limit (int, optional): Maximum number of records to return. Defaults to 100.
+        platform (str, optional): Only return records from this platform. Defaults to all platforms.
+        hashtag (str, optional): Only return this hashtag. Defaults to all hashtags.
+        keyword (str, optional): Only return this keyword. Defaults to all keywords.
+    
+    Returns:
+        List[Dict[str, Any]]: Archived records with the columns of the live endpoint, sorted like its records.
+    """
+    if dataset not in ARCHIVE_DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown archive dataset: {dataset}")
+    
+    table_name, order_by, columns = ARCHIVE_DATASETS[dataset]
+    end = end or datetime.now()
+    start = start or end - timedelta(days=30)
+    
+    filters = {}
+    if platform and dataset != "seo":
+        filters["platform"] = platform
+    if hashtag and dataset == "trends":
+        filters["hashtag"] = hashtag
+    if keyword and dataset == "seo":
+        filters["keyword"] = keyword
+    
+    # Reading Parquet files blocks, so it runs in a worker thread
+    rows = await asyncio.to_thread(query_archive, table_name, start, end, filters, order_by, limit, columns)
+    
+    return json_response(rows)
+
+@router.get("/export/{dataset}")
+async def export_data(
+    dataset: str, format: str = "ndjson", start: Optional[datetime] = None, end: Optional[datetime] = None,
+    platform: Optional[str] = None, hashtag: Optional[str] = None, keyword: Optional[str] = None, gzip: bool = False
+):
+    """
+    Export all records of a dataset in a range of time as a file.
+    
+    The records are streamed from a server-side cursor as they are read, see
+    api/export.py, so the first bytes are sent right away and memory use doesn't
+    grow with the size of the export.
+    
+    Args:
+        dataset (str): "trends", "engagement" or "seo".
+        format (str, optional): "ndjson" or "csv". Defaults to "ndjson".
+        start (datetime, optional): Start of the range. Defaults to the oldest record.
+        end (datetime, optional): End of the range. Defaults to the newest record.
+        platform (str, optional): Only export records from this platform. Defaults to all platforms.
+        hashtag (str, optional): Only export this hashtag. Defaults to all hashtags.
+        keyword (str, optional): Only export this keyword. Defaults to all keywords.
+        gzip (bool, optional): Whether to compress the file with gzip. Defaults to False.
+    
+    Returns:
+        StreamingResponse: The records, sorted by timestamp.
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown export dataset: {dataset}")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown export format: {format}")
+    
+    model, filterable = EXPORT_DATASETS[dataset]
+    media_type, extension = EXPORT_FORMATS[format]
+    
+    requested = {"platform": platform, "hashtag": hashtag, "keyword": keyword}
+    filters = {name: value for name, value in requested.items() if value and name in filterable}
+    
+    chunks = export_rows(export_query(model, start, end, filters), format)
+    
+    filename = f"{model.__tablename__}.{extension}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if gzip:
+        # Sent as a gzip file rather than with Content-Encoding, so clients save it compressed
+        chunks = gzip_stream(chunks)
+        media_type = "application/gzip"
+        headers["Content-Disposition"] = f'attachment; filename="{filename}.gz"'
+    
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+async def run_google_trends() -> bool:
+    """
+    Collect and save Google Trends data.
+    
+    Returns:
+        bool: True if data was collected and saved successfully, False otherwise.
+    """
+    # Use testing mode for Google Trends since it doesn't require API keys
+    # but might still fail if we try to make real API calls
+    data = await google_trends_collector.collect(testing_mode=True)
+    if not data:
+        print("No data collected from Google Trends")
+        return False
+    
+    success = await google_trends_collector.save(data)
+    if success:
+        print(f"Successfully collected and saved {len(data)} items from Google Trends")
+    return success
+
+def get_collector_jobs() -> Dict[str, Callable[[], Awaitable[bool]]]:
+    """
+    Get the run functions of all initialized collectors.
+    
+    Returns:
+        Dict[str, Callable[[], Awaitable[bool]]]: Mapping of collector name to its run function.
+    """
+    jobs = {}
+    
+    if twitter_collector:
+        jobs["Twitter"] = twitter_collector.run
+    if facebook_collector:
+        jobs["Facebook"] = facebook_collector.run
+    if tiktok_collector:
+        jobs["TikTok"] = tiktok_collector.run
+    if google_trends_collector:
+        jobs["GoogleTrends"] = run_google_trends
+    
+    return jobs
+
+def get_collector_timeout(name: str) -> float:
+    """
+    Get the timeout for a collector.
+    
+    The timeout can be set per collector with e.g. TWITTER_COLLECTOR_TIMEOUT,
+    otherwise COLLECTOR_TIMEOUT is used.
+    
+    Args:
+        name (str): Name of the collector.
+    
+    Returns:
+        float: Timeout in seconds.
+    """
+    return float(os.getenv(f"{name.upper()}_COLLECTOR_TIMEOUT", DEFAULT_COLLECTOR_TIMEOUT))
+
+async def run_collector(name: str, job: Callable[[], Awaitable[bool]], timeout: float) -> Dict[str, Any]:
+    """
+    Run a single collector with a timeout.
+    
+    The collector is cancelled if it doesn't finish within the timeout.
+    
+    Args:
+        name (str): Name of the collector.
+        job (Callable[[], Awaitable[bool]]): Function running the collector.
+        timeout (float): Timeout in seconds.
+    
+    Returns:
+        Dict[str, Any]: Result summary for the collector.
+    """
+    start_time = time.monotonic()
+    error = None
+    
+    try:
+        success = await asyncio.wait_for(job(), timeout=timeout)
+        status = "success" if success else "failed"
+    except asyncio.TimeoutError:
+        status = "timeout"
+        error = f"Timed out after {timeout:.0f} seconds"
+        print(f"Data collection from {name} timed out after {timeout:.0f} seconds")
+    except Exception as e:
+        status = "error"
+        error = str(e)
+        print(f"Error collecting data from {name}: {e}")
+    
+    return {
+        "collector": name,
+        "status": status,
+        "duration": round(time.monotonic() - start_time, 2),
+        "error": error
+    }
+
+async def fetch_data_task(concurrent: Optional[bool] = None) -> Dict[str, Any]:
     """
     Background task to fetch data from all sources.
+    
+    Args:
+        concurrent (bool, optional): Whether to run the collectors concurrently.
+            Defaults to the CONCURRENT_COLLECTION environment variable.
+    
+    Returns:
+        Dict[str, Any]: Summary of the data collection run.
     """
     print("Starting data collection task...")
     
+    if concurrent is None:
+        concurrent = CONCURRENT_COLLECTION
+    
     # Initialize collectors if not already initialized
     if twitter_collector is None or facebook_collector is None or tiktok_collector is None or google_trends_collector is None:
         initialize_collectors()
     
-    # Collect data from Twitter
-    if twitter_collector:
-        try:
-            await twitter_collector.run()
-        except Exception as e:
-            print(f"Error collecting data from Twitter: {e}")
+    jobs = get_collector_jobs()
+    start_time = time.monotonic()
     
-    # Collect data from Facebook
-    if facebook_collector:
-        try:
-            await facebook_collector.run()
-        except Exception as e:
-            print(f"Error collecting data from Facebook: {e}")
+    if concurrent:
+        # Start all collectors at once, each with its own timeout
+        results = await asyncio.gather(*[
+            run_collector(name, job, get_collector_timeout(name))
+            for name, job in jobs.items()
+        ])
+    else:
+        # Run the collectors one after the other
+        results = []
+        for name, job in jobs.items():
+            results.append(await run_collector(name, job, get_collector_timeout(name)))
     
-    # Collect data from TikTok
-    if tiktok_collector:
-        try:
-            await tiktok_collector.run()
-        except Exception as e:
-            print(f"Error collecting data from TikTok: {e}")
+    summary = {
+        "mode": "concurrent" if concurrent else "sequential",
+        "duration": round(time.monotonic() - start_time, 2),
+        "collectors": list(results)
+    }
     
-    # Collect data from Google Trends
-    if google_trends_collector:
-        try:
-            # Use testing mode for Google Trends since it doesn't require API keys
-            # but might still fail if we try to make real API calls
-            data = await google_trends_collector.collect(testing_mode=True)
-            if data:
-                await google_trends_collector.save(data)
-                print(f"Successfully collected and saved {len(data)} items from Google Trends")
-            else:
-                print("No data collected from Google Trends")
-        except Exception as e:
-            print(f"Error collecting data from Google Trends: {e}")
+    print(f"Data collection task completed in {summary['duration']:.2f} seconds: " + ", ".join(
+        f"{result['collector']}={result['status']}" for result in results
+    ))
     
-    print("Data collection task completed.")
+    return summary
+
+@router.get("/status", response_model=Dict[str, Any])
+async def get_status():
+    """
+    Get the state of the circuit breakers, rate limiters, database connection pools, spool and caches.
+    
+    Returns:
+        Dict[str, Any]: Circuit breaker state and retry counts per provider, token bucket state per endpoint,
+            usage and checkout wait times of the reader and writer pools, data waiting in the spool,
+            the size and hit counts of the cache of hashtag and keyword ids and of the response cache,
+            and the number of changes to each data table.
+    """
+    return {
+        "circuit_breakers": circuit_breaker_stats(),
+        "rate_limits": rate_limiter.stats(),
+        "database_pools": database_pool_stats(),
+        "spool": spool.stats(),
+        "term_cache": bulk_writer.terms.stats(),
+        "response_cache": response_cache.stats(),
+        "dataset_generations": dataset_generations.stats()
+    }
 
 @router.post("/fetch", response_model=Dict[str, Any])
 async def fetch_data(background_tasks: BackgroundTasks):
@@ -1,10 +1,21 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
+import asyncio
 import logging
-from typing import Dict, List, Any, Optional
+import json
+from typing import Dict, List, Any, Optional, Mapping, Callable, Tuple
 import os
 from pathlib import Path
 
+import httpx
+import requests
+
+from heimdal_data.database.bulk import bulk_writer
+from heimdal_data.database.spool import spool, SPOOL_ENABLED, is_connection_error
+from heimdal_data.database.watermarks import get_watermarks, set_watermarks
+from heimdal_data.utils.rate_limiter import rate_limiter
+from heimdal_data.utils.resilience import RetryPolicy, TransientError, CircuitOpenError, get_circuit_breaker
+
 # Create logs directory if it doesn't exist
 logs_dir = Path(os.path.dirname(os.path.abspath(__file__))).parent / "logs"
 logs_dir.mkdir(exist_ok=True)
@@ -27,6 +38,17 @@ class BaseCollector(ABC):
     Base class for all data collectors.
     """
     
+    # Exceptions that are worth retrying
+    retryable_exceptions: Tuple[type, ...] = (
+        TransientError,
+        ConnectionError,
+        TimeoutError,
+        asyncio.TimeoutError,
+        httpx.TransportError,
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout
+    )
+    
     def __init__(self, name: str):
         """
         Initialize the collector.
@@ -35,8 +57,241 @@ class BaseCollector(ABC):
             name (str): Name of the collector.
         """
         self.name = name
+        self.provider = name.lower()
         self.logger = logging.getLogger(f"collector.{name}")
         self.logger.info(f"Initializing {name} collector")
+        
+        # Retries and circuit breaker around API calls
+        self.retry_policy = RetryPolicy()
+        self.circuit_breaker = get_circuit_breaker(self.provider)
+        
+        # Watermarks reached during the current run, stored once the data is saved
+        self.pending_watermarks: Dict[str, Dict[str, str]] = {}
+        
+        # Set by collect() when there is nothing new to collect, which is not a failure
+        self.up_to_date = False
+    
+    def load_watermarks(self, endpoint: str) -> Dict[str, str]:
+        """
+        Load the stored watermarks of an endpoint.
+        
+        Args:
+            endpoint (str): Name of the endpoint.
+        
+        Returns:
+            Dict[str, str]: Watermark value per account. Empty if they couldn't be loaded.
+        """
+        try:
+            return get_watermarks(self.name, endpoint)
+        except Exception as e:
+            self.logger.exception(f"Error loading watermarks for {self.name} {endpoint}, collecting everything: {e}")
+            return {}
+    
+    def stage_watermark(self, endpoint: str, account: str, value: str):
+        """
+        Remember a watermark to store once the collected data has been saved.
+        
+        Args:
+            endpoint (str): Name of the endpoint.
+            account (str): Account, page or location the watermark belongs to.
+            value (str): New watermark value.
+        """
+        self.pending_watermarks.setdefault(endpoint, {})[account] = value
+    
+    def load_resume_cursors(self, endpoint: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Load the resume cursors of an endpoint.
+        
+        A resume cursor is stored when a page limit cuts a walk short before it reaches the
+        watermark. The watermark is kept, and the next run continues the walk from the cursor.
+        
+        Args:
+            endpoint (str): Name of the endpoint.
+        
+        Returns:
+            Dict[str, Dict[str, Any]]: Resume cursor per account with an unfinished walk.
+        """
+        return {
+            account: json.loads(value)
+            for account, value in self.load_watermarks(f"{endpoint}/resume").items()
+            if value
+        }
+    
+    def stage_resume_cursor(self, endpoint: str, account: str, cursor: Optional[Dict[str, Any]]):
+        """
+        Remember a resume cursor to store once the collected data has been saved.
+        
+        Args:
+            endpoint (str): Name of the endpoint.
+            account (str): Account or page the walk belongs to.
+            cursor (Dict[str, Any], optional): Where to continue the walk, or None once it is finished.
+        """
+        self.stage_watermark(f"{endpoint}/resume", account, json.dumps(cursor) if cursor else "")
+    
+    def commit_watermarks(self):
+        """
+        Store the staged watermarks, so the next run continues from them.
+        
+        If they can't be stored, the next run starts from the previous watermarks
+        and collects some items again, which the natural-key upserts absorb.
+        """
+        try:
+            for endpoint, values in self.pending_watermarks.items():
+                set_watermarks(self.name, endpoint, values)
+        except Exception as e:
+            self.logger.warning(f"Could not store watermarks for {self.name}: {e}")
+        
+        self.pending_watermarks = {}
+    
+    async def store(self, batches: Dict[type, List[Dict[str, Any]]]) -> bool:
+        """
+        Write collected records to the database, or to the spool if the database is unavailable.
+        
+        The writes block, so they run in a worker thread, and the event loop keeps serving
+        API requests and the other collectors meanwhile.
+        
+        Args:
+            batches (Dict[type, List[Dict[str, Any]]]): Records keyed by column name, per model class.
+        
+        Returns:
+            bool: True if the records were written to the database or the spool.
+        
+        Raises:
+            Exception: The database error, if it isn't a connection error, the spool is disabled or can't be written either.
+        """
+        return await asyncio.to_thread(self._store, batches)
+    
+    def _store(self, batches: Dict[type, List[Dict[str, Any]]]) -> bool:
+        """
+        Write collected records to the database, or to the spool if the database is unavailable.
+        
+        Spooled records are written to the database later by the spool replayer,
+        so the API quota spent on collecting them is not lost. Only connection errors
+        are spooled for, other errors would fail the same way when replayed.
+        
+        Args:
+            batches (Dict[type, List[Dict[str, Any]]]): Records keyed by column name, per model class.
+        
+        Returns:
+            bool: True if the records were written to the database or the spool.
+        
+        Raises:
+            Exception: The database error, if it isn't a connection error, the spool is disabled or can't be written either.
+        """
+        if not SPOOL_ENABLED:
+            bulk_writer.write_many(batches)
+            return True
+        
+        # Skip the database for a while after it failed, instead of waiting for it on every save
+        if spool.database_available():
+            try:
+                bulk_writer.write_many(batches)
+                return True
+            except Exception as e:
+                if not is_connection_error(e):
+                    raise
+                self.logger.warning(f"Database write failed for {self.name}, spooling the data instead: {e}")
+                spool.mark_database_unavailable(e)
+        
+        for model, records in batches.items():
+            if records:
+                spool.append(model.__tablename__, list(records))
+        
+        self.logger.info(f"Spooled {sum(len(records) for records in batches.values())} records from {self.name}")
+        return True
+    
+    async def throttle(self, endpoint: str, tokens: int = 1):
+        """
+        Wait for permission from the shared rate limiter before calling an API endpoint.
+        
+        Args:
+            endpoint (str): Name of the endpoint about to be called.
+            tokens (int, optional): Number of requests about to be sent. Defaults to 1.
+        """
+        await rate_limiter.acquire(self.provider, endpoint, tokens)
+    
+    def update_rate_limit(self, endpoint: str, headers: Mapping[str, str]):
+        """
+        Report the quota headers of an API response to the shared rate limiter.
+        
+        Args:
+            endpoint (str): Name of the endpoint that was called.
+            headers (Mapping[str, str]): Response headers.
+        """
+        rate_limiter.update_from_headers(self.provider, endpoint, headers)
+    
+    def is_retryable(self, error: Exception) -> bool:
+        """
+        Check if a failed API call is worth retrying.
+        
+        Args:
+            error (Exception): The error raised by the call.
+        
+        Returns:
+            bool: True if the call should be retried, False otherwise.
+        """
+        return isinstance(error, self.retryable_exceptions)
+    
+    async def call(self, endpoint: str, func: Callable, *args: Any, tokens: int = 1, **kwargs: Any) -> Any:
+        """
+        Call an API endpoint with rate limiting, retries and a circuit breaker.
+        
+        Transient errors are retried with exponential, jittered backoff. While the
+        provider's circuit breaker is open, the call fails fast with CircuitOpenError.
+        Only idempotent requests should be made through this method.
+        
+        Args:
+            endpoint (str): Name of the endpoint, used for rate limiting.
+            func (Callable): Function making the request. Blocking functions are run in a separate thread.
+            *args: Positional arguments for the function.
+            tokens (int, optional): Number of requests the call makes. Defaults to 1.
+            **kwargs: Keyword arguments for the function.
+        
+        Returns:
+            Any: The result of the function.
+        """
+        attempt = 0
+        
+        while True:
+            if not self.circuit_breaker.allow():
+                raise CircuitOpenError(f"Circuit breaker for {self.name} is open")
+            
+            # While half open, the call that was let through is the single trial call
+            trial = self.circuit_breaker.state == self.circuit_breaker.HALF_OPEN
+            
+            try:
+                await self.throttle(endpoint, tokens)
+                attempt += 1
+                
+                try:
+                    if asyncio.iscoroutinefunction(func):
+                        result = await func(*args, **kwargs)
+                    else:
+                        result = await asyncio.to_thread(func, *args, **kwargs)
+                except Exception as e:
+                    if not self.is_retryable(e):
+                        raise
+                    
+                    self.circuit_breaker.record_failure()
+                    
+                    if attempt >= self.retry_policy.max_attempts:
+                        raise
+                    
+                    delay = self.retry_policy.delay(attempt)
+                    self.circuit_breaker.retries += 1
+                    self.logger.warning(
+                        f"Transient error calling {self.name} {endpoint} (attempt {attempt}), retrying in {delay:.1f} seconds: {e}"
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+                
+                self.circuit_breaker.record_success()
+                return result
+            finally:
+                # A trial that ended without a success or failure, e.g. with a non-retryable
+                # error or cancelled by the collector timeout, mustn't keep the circuit half open
+                if trial:
+                    self.circuit_breaker.release_trial()
     
     @abstractmethod
     async def collect(self) -> List[Dict[str, Any]]:
@@ -61,6 +316,12 @@ class BaseCollector(ABC):
         """
         pass
     
+    async def close(self):
+        """
+        Release resources held by the collector, such as open connections.
+        """
+        pass
+    
     async def run(self) -> bool:
         """
         Run the collector: collect data and save it to the database.
@@ -71,9 +332,15 @@ class BaseCollector(ABC):
         try:
             self.logger.info(f"Starting data collection for {self.name}")
             start_time = datetime.now()
+            self.pending_watermarks = {}
+            self.up_to_date = False
             
             # Collect data
             data = await self.collect()
+            if not data and self.up_to_date:
+                self.logger.info(f"No new data from {self.name}")
+                self.commit_watermarks()
+                return True
             if not data:
                 self.logger.warning(f"No data collected from {self.name}")
                 return False
@@ -84,8 +351,12 @@ class BaseCollector(ABC):
             success = await self.save(data)
             if not success:
                 self.logger.error(f"Failed to save data from {self.name}")
+                self.pending_watermarks = {}
                 return False
             
+            # Only move the watermarks forward once the data is safely stored
+            self.commit_watermarks()
+            
             end_time = datetime.now()
             duration = (end_time - start_time).total_seconds()
             self.logger.info(f"Data collection for {self.name} completed in {duration:.2f} seconds")
@@ -1,14 +1,28 @@
 import os
+import re
+import json
 import asyncio
 import facebook
-import requests
-from typing import Dict, List, Any
+from collections import defaultdict
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
+from urllib.parse import urlencode, urlparse, parse_qsl
 
 from heimdal_data.collectors.base_collector import BaseCollector
-from heimdal_data.database.database import SessionLocal
 from heimdal_data.database.models import SocialEngagement
 
+# Fields requested for each post
+POST_FIELDS = 'id,message,created_time,type,shares,likes.summary(true),comments.summary(true)'
+
+# The Graph API allows at most 50 requests in a single batch call
+MAX_BATCH_SIZE = 50
+
+# Format of created_time in Graph API responses
+GRAPH_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S%z'
+
+# Graph API error codes for temporary problems and rate limiting
+TRANSIENT_ERROR_CODES = {1, 2, 4, 17, 32, 341, 613}
+
 class FacebookCollector(BaseCollector):
     """
     Collector for Facebook data.
@@ -29,6 +43,17 @@ class FacebookCollector(BaseCollector):
             self.logger.error("Facebook API credentials not found in environment variables")
             raise ValueError("Facebook API credentials not found in environment variables")
         
+        # Pages to collect posts from
+        self.page_ids = [
+            page_id.strip() for page_id in os.getenv("FACEBOOK_PAGE_IDS", "meta").split(",") if page_id.strip()
+        ]
+        
+        # Paging and batching settings
+        self.page_limit = int(os.getenv("FACEBOOK_PAGE_LIMIT", "25"))
+        self.max_pages = int(os.getenv("FACEBOOK_MAX_PAGES", "10"))
+        self.batch_size = min(int(os.getenv("FACEBOOK_BATCH_SIZE", str(MAX_BATCH_SIZE))), MAX_BATCH_SIZE)
+        self.batch_semaphore = asyncio.Semaphore(int(os.getenv("FACEBOOK_BATCH_CONCURRENCY", "4")))
+        
         # Initialize Facebook API client
         self.graph = self._init_client()
     
@@ -47,63 +72,229 @@ class FacebookCollector(BaseCollector):
             self.logger.exception(f"Error initializing Facebook Graph API client: {e}")
             raise
     
+    def is_retryable(self, error: Exception) -> bool:
+        """
+        Check if a failed Graph API call is worth retrying.
+        
+        Args:
+            error (Exception): The error raised by the call.
+        
+        Returns:
+            bool: True if the call should be retried, False otherwise.
+        """
+        if isinstance(error, facebook.GraphAPIError):
+            return error.code in TRANSIENT_ERROR_CODES
+        return super().is_retryable(error)
+    
+    def _parse_post(self, post: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convert a post from the Graph API into an engagement data item.
+        
+        Args:
+            post (Dict[str, Any]): Post as returned by the Graph API.
+        
+        Returns:
+            Dict[str, Any]: Engagement data for the post.
+        """
+        message = post.get('message', '')
+        
+        # Get engagement metrics
+        likes = post.get('likes', {}).get('summary', {}).get('total_count', 0)
+        comments = post.get('comments', {}).get('summary', {}).get('total_count', 0)
+        shares = post.get('shares', {}).get('count', 0) if 'shares' in post else 0
+        
+        return {
+            'platform': 'Facebook',
+            'post_type': post.get('type', 'unknown'),
+            'post_id': post.get('id'),
+            'likes': likes,
+            'comments': comments,
+            'shares': shares,
+            'content_snippet': message[:255] if message else '',
+            'timestamp': datetime.now()
+        }
+    
+    def _posts_url(self, page_id: str, since: Optional[str] = None, until: Optional[str] = None) -> str:
+        """
+        Build the relative URL for the first page of posts of a Facebook page.
+        
+        Args:
+            page_id (str): ID or name of the Facebook page.
+            since (str, optional): Only request posts created after this ISO timestamp. Defaults to None.
+            until (str, optional): Only request posts created at or before this ISO timestamp. Defaults to None.
+        
+        Returns:
+            str: Relative URL for use in a batch request.
+        """
+        params = {'fields': POST_FIELDS, 'limit': self.page_limit}
+        
+        if since:
+            params['since'] = int(datetime.fromisoformat(since).timestamp()) + 1
+        if until:
+            params['until'] = int(datetime.fromisoformat(until).timestamp())
+        
+        return f"{page_id}/posts?" + urlencode(params)
+    
+    @staticmethod
+    def _relative_url(url: str) -> str:
+        """
+        Convert a paging URL from the Graph API into a relative URL for a batch request.
+        
+        Args:
+            url (str): Absolute paging URL, e.g. paging.next.
+        
+        Returns:
+            str: Relative URL without the API version and access token.
+        """
+        parsed = urlparse(url)
+        path = re.sub(r'^v\d+\.\d+/', '', parsed.path.lstrip('/'))
+        
+        # The access token of the batch request is used for every request in it
+        query = [(key, value) for key, value in parse_qsl(parsed.query) if key != 'access_token']
+        
+        return f"{path}?{urlencode(query)}"
+    
+    async def _fetch_batch(self, batch: List[Tuple[str, str]]) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Fetch several Graph API requests in a single batch call.
+        
+        Args:
+            batch (List[Tuple[str, str]]): List of (page id, relative URL) pairs.
+        
+        Returns:
+            List[Tuple[str, Optional[Dict[str, Any]]]]: List of (page id, response body) pairs.
+                The body is None if the request failed.
+        """
+        async with self.batch_semaphore:
+            try:
+                # Every request in a batch counts against the quota
+                responses = await self.call(
+                    "graph",
+                    self.graph.request,
+                    "",
+                    post_args={
+                        'batch': json.dumps([
+                            {'method': 'GET', 'relative_url': relative_url}
+                            for _, relative_url in batch
+                        ])
+                    },
+                    method="POST",
+                    tokens=len(batch)
+                )
+            except Exception as e:
+                self.logger.exception(f"Error fetching batch of {len(batch)} requests from Facebook: {e}")
+                return [(page_id, None) for page_id, _ in batch]
+        
+        results = []
+        for (page_id, _), response in zip(batch, responses or []):
+            # A response is None if the request in the batch timed out
+            if not response or response.get('code') != 200:
+                self.logger.warning(f"Error fetching posts for Facebook page {page_id}: {response}")
+                results.append((page_id, None))
+                continue
+            
+            results.append((page_id, json.loads(response.get('body') or '{}')))
+        
+        return results
+    
     async def collect(self) -> List[Dict[str, Any]]:
         """
         Collect engagement data from Facebook.
         
+        The posts of all configured pages are fetched with batched Graph API requests,
+        following the paging of each page until there are no more posts or
+        FACEBOOK_MAX_PAGES is reached.
+        
+        The watermark of a page only moves once its walk has reached the old watermark.
+        If the page limit cuts the walk short, the old watermark is kept and the next run
+        continues below the oldest post collected, before collecting newer posts again.
+        
         Returns:
             List[Dict[str, Any]]: List of engagement data from Facebook posts.
         """
-        self.logger.info("Collecting engagement data from Facebook")
+        self.logger.info(f"Collecting engagement data from {len(self.page_ids)} Facebook pages")
         
         # List to store the collected data
         engagement_data = []
         
         try:
-            # Use asyncio to run the blocking Facebook API calls in a separate thread
-            # For this example, we'll get posts from a public page
-            # You would need to replace 'meta' with the page ID or name you want to fetch
-            page_id = 'meta'
-            
-            # Get the page posts
-            posts = await asyncio.to_thread(
-                self.graph.get_connections,
-                id=page_id,
-                connection_name='posts',
-                fields='id,message,created_time,type,shares,likes.summary(true),comments.summary(true)'
-            )
+            # Only request posts newer than the last run
+            watermarks = self.load_watermarks("posts")
+            resume = self.load_resume_cursors("posts")
+            newest = {}
+            oldest = {}
             
-            if not posts or 'data' not in posts:
-                self.logger.warning("No posts found")
-                return []
+            # Requests still to be made, as (page id, relative URL) pairs
+            pending = [
+                (page_id, self._posts_url(page_id, watermarks.get(page_id), resume.get(page_id, {}).get('until')))
+                for page_id in self.page_ids
+            ]
+            pages_fetched = defaultdict(int)
+            finished = set()
+            round_trips = 0
             
-            # Process each post
-            for post in posts['data']:
-                post_id = post.get('id')
-                post_type = post.get('type', 'unknown')
-                message = post.get('message', '')
-                created_time = post.get('created_time')
+            while pending:
+                # Pack the pending requests into batches and fetch them concurrently
+                batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+                pending = []
+                round_trips += len(batches)
                 
-                # Get engagement metrics
-                likes = post.get('likes', {}).get('summary', {}).get('total_count', 0)
-                comments = post.get('comments', {}).get('summary', {}).get('total_count', 0)
-                shares = post.get('shares', {}).get('count', 0) if 'shares' in post else 0
+                results = await asyncio.gather(*[self._fetch_batch(batch) for batch in batches])
                 
-                # Create a data item for this post
-                post_data = {
-                    'platform': 'Facebook',
-                    'post_type': post_type,
-                    'post_id': post_id,
-                    'likes': likes,
-                    'comments': comments,
-                    'shares': shares,
-                    'content_snippet': message[:255] if message else '',
-                    'timestamp': datetime.now()
-                }
+                for batch_results in results:
+                    for page_id, body in batch_results:
+                        if not body:
+                            continue
+                        
+                        # Process each post
+                        for post in body.get('data', []):
+                            engagement_data.append(self._parse_post(post))
+                            
+                            if post.get('created_time'):
+                                created_time = datetime.strptime(post['created_time'], GRAPH_TIME_FORMAT)
+                                newest[page_id] = max(newest.get(page_id, created_time), created_time)
+                                oldest[page_id] = min(oldest.get(page_id, created_time), created_time)
+                        
+                        # Follow the paging to the next page of posts
+                        pages_fetched[page_id] += 1
+                        next_url = body.get('paging', {}).get('next')
+                        if not next_url:
+                            finished.add(page_id)
+                        elif pages_fetched[page_id] < self.max_pages:
+                            pending.append((page_id, self._relative_url(next_url)))
+            
+            for page_id in self.page_ids:
+                # Newest post of the walk, which may have been started by an earlier run
+                walk_newest = newest.get(page_id)
+                if page_id in resume:
+                    resumed_newest = datetime.fromisoformat(resume[page_id]['newest'])
+                    walk_newest = max(walk_newest, resumed_newest) if walk_newest else resumed_newest
                 
-                engagement_data.append(post_data)
+                if page_id in finished:
+                    if walk_newest:
+                        self.stage_watermark("posts", page_id, walk_newest.isoformat())
+                    if page_id in resume:
+                        self.stage_resume_cursor("posts", page_id, None)
+                elif page_id in oldest:
+                    # Keep the old watermark, the posts between it and the oldest post are still missing
+                    self.stage_resume_cursor("posts", page_id, {
+                        'newest': walk_newest.isoformat(),
+                        'until': oldest[page_id].isoformat()
+                    })
+            
+            if not engagement_data:
+                # Nothing new is only a failure if a page couldn't be fetched
+                self.up_to_date = finished.issuperset(self.page_ids)
+                if self.up_to_date:
+                    self.logger.info("No new posts found")
+                else:
+                    self.logger.warning("No new posts found")
+                return []
             
-            self.logger.info(f"Collected engagement data from {len(engagement_data)} Facebook posts")
+            self.logger.info(
+                f"Collected engagement data from {len(engagement_data)} Facebook posts "
+                f"in {round_trips} batch requests"
+            )
             return engagement_data
         
         except Exception as e:
@@ -123,39 +314,12 @@ class FacebookCollector(BaseCollector):
         self.logger.info(f"Saving {len(data)} Facebook posts to database")
         
         try:
-            # Create a database session
-            db = SessionLocal()
-            
-            # Save each post to the database
-            for post_data in data:
-                social_engagement = SocialEngagement(
-                    platform=post_data['platform'],
-                    post_type=post_data['post_type'],
-                    post_id=post_data['post_id'],
-                    likes=post_data['likes'],
-                    comments=post_data['comments'],
-                    shares=post_data['shares'],
-                    content_snippet=post_data['content_snippet'],
-                    timestamp=post_data['timestamp']
-                )
-                
-                db.add(social_engagement)
-            
-            # Commit the changes
-            db.commit()
-            
-            # Close the session
-            db.close()
+            # Write all Facebook posts in one transaction, or spool them if the database is down
+            await self.store({SocialEngagement: data})
             
             self.logger.info(f"Successfully saved {len(data)} Facebook posts to database")
             return True
         
         except Exception as e:
             self.logger.exception(f"Error saving Facebook posts to database: {e}")
-            
-            # Rollback the session in case of error
-            if 'db' in locals():
-                db.rollback()
-                db.close()
-            
             return False
@@ -2,18 +2,23 @@ import os
 import asyncio
 import random
 from pytrends.request import TrendReq
-from typing import Dict, List, Any
+from pytrends.exceptions import ResponseError
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
 from heimdal_data.collectors.base_collector import BaseCollector
-from heimdal_data.database.database import SessionLocal
 from heimdal_data.database.models import SeoData
 
+# Google Trends accepts at most five keywords per request
+MAX_KEYWORDS_PER_REQUEST = 5
+
 class GoogleTrendsCollector(BaseCollector):
     """
     Collector for Google Trends data.
     """
     
+    retryable_exceptions = BaseCollector.retryable_exceptions + (ResponseError,)
+    
     def __init__(self):
         """
         Initialize the Google Trends collector.
@@ -31,6 +36,21 @@ class GoogleTrendsCollector(BaseCollector):
             "SEO",
             "influencer marketing"
         ]
+        
+        # Keywords can also be configured as a comma-separated list
+        if os.getenv("GOOGLE_TRENDS_KEYWORDS"):
+            self.default_keywords = [
+                keyword.strip() for keyword in os.getenv("GOOGLE_TRENDS_KEYWORDS").split(",") if keyword.strip()
+            ]
+        
+        # Keyword batching settings
+        self.chunk_size = min(
+            int(os.getenv("GOOGLE_TRENDS_CHUNK_SIZE", str(MAX_KEYWORDS_PER_REQUEST))), MAX_KEYWORDS_PER_REQUEST
+        )
+        self.semaphore = asyncio.Semaphore(int(os.getenv("GOOGLE_TRENDS_CONCURRENCY", "4")))
+        
+        # Keyword added to every chunk, so the scores of separate chunks can be put on one scale
+        self.anchor_keyword = os.getenv("GOOGLE_TRENDS_ANCHOR_KEYWORD", "").strip() or None
     
     def _init_client(self) -> TrendReq:
         """
@@ -89,56 +109,17 @@ class GoogleTrendsCollector(BaseCollector):
             return trends_data
         
         try:
-            # Use asyncio to run the blocking PyTrends calls in a separate thread
-            await asyncio.to_thread(
-                self.pytrends.build_payload,
-                kw_list=keywords,
-                cat=0,  # Category: All categories
-                timeframe='now 7-d',  # Last 7 days
-                geo='DK',  # Denmark
-                gprop=''  # Web search
-            )
+            # Split the keywords into chunks Google Trends accepts and fetch them in parallel
+            chunks, anchor = self._chunk_keywords(keywords)
+            self.logger.info(f"Fetching {len(keywords)} keywords from Google Trends in {len(chunks)} chunks")
             
-            # Get interest over time
-            interest_over_time_df = await asyncio.to_thread(
-                self.pytrends.interest_over_time
-            )
+            results = await asyncio.gather(*[self._collect_chunk(chunk, anchor) for chunk in chunks])
+            trends_data = self._rescale(results, anchor, anchor in keywords)
             
-            if interest_over_time_df.empty:
+            if not trends_data:
                 self.logger.warning("No interest over time data found")
                 return []
             
-            # Get the latest data point for each keyword
-            latest_date = interest_over_time_df.index[-1]
-            
-            for keyword in keywords:
-                if keyword in interest_over_time_df.columns:
-                    trend_score = float(interest_over_time_df[keyword].iloc[-1])
-                    
-                    # Get related queries for volume estimation
-                    related_queries = await asyncio.to_thread(
-                        self.pytrends.related_queries
-                    )
-                    
-                    # Estimate volume based on related queries (this is a rough approximation)
-                    volume = 0
-                    if keyword in related_queries and 'top' in related_queries[keyword]:
-                        top_df = related_queries[keyword]['top']
-                        if not top_df.empty:
-                            # Sum the values of related queries as a rough volume estimate
-                            volume = int(top_df['value'].sum())
-                    
-                    # Create a data item for this keyword
-                    keyword_data = {
-                        'keyword': keyword,
-                        'trend_score': trend_score,
-                        'volume': volume,
-                        'source': 'Google Trends',
-                        'timestamp': datetime.now()
-                    }
-                    
-                    trends_data.append(keyword_data)
-            
             self.logger.info(f"Collected search interest data for {len(trends_data)} keywords from Google Trends")
             return trends_data
         
@@ -149,6 +130,164 @@ class GoogleTrendsCollector(BaseCollector):
             self.logger.info("Falling back to mock data due to error")
             return await self.collect(keywords, testing_mode=True)
     
+    def _chunk_keywords(self, keywords: List[str]) -> Tuple[List[List[str]], Optional[str]]:
+        """
+        Split keywords into chunks for separate Google Trends requests.
+        
+        Google Trends scales the scores of each request to its own maximum of 100, so
+        scores from separate requests can't be compared. When the keywords don't fit in
+        one request, every chunk also gets the same anchor keyword, and the scores are
+        rescaled by its interest afterwards, see _rescale.
+        
+        Args:
+            keywords (List[str]): Keywords to fetch.
+        
+        Returns:
+            Tuple[List[List[str]], Optional[str]]: The chunks, and the anchor keyword or None for a single chunk.
+        """
+        if len(keywords) <= self.chunk_size:
+            return [keywords], None
+        
+        anchor = self.anchor_keyword or keywords[0]
+        others = [keyword for keyword in keywords if keyword != anchor]
+        size = max(self.chunk_size - 1, 1)
+        
+        return [[anchor] + others[i:i + size] for i in range(0, len(others), size)], anchor
+    
+    def _rescale(
+        self, results: List[Tuple[List[Dict[str, Any]], Optional[float]]], anchor: Optional[str], keep_anchor: bool
+    ) -> List[Dict[str, Any]]:
+        """
+        Put the scores of all chunks on the scale of the first chunk, by the interest in the anchor keyword.
+        
+        Rescaled scores can be above 100. Chunks in which the anchor has no interest can't
+        be rescaled and are left out.
+        
+        Args:
+            results (List[Tuple[List[Dict[str, Any]], Optional[float]]]): Search interest data and
+                mean interest in the anchor, per chunk.
+            anchor (str, optional): Anchor keyword, or None if there is a single chunk.
+            keep_anchor (bool): Whether the anchor was requested itself and is returned once.
+        
+        Returns:
+            List[Dict[str, Any]]: Search interest data of all chunks.
+        """
+        if anchor is None:
+            return [item for chunk_data, _ in results for item in chunk_data]
+        
+        reference = next((interest for chunk_data, interest in results if chunk_data and interest), None)
+        trends_data = []
+        
+        for chunk_data, interest in results:
+            if chunk_data and not interest:
+                self.logger.warning(
+                    f"No interest in anchor keyword '{anchor}', leaving out {[item['keyword'] for item in chunk_data]}"
+                )
+                continue
+            
+            for item in chunk_data:
+                if item['keyword'] == anchor:
+                    if not keep_anchor:
+                        continue
+                    keep_anchor = False
+                
+                item['trend_score'] = round(item['trend_score'] * reference / interest, 2)
+                trends_data.append(item)
+        
+        return trends_data
+    
+    async def _collect_chunk(
+        self, keywords: List[str], anchor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[float]]:
+        """
+        Collect search interest data for a chunk of at most five keywords.
+        
+        Args:
+            keywords (List[str]): Keywords in the chunk.
+            anchor (str, optional): Anchor keyword in the chunk. Defaults to None.
+        
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[float]]: List of search interest data for the keywords,
+                and the mean interest in the anchor.
+        """
+        async with self.semaphore:
+            try:
+                # One request for the payload, one for interest over time and one per keyword for related queries
+                return await self.call("api", self._fetch_chunk, keywords, anchor, tokens=2 + len(keywords))
+            except Exception as e:
+                self.logger.exception(f"Error collecting search interest data for {keywords}: {e}")
+                return [], None
+    
+    def _fetch_chunk(
+        self, keywords: List[str], anchor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[float]]:
+        """
+        Fetch interest over time and related queries for a chunk of keywords.
+        
+        Each chunk uses its own PyTrends client, so chunks can be fetched in parallel
+        on separate sessions. The payload is built and fetched only once per chunk.
+        
+        Args:
+            keywords (List[str]): Keywords in the chunk.
+            anchor (str, optional): Anchor keyword in the chunk. Defaults to None.
+        
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[float]]: List of search interest data for the keywords,
+                and the mean interest in the anchor over the timeframe, or None without an anchor.
+        """
+        pytrends = self._init_client()
+        
+        pytrends.build_payload(
+            kw_list=keywords,
+            cat=0,  # Category: All categories
+            timeframe='now 7-d',  # Last 7 days
+            geo='DK',  # Denmark
+            gprop=''  # Web search
+        )
+        
+        # Get interest over time
+        interest_over_time_df = pytrends.interest_over_time()
+        
+        if interest_over_time_df.empty:
+            self.logger.warning(f"No interest over time data found for {keywords}")
+            return [], None
+        
+        # Get related queries for volume estimation, once for the whole chunk
+        related_queries = pytrends.related_queries()
+        
+        trends_data = []
+        
+        for keyword in keywords:
+            if keyword not in interest_over_time_df.columns:
+                continue
+            
+            # Get the latest data point for the keyword
+            trend_score = float(interest_over_time_df[keyword].iloc[-1])
+            
+            # Estimate volume based on related queries (this is a rough approximation)
+            volume = 0
+            if keyword in related_queries and related_queries[keyword] and 'top' in related_queries[keyword]:
+                top_df = related_queries[keyword]['top']
+                if top_df is not None and not top_df.empty:
+                    # Sum the values of related queries as a rough volume estimate
+                    volume = int(top_df['value'].sum())
+            
+            # Create a data item for this keyword
+            trends_data.append({
+                'keyword': keyword,
+                'trend_score': trend_score,
+                'volume': volume,
+                'source': 'Google Trends',
+                'timestamp': datetime.now()
+            })
+        
+        # The mean over the timeframe is steadier than the latest data point
+        anchor_interest = None
+        if anchor and anchor in interest_over_time_df.columns:
+            anchor_interest = float(interest_over_time_df[anchor].mean())
+        
+        return trends_data, anchor_interest
+    
     async def save(self, data: List[Dict[str, Any]]) -> bool:
         """
         Save the collected Google Trends data to the database.
@@ -162,36 +301,12 @@ class GoogleTrendsCollector(BaseCollector):
         self.logger.info(f"Saving {len(data)} keywords to database")
         
         try:
-            # Create a database session
-            db = SessionLocal()
-            
-            # Save each keyword to the database
-            for keyword_data in data:
-                seo_data = SeoData(
-                    keyword=keyword_data['keyword'],
-                    trend_score=keyword_data['trend_score'],
-                    volume=keyword_data['volume'],
-                    source=keyword_data['source'],
-                    timestamp=keyword_data['timestamp']
-                )
-                
-                db.add(seo_data)
-            
-            # Commit the changes
-            db.commit()
-            
-            # Close the session
-            db.close()
+            # Write all keywords in one transaction, or spool them if the database is down
+            await self.store({SeoData: data})
             
             self.logger.info(f"Successfully saved {len(data)} keywords to database")
             return True
         
         except Exception as e:
             self.logger.exception(f"Error saving keywords to database: {e}")
-            
-            # Rollback the session in case of error
-            if 'db' in locals():
-                db.rollback()
-                db.close()
-            
             return False
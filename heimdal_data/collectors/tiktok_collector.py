@@ -1,12 +1,14 @@
 import os
 import asyncio
-import requests
-from typing import Dict, List, Any
+from typing import Dict, List, Any, AsyncIterator, Optional
 from datetime import datetime
 
+import httpx
+
 from heimdal_data.collectors.base_collector import BaseCollector
-from heimdal_data.database.database import SessionLocal
 from heimdal_data.database.models import HashtagTrend, SocialEngagement
+from heimdal_data.utils.http_client import AsyncHTTPClient
+from heimdal_data.utils.resilience import TransientError
 
 class TikTokCollector(BaseCollector):
     """
@@ -35,6 +37,49 @@ class TikTokCollector(BaseCollector):
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}"
         }
+        
+        # Shared HTTP client, reused for all requests during the collector lifetime
+        self.http = AsyncHTTPClient(base_url=self.base_url, headers=self.headers)
+        
+        # Account the videos are listed for, used to key the collection watermark
+        self.account = os.getenv("TIKTOK_ACCOUNT", "default")
+        
+        # Video pagination settings
+        self.page_size = int(os.getenv("TIKTOK_PAGE_SIZE", "20"))
+        self.max_pages = int(os.getenv("TIKTOK_MAX_PAGES", "50"))
+        self.max_items = int(os.getenv("TIKTOK_MAX_ITEMS", "1000"))
+        
+        # Whether videos are saved page by page while they are being fetched
+        self.stream_videos = os.getenv("TIKTOK_STREAM_VIDEOS", "true").lower() == "true"
+    
+    async def close(self):
+        """
+        Close the HTTP client and its pooled connections.
+        """
+        await self.http.aclose()
+    
+    async def _get(self, endpoint: str, **kwargs: Any) -> httpx.Response:
+        """
+        Send a GET request to the TikTok API with rate limiting and retries.
+        
+        Args:
+            endpoint (str): Endpoint relative to the base URL, e.g. "video/list".
+            **kwargs: Additional arguments for the request (params, ...).
+        
+        Returns:
+            httpx.Response: The response.
+        """
+        async def request() -> httpx.Response:
+            response = await self.http.get(f"/{endpoint}", **kwargs)
+            self.update_rate_limit(endpoint, response.headers)
+            
+            # Rate limiting and server errors are worth retrying
+            if response.status_code == 429 or response.status_code >= 500:
+                raise TransientError(f"TikTok API returned {response.status_code} for {endpoint}")
+            
+            return response
+        
+        return await self.call(endpoint, request)
     
     async def collect_trending_hashtags(self) -> List[Dict[str, Any]]:
         """
@@ -49,13 +94,8 @@ class TikTokCollector(BaseCollector):
         hashtags_data = []
         
         try:
-            # Use asyncio to run the blocking requests in a separate thread
             # Note: This is a simulated endpoint, as TikTok's API structure may differ
-            response = await asyncio.to_thread(
-                requests.get,
-                f"{self.base_url}/hashtag/trending",
-                headers=self.headers
-            )
+            response = await self._get("hashtag/trending")
             
             if response.status_code != 200:
                 self.logger.error(f"Error from TikTok API: {response.status_code} - {response.text}")
@@ -93,6 +133,151 @@ class TikTokCollector(BaseCollector):
             self.logger.exception(f"Error collecting trending hashtags from TikTok: {e}")
             return []
     
+    def _parse_video(self, video: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convert a video from the TikTok API into an engagement data item.
+        
+        Args:
+            video (Dict[str, Any]): Video as returned by the TikTok API.
+        
+        Returns:
+            Dict[str, Any]: Engagement data for the video.
+        """
+        description = video.get('description', '')
+        
+        return {
+            'platform': 'TikTok',
+            'post_type': 'video',
+            'post_id': video.get('id', ''),
+            'likes': video.get('like_count', 0),
+            'comments': video.get('comment_count', 0),
+            'shares': video.get('share_count', 0),
+            'reach': video.get('view_count', 0),
+            'content_snippet': description[:255] if description else '',
+            'timestamp': datetime.now()
+        }
+    
+    async def _fetch_video_page(self, cursor: int) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a single page of videos from TikTok.
+        
+        Args:
+            cursor (int): Cursor of the page to fetch.
+        
+        Returns:
+            Optional[Dict[str, Any]]: The videos, the cursor of the next page and whether there are
+                more pages, or None if the page couldn't be fetched.
+        """
+        # Note: This is a simulated endpoint, as TikTok's API structure may differ
+        response = await self._get(
+            "video/list",
+            params={"count": self.page_size, "cursor": cursor}
+        )
+        
+        if response.status_code != 200:
+            self.logger.error(f"Error from TikTok API: {response.status_code} - {response.text}")
+            return None
+        
+        data = response.json()
+        
+        if not data or 'data' not in data or 'videos' not in data['data']:
+            return None
+        
+        return {
+            'videos': data['data']['videos'],
+            'cursor': data['data'].get('cursor'),
+            'has_more': bool(data['data'].get('has_more', False))
+        }
+    
+    async def iter_engagement_pages(
+        self, max_pages: Optional[int] = None, max_items: Optional[int] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Stream engagement data from TikTok videos one page at a time.
+        
+        Follows the API cursor until there are no more pages, a limit is reached or
+        a video older than the stored watermark is found. Videos are listed newest first,
+        so everything after the watermark was already collected by an earlier run.
+        The next page is fetched while the caller processes the current one.
+        
+        If a limit cuts the walk short, the watermark is kept and a resume cursor is
+        stored instead, so the next run continues the walk down to the watermark before
+        collecting newer videos again.
+        
+        Args:
+            max_pages (int, optional): Maximum number of pages to fetch. Defaults to TIKTOK_MAX_PAGES.
+            max_items (int, optional): Maximum number of videos to fetch. Defaults to TIKTOK_MAX_ITEMS.
+        
+        Yields:
+            List[Dict[str, Any]]: Engagement data for the videos of one page.
+        """
+        max_pages = max_pages or self.max_pages
+        max_items = max_items or self.max_items
+        
+        # Create time of the newest video collected by the last run
+        watermark = self.load_watermarks("video/list").get(self.account)
+        since = int(watermark) if watermark else None
+        
+        # Continue a walk an earlier run couldn't finish
+        resume = self.load_resume_cursors("video/list").get(self.account)
+        cursor = resume['cursor'] if resume else 0
+        newest = resume['newest'] if resume else since
+        
+        pages = 0
+        items = 0
+        finished = False
+        next_page = asyncio.ensure_future(self._fetch_video_page(cursor))
+        
+        try:
+            while next_page is not None:
+                page = await next_page
+                next_page = None
+                
+                if not page:
+                    break
+                
+                # Skip videos that were collected by an earlier run
+                videos = [
+                    video for video in page['videos']
+                    if since is None or int(video.get('create_time', 0)) > since
+                ]
+                reached_watermark = len(videos) < len(page['videos'])
+                
+                finished = reached_watermark or not page['has_more'] or page['cursor'] is None
+                
+                # A page cut by the item limit is fetched again by the next run
+                if len(videos) > max_items - items:
+                    videos = videos[:max_items - items]
+                    finished = False
+                else:
+                    cursor = page['cursor']
+                pages += 1
+                items += len(videos)
+                
+                for video in videos:
+                    if video.get('create_time'):
+                        newest = max(newest or 0, int(video['create_time']))
+                
+                # Prefetch the next page while the current one is being processed
+                if not finished and pages < max_pages and items < max_items:
+                    next_page = asyncio.ensure_future(self._fetch_video_page(cursor))
+                
+                if videos:
+                    yield [self._parse_video(video) for video in videos]
+            
+            if finished:
+                if newest is not None and newest != since:
+                    self.stage_watermark("video/list", self.account, str(newest))
+                if resume:
+                    self.stage_resume_cursor("video/list", self.account, None)
+            elif pages:
+                # Keep the watermark, the videos between it and the cursor are still missing
+                self.stage_resume_cursor("video/list", self.account, {'newest': newest, 'cursor': cursor})
+        finally:
+            # Don't leave a prefetch running if the caller stops early
+            if next_page is not None and not next_page.done():
+                next_page.cancel()
+    
     async def collect_engagement_data(self) -> List[Dict[str, Any]]:
         """
         Collect engagement data from TikTok videos.
@@ -106,51 +291,13 @@ class TikTokCollector(BaseCollector):
         engagement_data = []
         
         try:
-            # Use asyncio to run the blocking requests in a separate thread
-            # Note: This is a simulated endpoint, as TikTok's API structure may differ
-            response = await asyncio.to_thread(
-                requests.get,
-                f"{self.base_url}/video/list",
-                headers=self.headers,
-                params={"count": 20, "cursor": 0}  # Get the latest 20 videos
-            )
+            async for page in self.iter_engagement_pages():
+                engagement_data.extend(page)
             
-            if response.status_code != 200:
-                self.logger.error(f"Error from TikTok API: {response.status_code} - {response.text}")
-                return []
-            
-            data = response.json()
-            
-            if not data or 'data' not in data or 'videos' not in data['data']:
+            if not engagement_data:
                 self.logger.warning("No videos found")
                 return []
             
-            # Process each video
-            for video in data['data']['videos']:
-                video_id = video.get('id', '')
-                description = video.get('description', '')
-                
-                # Get engagement metrics
-                likes = video.get('like_count', 0)
-                comments = video.get('comment_count', 0)
-                shares = video.get('share_count', 0)
-                views = video.get('view_count', 0)
-                
-                # Create a data item for this video
-                video_data = {
-                    'platform': 'TikTok',
-                    'post_type': 'video',
-                    'post_id': video_id,
-                    'likes': likes,
-                    'comments': comments,
-                    'shares': shares,
-                    'reach': views,
-                    'content_snippet': description[:255] if description else '',
-                    'timestamp': datetime.now()
-                }
-                
-                engagement_data.append(video_data)
-            
             self.logger.info(f"Collected engagement data from {len(engagement_data)} TikTok videos")
             return engagement_data
         
@@ -158,6 +305,67 @@ class TikTokCollector(BaseCollector):
             self.logger.exception(f"Error collecting engagement data from TikTok videos: {e}")
             return []
     
+    async def stream_engagement_data(self) -> bool:
+        """
+        Collect engagement data from TikTok videos and save it page by page.
+        
+        Each page is written to the database in a separate thread while the next page
+        is being fetched, so memory use doesn't grow with the number of videos.
+        
+        Returns:
+            bool: True if all pages were saved successfully, False otherwise.
+        """
+        self.logger.info("Streaming engagement data from TikTok videos")
+        
+        saved = 0
+        
+        try:
+            async for page in self.iter_engagement_pages():
+                if not await self.save({'engagement': page}):
+                    return False
+                saved += len(page)
+        except Exception as e:
+            self.logger.exception(f"Error streaming engagement data from TikTok videos: {e}")
+            return False
+        
+        self.logger.info(f"Streamed engagement data from {saved} TikTok videos")
+        return True
+    
+    async def run(self) -> bool:
+        """
+        Run the collector.
+        
+        In streaming mode the trending hashtags are saved as one batch and the videos
+        are saved page by page as they are fetched.
+        
+        Returns:
+            bool: True if the collection and saving was successful, False otherwise.
+        """
+        if not self.stream_videos:
+            return await super().run()
+        
+        try:
+            self.logger.info(f"Starting streaming data collection for {self.name}")
+            start_time = datetime.now()
+            self.pending_watermarks = {}
+            
+            hashtags_data = await self.collect_trending_hashtags()
+            hashtags_saved = not hashtags_data or await self.save({'hashtags': hashtags_data})
+            
+            videos_saved = await self.stream_engagement_data()
+            
+            # Only move the watermark forward once every page is stored
+            if hashtags_saved and videos_saved:
+                self.commit_watermarks()
+            
+            duration = (datetime.now() - start_time).total_seconds()
+            self.logger.info(f"Data collection for {self.name} completed in {duration:.2f} seconds")
+            
+            return hashtags_saved and videos_saved
+        except Exception as e:
+            self.logger.exception(f"Error in {self.name} collector: {e}")
+            return False
+    
     async def collect(self) -> List[Dict[str, Any]]:
         """
         Collect data from TikTok.
@@ -192,57 +400,24 @@ class TikTokCollector(BaseCollector):
         self.logger.info("Saving TikTok data to database")
         
         try:
-            # Create a database session
-            db = SessionLocal()
+            batches = {}
             
             # Save hashtags data
             if 'hashtags' in data and data['hashtags']:
                 self.logger.info(f"Saving {len(data['hashtags'])} hashtags to database")
-                
-                for hashtag_data in data['hashtags']:
-                    hashtag_trend = HashtagTrend(
-                        platform=hashtag_data['platform'],
-                        hashtag=hashtag_data['hashtag'],
-                        engagement=hashtag_data['engagement'],
-                        timestamp=hashtag_data['timestamp']
-                    )
-                    
-                    db.add(hashtag_trend)
+                batches[HashtagTrend] = data['hashtags']
             
             # Save engagement data
             if 'engagement' in data and data['engagement']:
                 self.logger.info(f"Saving {len(data['engagement'])} videos to database")
-                
-                for video_data in data['engagement']:
-                    social_engagement = SocialEngagement(
-                        platform=video_data['platform'],
-                        post_type=video_data['post_type'],
-                        post_id=video_data['post_id'],
-                        likes=video_data['likes'],
-                        comments=video_data['comments'],
-                        shares=video_data['shares'],
-                        reach=video_data['reach'],
-                        content_snippet=video_data['content_snippet'],
-                        timestamp=video_data['timestamp']
-                    )
-                    
-                    db.add(social_engagement)
-            
-            # Commit the changes
-            db.commit()
-            
-            # Close the session
-            db.close()
+                batches[SocialEngagement] = data['engagement']
+            
+            # Write both batches in one transaction, or spool them if the database is down
+            await self.store(batches)
             
             self.logger.info("Successfully saved TikTok data to database")
             return True
         
         except Exception as e:
             self.logger.exception(f"Error saving TikTok data to database: {e}")
-            
-            # Rollback the session in case of error
-            if 'db' in locals():
-                db.rollback()
-                db.close()
-            
             return False
@@ -2,18 +2,35 @@ import os
 import tweepy
 import asyncio
 from typing import Dict, List, Any
-from datetime import datetime
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 
 from heimdal_data.collectors.base_collector import BaseCollector
-from heimdal_data.database.database import SessionLocal
 from heimdal_data.database.models import HashtagTrend
 
+# Named trend locations, mapped to Yahoo! Where On Earth IDs (WOEIDs)
+TREND_LOCATIONS = {
+    'worldwide': [1],
+    'denmark': [23424796],
+    'sweden': [23424954],
+    'norway': [23424910],
+    'finland': [23424812],
+    'nordics': [23424796, 23424954, 23424910, 23424812],
+    'germany': [23424829],
+    'united kingdom': [23424975],
+    'united states': [23424977]
+}
+
 class TwitterCollector(BaseCollector):
     """
     Collector for Twitter data.
     """
     
+    retryable_exceptions = BaseCollector.retryable_exceptions + (
+        tweepy.TwitterServerError,
+        tweepy.TooManyRequests
+    )
+    
     def __init__(self):
         """
         Initialize the Twitter collector.
@@ -31,6 +48,15 @@ class TwitterCollector(BaseCollector):
             self.logger.error("Twitter API credentials not found in environment variables")
             raise ValueError("Twitter API credentials not found in environment variables")
         
+        # Locations to collect trending hashtags for
+        self.woeids = self._parse_locations(os.getenv("TWITTER_TREND_LOCATIONS", "worldwide"))
+        
+        # Minimum number of seconds before the trends of a location are fetched again
+        self.refresh_interval = int(os.getenv("TWITTER_TRENDS_REFRESH_INTERVAL", "900"))
+        
+        # Limit the number of concurrent requests to the trends endpoint
+        self.semaphore = asyncio.Semaphore(int(os.getenv("TWITTER_TREND_CONCURRENCY", "3")))
+        
         # Initialize Twitter API client
         self.client = self._init_client()
     
@@ -55,51 +81,129 @@ class TwitterCollector(BaseCollector):
             self.logger.exception(f"Error initializing Twitter API client: {e}")
             raise
     
-    async def collect(self) -> List[Dict[str, Any]]:
+    def _parse_locations(self, value: str) -> List[int]:
         """
-        Collect trending hashtags from Twitter.
+        Parse a comma-separated list of trend locations.
+        
+        Unknown location names are logged and skipped. If no location is valid,
+        the worldwide trends are collected.
+        
+        Args:
+            value (str): Location names from TREND_LOCATIONS or WOEIDs, e.g. "denmark,nordics,2459115".
         
         Returns:
-            List[Dict[str, Any]]: List of trending hashtags with engagement data.
+            List[int]: Unique WOEIDs in the given order.
+        """
+        woeids = []
+        
+        for location in value.split(","):
+            location = location.strip().lower()
+            if not location:
+                continue
+            
+            if location in TREND_LOCATIONS:
+                woeids.extend(TREND_LOCATIONS[location])
+            elif location.isdigit():
+                woeids.append(int(location))
+            else:
+                self.logger.warning(
+                    f"Unknown trend location '{location}', expected a WOEID or one of: {', '.join(TREND_LOCATIONS)}"
+                )
+        
+        if not woeids:
+            self.logger.warning("No valid trend locations configured, collecting worldwide trends")
+            woeids = list(TREND_LOCATIONS['worldwide'])
+        
+        return list(dict.fromkeys(woeids))
+    
+    async def _collect_location(self, woeid: int) -> List[Dict[str, Any]]:
         """
-        self.logger.info("Collecting trending hashtags from Twitter")
+        Collect trending hashtags for a single location.
+        
+        Args:
+            woeid (int): Yahoo! Where On Earth ID of the location.
+        
+        Returns:
+            List[Dict[str, Any]]: List of trending hashtags for the location.
+        """
+        async with self.semaphore:
+            try:
+                trends = await self.call(
+                    "trends/place", self.client.get_place_trends, id=woeid
+                )
+            except Exception as e:
+                self.logger.exception(f"Error collecting trending hashtags for location {woeid}: {e}")
+                return []
+        
+        if not trends or not trends.data:
+            self.logger.warning(f"No trending topics found for location {woeid}")
+            return []
+        
+        # Remember when this location's trends were fetched
+        self.stage_watermark("trends/place", str(woeid), datetime.now().isoformat())
         
-        # List to store the collected data
         hashtags_data = []
         
+        # Process each trending topic
+        for trend in trends.data:
+            # Skip non-hashtag trends
+            if not trend['name'].startswith('#'):
+                continue
+            
+            hashtag = trend['name'].lstrip('#')
+            tweet_volume = trend.get('tweet_volume', 0)
+            
+            # Create a data item for this hashtag
+            hashtags_data.append({
+                'platform': 'Twitter',
+                'hashtag': hashtag,
+                'engagement': tweet_volume if tweet_volume else 0,
+                'timestamp': datetime.now()
+            })
+        
+        return hashtags_data
+    
+    async def collect(self) -> List[Dict[str, Any]]:
+        """
+        Collect trending hashtags from Twitter.
+        
+        All configured locations are fetched concurrently, and hashtags trending in
+        several locations are merged into one item with the highest tweet volume.
+        
+        Returns:
+            List[Dict[str, Any]]: List of trending hashtags with engagement data.
+        """
         try:
-            # Get available trend locations (WOEIDs)
-            # For simplicity, we'll use the worldwide trends (WOEID 1)
-            woeid = 1  # Worldwide
+            # Trends are snapshots without a since_id, so skip locations whose snapshot is still fresh
+            watermarks = self.load_watermarks("trends/place")
+            refresh_after = datetime.now() - timedelta(seconds=self.refresh_interval)
+            woeids = [
+                woeid for woeid in self.woeids
+                if str(woeid) not in watermarks or datetime.fromisoformat(watermarks[str(woeid)]) <= refresh_after
+            ]
             
-            # Use asyncio to run the blocking Tweepy calls in a separate thread
-            trends = await asyncio.to_thread(
-                self.client.get_place_trends, id=woeid
-            )
+            if not woeids:
+                self.logger.info("Trending hashtags for all locations are up to date")
+                self.up_to_date = True
+                return []
+            
+            self.logger.info(f"Collecting trending hashtags from Twitter for {len(woeids)} locations")
             
-            if not trends or not trends.data:
+            results = await asyncio.gather(*[self._collect_location(woeid) for woeid in woeids])
+            
+            # Merge hashtags trending in several locations
+            merged = {}
+            for hashtags_data in results:
+                for hashtag_data in hashtags_data:
+                    key = hashtag_data['hashtag'].lower()
+                    if key not in merged or hashtag_data['engagement'] > merged[key]['engagement']:
+                        merged[key] = hashtag_data
+            
+            if not merged:
                 self.logger.warning("No trending topics found")
                 return []
             
-            # Process each trending topic
-            for trend in trends.data:
-                # Skip non-hashtag trends
-                if not trend['name'].startswith('#'):
-                    continue
-                
-                hashtag = trend['name'].lstrip('#')
-                tweet_volume = trend.get('tweet_volume', 0)
-                
-                # Create a data item for this hashtag
-                hashtag_data = {
-                    'platform': 'Twitter',
-                    'hashtag': hashtag,
-                    'engagement': tweet_volume if tweet_volume else 0,
-                    'timestamp': datetime.now()
-                }
-                
-                hashtags_data.append(hashtag_data)
-            
+            hashtags_data = list(merged.values())
             self.logger.info(f"Collected {len(hashtags_data)} trending hashtags from Twitter")
             return hashtags_data
         
@@ -120,35 +224,12 @@ class TwitterCollector(BaseCollector):
         self.logger.info(f"Saving {len(data)} hashtags to database")
         
         try:
-            # Create a database session
-            db = SessionLocal()
-            
-            # Save each hashtag to the database
-            for hashtag_data in data:
-                hashtag_trend = HashtagTrend(
-                    platform=hashtag_data['platform'],
-                    hashtag=hashtag_data['hashtag'],
-                    engagement=hashtag_data['engagement'],
-                    timestamp=hashtag_data['timestamp']
-                )
-                
-                db.add(hashtag_trend)
-            
-            # Commit the changes
-            db.commit()
-            
-            # Close the session
-            db.close()
+            # Write all hashtags in one transaction, or spool them if the database is down
+            await self.store({HashtagTrend: data})
             
             self.logger.info(f"Successfully saved {len(data)} hashtags to database")
             return True
         
         except Exception as e:
             self.logger.exception(f"Error saving hashtags to database: {e}")
-            
-            # Rollback the session in case of error
-            if 'db' in locals():
-                db.rollback()
-                db.close()
-            
             return False
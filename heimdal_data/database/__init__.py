@@ -1,7 +1,27 @@
-from .database import engine, SessionLocal, get_db, init_db, check_db_connection
-from .models import Base, HashtagTrend, SocialEngagement, SeoData
+from .database import (
+    engine, SessionLocal, get_db, async_engine, AsyncSessionLocal, get_async_db, reader_session,
+    reader_engines, database_pool_stats, init_db, run_migrations, check_db_connection, close_db
+)
+from .models import (
+    Base, Term, HashtagTrend, SocialEngagement, SeoData, CollectorWatermark, HashtagTrendRollup, EngagementRollup
+)
+from .watermarks import get_watermark, get_watermarks, set_watermarks
+from .generations import DatasetGenerations, dataset_generations
+from .terms import TermCache
+from .bulk import BulkWriter, bulk_writer
+from .partitions import ensure_partitions, apply_retention, maintain_partitions
+from .rollups import refresh_rollups, rebuild_rollups
+from .compaction import compact, compact_table
+from .archive import archive, query_archive
 
 __all__ = [
-    'engine', 'SessionLocal', 'get_db', 'init_db', 'check_db_connection',
-    'Base', 'HashtagTrend', 'SocialEngagement', 'SeoData'
+    'engine', 'SessionLocal', 'get_db', 'async_engine', 'AsyncSessionLocal', 'get_async_db', 'reader_session',
+    'reader_engines', 'database_pool_stats', 'init_db', 'run_migrations', 'check_db_connection', 'close_db',
+    'Base', 'Term', 'HashtagTrend', 'SocialEngagement', 'SeoData', 'CollectorWatermark', 'HashtagTrendRollup', 'EngagementRollup',
+    'get_watermark', 'get_watermarks', 'set_watermarks', 'DatasetGenerations', 'dataset_generations',
+    'TermCache', 'BulkWriter', 'bulk_writer',
+    'ensure_partitions', 'apply_retention', 'maintain_partitions',
+    'refresh_rollups', 'rebuild_rollups',
+    'compact', 'compact_table',
+    'archive', 'query_archive'
 ]
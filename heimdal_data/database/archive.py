@@ -0,0 +1,522 @@
+import os
+import heapq
+import logging
+from datetime import date, datetime, timezone
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+from sqlalchemy import select, delete, func, text, and_, BigInteger, Integer, Float, DateTime
+
+from .database import engine, PROJECT_DIR
+from .models import HashtagTrend, SocialEngagement, SeoData
+from .terms import select_with_terms
+from .partitions import month_start, add_months, is_partitioned, list_partitions
+from .generations import dataset_generations
+
+logger = logging.getLogger("archive")
+
+# Where the archive is stored, a local directory or an object storage URI such as s3://bucket/prefix
+ARCHIVE_URI = os.getenv("ARCHIVE_URI", "") or os.path.join(PROJECT_DIR, "archive")
+
+# Number of months kept in the database, older closed months are archived, 0 to keep everything
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", "0"))
+
+# Compression codec of the Parquet files
+ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "zstd")
+
+# Number of rows fetched from the database and written per Parquet row group
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "50000"))
+
+# Number of archived rows deleted from the database per statement
+ARCHIVE_DELETE_BATCH_SIZE = int(os.getenv("ARCHIVE_DELETE_BATCH_SIZE", "10000"))
+
+# How each table is archived
+ARCHIVE_TABLES = {
+    "hashtag_trends": {
+        "model": HashtagTrend,
+        # Column deciding which month a row belongs to, the partition column on PostgreSQL
+        "time": "bucket"
+    },
+    "social_engagement": {
+        "model": SocialEngagement,
+        "time": "timestamp"
+    },
+    "seo_data": {
+        "model": SeoData,
+        "time": "timestamp"
+    }
+}
+
+def archive_filesystem(uri: Optional[str] = None) -> Tuple[pafs.FileSystem, str]:
+    """
+    Get the filesystem and root path of the archive.
+    
+    Args:
+        uri (str, optional): Local directory or object storage URI. Defaults to ARCHIVE_URI.
+    
+    Returns:
+        Tuple[pafs.FileSystem, str]: The filesystem and the root path on it.
+    """
+    uri = uri or ARCHIVE_URI
+    if "://" not in uri:
+        uri = os.path.abspath(uri)
+    
+    return pafs.FileSystem.from_uri(uri)
+
+def arrow_type(column_type) -> pa.DataType:
+    """
+    Get the Arrow type for a SQLAlchemy column type.
+    
+    Args:
+        column_type: SQLAlchemy column type.
+    
+    Returns:
+        pa.DataType: The Arrow type. Times are stored in UTC.
+    """
+    if isinstance(column_type, BigInteger):
+        return pa.int64()
+    if isinstance(column_type, Integer):
+        return pa.int32()
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us", tz="UTC")
+    return pa.string()
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Convert a time read from the database to UTC.
+    
+    Args:
+        value (datetime, optional): Time, naive times are taken as local time.
+    
+    Returns:
+        Optional[datetime]: The time in UTC.
+    """
+    return value.astimezone(timezone.utc) if value is not None else None
+
+def export_query(table_name: str, start: datetime, end: datetime):
+    """
+    Build the query for the rows of a table in a range of time, with term ids replaced by their text.
+    
+    The text is written instead of the ids, so the archive doesn't depend on the terms table.
+    
+    Args:
+        table_name (str): Name of a table in ARCHIVE_TABLES.
+        start (datetime): Start of the range.
+        end (datetime): End of the range.
+    
+    Returns:
+        Tuple[Select, pa.Schema]: The query, ordered by id, and the schema of its rows.
+    """
+    spec = ARCHIVE_TABLES[table_name]
+    table = spec["model"].__table__
+    time_column = table.c[spec["time"]]
+    
+    query = select_with_terms(table).where(and_(time_column >= start, time_column < end)).order_by(table.c.id)
+    fields = [pa.field(name, arrow_type(column.type)) for name, column in query.selected_columns.items()]
+    
+    return query, pa.schema(fields)
+
+def _record_batch(rows: List[Any], schema: pa.Schema) -> pa.RecordBatch:
+    """
+    Convert database rows to an Arrow record batch.
+    
+    Args:
+        rows (List[Any]): Rows in schema order.
+        schema (pa.Schema): Schema of the rows.
+    
+    Returns:
+        pa.RecordBatch: The rows.
+    """
+    arrays = []
+    
+    for index, field in enumerate(schema):
+        values = [row[index] for row in rows]
+        if pa.types.is_timestamp(field.type):
+            values = [_utc(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def _month_range(month: date) -> Tuple[datetime, datetime]:
+    """
+    Get the start and end of a month.
+    
+    Args:
+        month (date): First day of the month.
+    
+    Returns:
+        Tuple[datetime, datetime]: Start of the month and start of the next month.
+    """
+    return datetime.combine(month, datetime.min.time()), datetime.combine(add_months(month, 1), datetime.min.time())
+
+def export_month(table_name: str, month: date, uri: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Write the rows of a table in one month to a Parquet file.
+    
+    Rows are streamed from a server-side cursor and written one row group at a time,
+    so memory use doesn't depend on the size of the month. The file is named after
+    the range of ids it holds, so exporting the same rows again overwrites it.
+    
+    Args:
+        table_name (str): Name of a table in ARCHIVE_TABLES.
+        month (date): First day of the month.
+        uri (str, optional): Archive location. Defaults to ARCHIVE_URI.
+    
+    Returns:
+        Optional[Dict[str, Any]]: Path, number of rows and sum of the ids of the file, or None if the month is empty.
+    """
+    filesystem, root = archive_filesystem(uri)
+    start, end = _month_range(month)
+    query, schema = export_query(table_name, start, end)
+    
+    directory = f"{root}/{table_name}/month={month:%Y-%m}"
+    # Files starting with an underscore are skipped when the archive is read
+    staging_path = f"{directory}/_export-{os.getpid()}.parquet"
+    filesystem.create_dir(directory, recursive=True)
+    
+    rows = 0
+    id_sum = 0
+    first_id = last_id = None
+    writer = None
+    
+    try:
+        with engine.connect() as connection:
+            result = connection.execution_options(stream_results=True).execute(query)
+            
+            for partition in result.partitions(ARCHIVE_BATCH_SIZE):
+                batch = _record_batch(partition, schema)
+                ids = batch.column(schema.get_field_index("id"))
+                
+                if writer is None:
+                    writer = pq.ParquetWriter(
+                        staging_path, schema, filesystem=filesystem,
+                        compression=ARCHIVE_COMPRESSION, use_dictionary=True
+                    )
+                    first_id = ids[0].as_py()
+                
+                writer.write_batch(batch)
+                rows += len(batch)
+                id_sum += pc.sum(ids).as_py()
+                last_id = ids[-1].as_py()
+    finally:
+        if writer is not None:
+            writer.close()
+    
+    if not rows:
+        return None
+    
+    path = f"{directory}/part-{first_id}-{last_id}.parquet"
+    filesystem.move(staging_path, path)
+    
+    return {"path": path, "rows": rows, "id_sum": id_sum}
+
+def _iter_ids(path: str, uri: Optional[str] = None):
+    """
+    Read the ids stored in an archive file in batches.
+    
+    Args:
+        path (str): Path of the file on the archive filesystem.
+        uri (str, optional): Archive location. Defaults to ARCHIVE_URI.
+    
+    Yields:
+        List[int]: Ids of a batch of rows.
+    """
+    filesystem, _ = archive_filesystem(uri)
+    
+    with filesystem.open_input_file(path) as source:
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=ARCHIVE_DELETE_BATCH_SIZE, columns=["id"]):
+            yield batch.column(0).to_pylist()
+
+def verify_export(export: Dict[str, Any], uri: Optional[str] = None) -> bool:
+    """
+    Check that an archive file holds exactly the exported rows.
+    
+    Args:
+        export (Dict[str, Any]): Result of export_month.
+        uri (str, optional): Archive location. Defaults to ARCHIVE_URI.
+    
+    Returns:
+        bool: True if the number of rows and the sum of the ids match.
+    """
+    rows = 0
+    id_sum = 0
+    
+    for ids in _iter_ids(export["path"], uri):
+        rows += len(ids)
+        id_sum += sum(ids)
+    
+    return rows == export["rows"] and id_sum == export["id_sum"]
+
+def _remove_from_file(path: str, ids: List[int], uri: Optional[str] = None) -> int:
+    """
+    Rewrite an archive file without some of its rows.
+    
+    The file is written under a staging name first and then moved over the old one,
+    so readers see either the old or the new file. A file without rows is removed.
+    
+    Args:
+        path (str): Path of the file on the archive filesystem.
+        ids (List[int]): Ids of the rows to remove.
+        uri (str, optional): Archive location. Defaults to ARCHIVE_URI.
+    
+    Returns:
+        int: Number of rows left in the file.
+    """
+    filesystem, _ = archive_filesystem(uri)
+    table = pq.read_table(path, filesystem=filesystem)
+    id_type = table.schema.field("id").type
+    table = table.filter(pc.invert(pc.is_in(table.column("id"), value_set=pa.array(ids, type=id_type))))
+    
+    if not table.num_rows:
+        filesystem.delete_file(path)
+        return 0
+    
+    staging_path = f"{path.rsplit('/', 1)[0]}/_rewrite-{os.getpid()}.parquet"
+    pq.write_table(
+        table, staging_path, filesystem=filesystem,
+        compression=ARCHIVE_COMPRESSION, use_dictionary=True, row_group_size=ARCHIVE_BATCH_SIZE
+    )
+    filesystem.move(staging_path, path)
+    
+    return table.num_rows
+
+def _delete_exported(table_name: str, month: date, path: str, uri: Optional[str] = None) -> int:
+    """
+    Delete the rows held by an archive file from the database.
+    
+    Each batch is committed separately, so locks are held briefly. A row updated after
+    the export can have moved out of the month, such as a re-collected post, whose
+    timestamp the upsert sets to the collection time. Such rows stay in the database
+    with their new values and are removed from the file instead, so no row is both
+    archived and in the database.
+    
+    Args:
+        table_name (str): Name of a table in ARCHIVE_TABLES.
+        month (date): First day of the month of the file.
+        path (str): Path of the file on the archive filesystem.
+        uri (str, optional): Archive location. Defaults to ARCHIVE_URI.
+    
+    Returns:
+        int: Number of deleted rows.
+    """
+    spec = ARCHIVE_TABLES[table_name]
+    table = spec["model"].__table__
+    time_column = table.c[spec["time"]]
+    start, end = _month_range(month)
+    deleted = 0
+    moved = []
+    
+    for ids in _iter_ids(path, uri):
+        # The time condition lets PostgreSQL go straight to the partition of the month
+        with engine.begin() as connection:
+            result = connection.execute(delete(table).where(
+                table.c.id.in_(ids), time_column >= start, time_column < end
+            ))
+            
+            # Rows of the file that are still there after the delete have moved out of the month
+            if result.rowcount < len(ids):
+                moved.extend(connection.execute(select(table.c.id).where(table.c.id.in_(ids))).scalars())
+        deleted += result.rowcount
+    
+    if moved:
+        logger.info(f"{len(moved)} rows in {path} were updated after the export, keeping them in the database")
+        _remove_from_file(path, moved, uri)
+    
+    return deleted
+
+def _resume_month(table_name: str, month: date, uri: Optional[str] = None) -> int:
+    """
+    Delete the rows of a month that are already in archive files from the database.
+    
+    Files are only given their final name once they are complete, so their rows can
+    be deleted if an earlier run stopped before it was done deleting them. Otherwise
+    exporting them again would store them twice.
+    
+    Args:
+        table_name (str): Name of a table in ARCHIVE_TABLES.
+        month (date): First day of the month.
+        uri (str, optional): Archive location. Defaults to ARCHIVE_URI.
+    
+    Returns:
+        int: Number of deleted rows.
+    """
+    filesystem, root = archive_filesystem(uri)
+    selector = pafs.FileSelector(f"{root}/{table_name}/month={month:%Y-%m}", allow_not_found=True)
+    deleted = 0
+    
+    for info in filesystem.get_file_info(selector):
+        if info.base_name.startswith("part-") and info.base_name.endswith(".parquet"):
+            deleted += _delete_exported(table_name, month, info.path, uri)
+    
+    return deleted
+
+def _drop_partition_if_empty(table_name: str, month: date) -> bool:
+    """
+    Drop the partition of a month once all its rows have been archived.
+    
+    Args:
+        table_name (str): Name of the table.
+        month (date): First day of the month.
+    
+    Returns:
+        bool: True if the partition was dropped.
+    """
+    with engine.begin() as connection:
+        if not is_partitioned(connection, table_name):
+            return False
+        
+        name = list_partitions(connection, table_name).get(month)
+        if not name:
+            return False
+        
+        # Lock the partition first, so no row can be written between the check and the drop
+        connection.execute(text(f"LOCK TABLE {name} IN ACCESS EXCLUSIVE MODE"))
+        if connection.execute(text(f"SELECT 1 FROM {name} LIMIT 1")).first() is not None:
+            return False
+        
+        connection.execute(text(f"DROP TABLE {name}"))
+        return True
+
+def archive_months(table_name: str, cutoff: date, uri: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Move the months of a table before the cutoff from the database to the archive.
+    
+    A month is only deleted from the database after its file has been read back
+    and matches the exported rows.
+    
+    Args:
+        table_name (str): Name of a table in ARCHIVE_TABLES.
+        cutoff (date): First month to keep in the database.
+        uri (str, optional): Archive location. Defaults to ARCHIVE_URI.
+    
+    Returns:
+        List[Dict[str, Any]]: File, number of archived and deleted rows per month.
+    """
+    spec = ARCHIVE_TABLES[table_name]
+    time_column = spec["model"].__table__.c[spec["time"]]
+    cutoff_time = datetime.combine(cutoff, datetime.min.time())
+    report = []
+    month = None
+    
+    while True:
+        # Find the oldest month that still has rows, skipping empty ones
+        with engine.begin() as connection:
+            oldest = select(func.min(time_column)).where(time_column < cutoff_time)
+            if month is not None:
+                oldest = oldest.where(time_column >= _month_range(month)[1])
+            oldest = connection.execute(oldest).scalar()
+        
+        if oldest is None:
+            return report
+        
+        month = month_start(oldest)
+        _resume_month(table_name, month, uri)
+        export = export_month(table_name, month, uri)
+        if not export:
+            continue
+        
+        if not verify_export(export, uri):
+            raise RuntimeError(f"Archive file {export['path']} doesn't match the exported rows, keeping them in the database")
+        
+        deleted = _delete_exported(table_name, month, export["path"], uri)
+        report.append({
+            "month": f"{month:%Y-%m}",
+            "file": export["path"],
+            "rows": export["rows"],
+            "deleted": deleted,
+            "partition_dropped": _drop_partition_if_empty(table_name, month)
+        })
+
+def archive(months: Optional[int] = None, tables: Optional[List[str]] = None, uri: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Move closed months older than the retention in the database to the Parquet archive.
+    
+    Args:
+        months (int, optional): Number of months to keep in the database. Defaults to ARCHIVE_AFTER_MONTHS.
+        tables (List[str], optional): Tables to archive. Defaults to all tables in ARCHIVE_TABLES.
+        uri (str, optional): Archive location. Defaults to ARCHIVE_URI.
+    
+    Returns:
+        Dict[str, Any]: The cutoff and the archived months per table.
+    """
+    months = ARCHIVE_AFTER_MONTHS if months is None else months
+    if months <= 0:
+        return {"cutoff": None, "tables": {}}
+    
+    cutoff = add_months(month_start(), -months)
+    report = {table_name: archive_months(table_name, cutoff, uri) for table_name in tables or ARCHIVE_TABLES}
+    
+    dataset_generations.bump(table_name for table_name, archived in report.items() if archived)
+    
+    return {"cutoff": cutoff.isoformat(), "tables": report}
+
+def query_archive(
+    table_name: str,
+    start: datetime,
+    end: datetime,
+    filters: Optional[Dict[str, Any]] = None,
+    order_by: Union[str, List[str]] = "timestamp",
+    limit: int = 100,
+    columns: Optional[List[str]] = None,
+    uri: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Get the top rows of an archived table in a range of time.
+    
+    Only the month directories overlapping the range are read, and the filters are
+    pushed down to the Parquet row groups. Each batch is cut to its top rows before
+    merging, so memory use depends on the limit rather than on the size of the range.
+    
+    Args:
+        table_name (str): Name of a table in ARCHIVE_TABLES.
+        start (datetime): Start of the range.
+        end (datetime): End of the range.
+        filters (Dict[str, Any], optional): Column values rows must have. Defaults to no filters.
+        order_by (Union[str, List[str]], optional): Column or columns to sort by, descending. Defaults to "timestamp".
+        limit (int, optional): Maximum number of rows to return. Defaults to 100.
+        columns (List[str], optional): Columns to return, including the sort columns. Defaults to all columns.
+        uri (str, optional): Archive location. Defaults to ARCHIVE_URI.
+    
+    Returns:
+        List[Dict[str, Any]]: Archived rows keyed by column name.
+    """
+    filesystem, root = archive_filesystem(uri)
+    directory = f"{root}/{table_name}"
+    
+    if filesystem.get_file_info(directory).type != pafs.FileType.Directory:
+        return []
+    
+    dataset = ds.dataset(directory, filesystem=filesystem, format="parquet", partitioning="hive")
+    time_field = ARCHIVE_TABLES[table_name]["time"]
+    
+    expression = (
+        (ds.field("month") >= f"{start:%Y-%m}") & (ds.field("month") <= f"{end:%Y-%m}")
+        & (ds.field(time_field) >= pa.scalar(_utc(start), type=pa.timestamp("us", tz="UTC")))
+        & (ds.field(time_field) < pa.scalar(_utc(end), type=pa.timestamp("us", tz="UTC")))
+    )
+    for column, value in (filters or {}).items():
+        expression = expression & (ds.field(column) == value)
+    
+    columns = columns or [name for name in dataset.schema.names if name != "month"]
+    sort_columns = [order_by] if isinstance(order_by, str) else order_by
+    top = []
+    
+    for batch in dataset.to_batches(columns=columns, filter=expression, batch_size=ARCHIVE_BATCH_SIZE):
+        if not batch.num_rows:
+            continue
+        
+        batch = pa.Table.from_batches([batch]).sort_by(
+            [(column, "descending") for column in sort_columns]
+        ).slice(0, limit)
+        top = heapq.nlargest(
+            limit, top + batch.to_pylist(),
+            key=lambda row: tuple((row[column] is not None, row[column]) for column in sort_columns)
+        )
+    
+    return top
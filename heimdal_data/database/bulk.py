@@ -0,0 +1,417 @@
+import os
+import io
+import csv
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Iterable, Optional, Callable, Type
+
+from sqlalchemy import insert, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .pool_metrics import pool_metrics
+from .rollups import touched_range, previous_days, merge_ranges, refresh_rollups
+from .models import trend_bucket
+from .terms import TermCache, INTERNED_COLUMNS
+from .generations import dataset_generations
+
+logger = logging.getLogger("bulk")
+
+# Number of rows written per statement
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "5000"))
+
+# Whether to use COPY instead of multi-row INSERTs on PostgreSQL
+BULK_USE_COPY = os.getenv("BULK_USE_COPY", "true").lower() == "true"
+
+# Marker for NULL values in COPY data
+COPY_NULL = "\\N"
+
+# Natural keys of the tables that are upserted instead of appended to
+NATURAL_KEYS = {
+    "hashtag_trends": ("platform", "hashtag_id", "bucket"),
+    "social_engagement": ("platform", "post_id")
+}
+
+class BulkWriter:
+    """
+    Writes batches of records to the database in chunks inside a single transaction.
+    
+    Records are plain dictionaries keyed by column name, so no ORM objects are built.
+    On PostgreSQL the chunks are sent with COPY, on other databases as multi-row INSERTs.
+    Tables with a natural key in NATURAL_KEYS are upserted, so writing the same
+    record twice updates the stored row instead of adding a duplicate. Hashtag and
+    keyword text is replaced by the id of its term, see INTERNED_COLUMNS. After a
+    commit, the rollups of the days that were written are recomputed and the
+    generations of the written tables are bumped. Days whose refresh failed are
+    refreshed again with the next write.
+    """
+    
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        chunk_size: Optional[int] = None,
+        use_copy: Optional[bool] = None,
+        terms: Optional[TermCache] = None
+    ):
+        """
+        Initialize the bulk writer.
+        
+        Args:
+            session_factory (Callable[[], Session], optional): Factory for database sessions. Defaults to SessionLocal.
+            chunk_size (int, optional): Number of rows per statement. Defaults to BULK_CHUNK_SIZE.
+            use_copy (bool, optional): Whether to use COPY on PostgreSQL. Defaults to BULK_USE_COPY.
+            terms (TermCache, optional): Cache of term ids for the database written to. Defaults to a new cache.
+        """
+        self.session_factory = session_factory
+        self.chunk_size = chunk_size or BULK_CHUNK_SIZE
+        self.use_copy = BULK_USE_COPY if use_copy is None else use_copy
+        self.terms = terms or TermCache()
+        self.pending_rollups: Dict[str, List] = {}
+        self.pending_lock = threading.Lock()
+    
+    def write(self, model: Type, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Write a batch of records for one model in a single transaction.
+        
+        Args:
+            model (Type): Model class, e.g. HashtagTrend.
+            records (Iterable[Dict[str, Any]]): Records keyed by column name.
+        
+        Returns:
+            int: Number of rows written.
+        """
+        return self.write_many({model: records})[model]
+    
+    def write_many(self, batches: Dict[Type, Iterable[Dict[str, Any]]]) -> Dict[Type, int]:
+        """
+        Write batches of records for several models in a single transaction.
+        
+        Args:
+            batches (Dict[Type, Iterable[Dict[str, Any]]]): Records keyed by column name, per model class.
+        
+        Returns:
+            Dict[Type, int]: Number of rows written per model.
+        """
+        session = self.session_factory()
+        
+        try:
+            # Check the connection out up front to measure the wait for the writer pool
+            start_time = time.perf_counter()
+            session.connection()
+            pool_metrics["writer"].record(time.perf_counter() - start_time)
+            
+            counts = {model: self.write_in_session(session, model, records) for model, records in batches.items()}
+            touched = session.info.pop("touched", {})
+            new_terms = session.info.pop("new_terms", {})
+            bind = session.get_bind()
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        
+        # Terms inserted by the transaction exist now and can be cached
+        self.terms.publish(new_terms)
+        
+        # The raw rows are stored at this point, a failed refresh is retried with the next write
+        self.refresh_rollups(touched, bind)
+        
+        # Let caches of the written tables know they are stale
+        dataset_generations.bump(model.__tablename__ for model, count in counts.items() if count)
+        
+        return counts
+    
+    def refresh_rollups(self, touched: Dict[str, List], bind=None):
+        """
+        Recompute the rollups of the days written, and of the days whose refresh failed before.
+        
+        Args:
+            touched (Dict[str, List]): Ranges of days written per source table.
+            bind (Engine, optional): Engine of the database written to. Defaults to the application engine.
+        """
+        with self.pending_lock:
+            pending, self.pending_rollups = self.pending_rollups, {}
+        for table_name, ranges in pending.items():
+            touched[table_name] = merge_ranges(touched.get(table_name), *ranges)
+        
+        if not touched:
+            return
+        
+        try:
+            refresh_rollups(touched, bind)
+        except Exception as e:
+            logger.warning(f"Error refreshing rollups of {', '.join(sorted(touched))}, retrying with the next write: {e}")
+            with self.pending_lock:
+                for table_name, ranges in touched.items():
+                    self.pending_rollups[table_name] = merge_ranges(self.pending_rollups.get(table_name), *ranges)
+    
+    def write_in_session(self, session: Session, model: Type, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Write a batch of records using an existing session, without committing.
+        
+        Args:
+            session (Session): Database session.
+            model (Type): Model class.
+            records (Iterable[Dict[str, Any]]): Records keyed by column name.
+        
+        Returns:
+            int: Number of rows written.
+        """
+        table = model.__table__
+        count = 0
+        chunk = []
+        
+        for record in records:
+            chunk.append(record)
+            
+            if len(chunk) >= self.chunk_size:
+                count += self._write_chunk(session, table, chunk)
+                chunk = []
+        
+        if chunk:
+            count += self._write_chunk(session, table, chunk)
+        
+        return count
+    
+    def _write_chunk(self, session: Session, table, records: List[Dict[str, Any]]) -> int:
+        """
+        Write a single chunk of records.
+        
+        Args:
+            session (Session): Database session.
+            table: SQLAlchemy table to write to.
+            records (List[Dict[str, Any]]): Records keyed by column name.
+        
+        Returns:
+            int: Number of rows written.
+        """
+        key = NATURAL_KEYS.get(table.name)
+        
+        if table.name in INTERNED_COLUMNS:
+            records = self._intern(session, table.name, records)
+        
+        if key:
+            records = _dedupe(_with_derived_columns(table, records), key)
+        
+        # Remember which days were written, and which days upserted rows move away from,
+        # so their rollups can be refreshed after the commit
+        touched = session.info.setdefault("touched", {})
+        touched_days = merge_ranges(
+            touched.get(table.name),
+            touched_range(table.name, records),
+            *(previous_days(session, table, records, key) if key else [])
+        )
+        if touched_days:
+            touched[table.name] = touched_days
+        
+        columns = _columns(table, records)
+        rows = [{column: record.get(column) for column in columns} for record in records]
+        dialect = session.get_bind().dialect.name
+        
+        if self.use_copy and dialect == "postgresql":
+            if key:
+                self._copy_upsert(session, table, columns, rows, key)
+            else:
+                self._copy(session, table.name, columns, rows)
+        elif key and dialect in ("postgresql", "sqlite"):
+            session.execute(_upsert_statement(table, columns, key, dialect), rows)
+        else:
+            # Sent as multi-row INSERT statements by SQLAlchemy
+            session.execute(insert(table), rows)
+        
+        return len(rows)
+    
+    def _intern(self, session: Session, table_name: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Replace hashtag and keyword text in records by the ids of their terms.
+        
+        New records are built, so the records passed in keep their text and can
+        still be spooled if the write fails.
+        
+        Args:
+            session (Session): Database session.
+            table_name (str): Name of the table the records are written to.
+            records (List[Dict[str, Any]]): Records keyed by column name.
+        
+        Returns:
+            List[Dict[str, Any]]: The records with id columns instead of text columns.
+        """
+        for text_column, id_column in INTERNED_COLUMNS[table_name].items():
+            ids = self.terms.resolve(session, (record[text_column] for record in records if text_column in record))
+            interned = []
+            
+            for record in records:
+                if text_column in record:
+                    record = dict(record)
+                    record[id_column] = ids[record.pop(text_column)]
+                interned.append(record)
+            
+            records = interned
+        
+        return records
+    
+    @staticmethod
+    def _copy(session: Session, table_name: str, columns: List[str], rows: List[Dict[str, Any]]):
+        """
+        Write rows with PostgreSQL COPY.
+        
+        Args:
+            session (Session): Database session.
+            table_name (str): Name of the table to write to.
+            columns (List[str]): Columns to write.
+            rows (List[Dict[str, Any]]): Rows keyed by column name.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        
+        for row in rows:
+            writer.writerow([_copy_value(row[column]) for column in columns])
+        
+        buffer.seek(0)
+        
+        # Use the connection of the session, so the COPY is part of its transaction
+        connection = session.connection().connection
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                buffer
+            )
+    
+    def _copy_upsert(self, session: Session, table, columns: List[str], rows: List[Dict[str, Any]], key: tuple):
+        """
+        Upsert rows on PostgreSQL by copying them into a staging table first.
+        
+        COPY can't resolve conflicts itself, so the rows are copied into a temporary
+        table and merged into the target with INSERT ... ON CONFLICT DO UPDATE.
+        
+        Args:
+            session (Session): Database session.
+            table: SQLAlchemy table to write to.
+            columns (List[str]): Columns to write.
+            rows (List[Dict[str, Any]]): Rows keyed by column name, unique on the key.
+            key (tuple): Natural key columns of the table.
+        """
+        staging = f"{table.name}_staging"
+        column_list = ", ".join(columns)
+        updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in columns if column not in key)
+        
+        # The staging table lives until the end of the transaction
+        session.execute(text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DROP "
+            f"AS SELECT {column_list} FROM {table.name} WITH NO DATA"
+        ))
+        
+        self._copy(session, staging, columns, rows)
+        
+        session.execute(text(
+            f"INSERT INTO {table.name} ({column_list}) SELECT {column_list} FROM {staging} "
+            f"ON CONFLICT ({', '.join(key)}) DO "
+            + (f"UPDATE SET {updates}" if updates else "NOTHING")
+        ))
+        session.execute(text(f"DROP TABLE {staging}"))
+
+def _columns(table, records: List[Dict[str, Any]]) -> List[str]:
+    """
+    Get the table columns present in a list of records.
+    
+    Columns missing from every record are left out, so their server defaults apply.
+    
+    Args:
+        table: SQLAlchemy table.
+        records (List[Dict[str, Any]]): Records keyed by column name.
+    
+    Returns:
+        List[str]: Column names in table order.
+    """
+    present = set()
+    for record in records:
+        present.update(record)
+    
+    return [column.name for column in table.columns if column.name in present]
+
+def _with_derived_columns(table, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Fill in columns that are derived from other columns of a record.
+    
+    Args:
+        table: SQLAlchemy table.
+        records (List[Dict[str, Any]]): Records keyed by column name.
+    
+    Returns:
+        List[Dict[str, Any]]: The records with derived columns set.
+    """
+    if "bucket" not in table.columns:
+        return records
+    
+    return [
+        record if record.get("bucket") else {**record, "bucket": trend_bucket(record.get("timestamp"))}
+        for record in records
+    ]
+
+def _dedupe(records: List[Dict[str, Any]], key: tuple) -> List[Dict[str, Any]]:
+    """
+    Remove records with the same natural key, keeping the last one.
+    
+    A single upsert statement can't touch the same row twice, so duplicates within
+    a chunk have to be removed first. Records with a NULL key part never conflict
+    and are all kept.
+    
+    Args:
+        records (List[Dict[str, Any]]): Records keyed by column name.
+        key (tuple): Natural key columns.
+    
+    Returns:
+        List[Dict[str, Any]]: The records, unique on the key.
+    """
+    unique = {}
+    
+    for index, record in enumerate(records):
+        values = tuple(record.get(column) for column in key)
+        unique[values if None not in values else index] = record
+    
+    return list(unique.values())
+
+def _upsert_statement(table, columns: List[str], key: tuple, dialect: str):
+    """
+    Build an INSERT ... ON CONFLICT DO UPDATE statement for a table.
+    
+    Args:
+        table: SQLAlchemy table.
+        columns (List[str]): Columns that are written.
+        key (tuple): Natural key columns.
+        dialect (str): Name of the database dialect, "postgresql" or "sqlite".
+    
+    Returns:
+        Insert: The upsert statement.
+    """
+    dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = dialect_insert(table)
+    updates = {column: statement.excluded[column] for column in columns if column not in key}
+    
+    if not updates:
+        return statement.on_conflict_do_nothing(index_elements=list(key))
+    
+    return statement.on_conflict_do_update(index_elements=list(key), set_=updates)
+
+def _copy_value(value: Any) -> Any:
+    """
+    Convert a value for COPY in CSV format.
+    
+    Args:
+        value (Any): Value to convert.
+    
+    Returns:
+        Any: The converted value.
+    """
+    if value is None:
+        return COPY_NULL
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+# Shared bulk writer used by the collectors
+bulk_writer = BulkWriter()
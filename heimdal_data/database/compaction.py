@@ -0,0 +1,380 @@
+import os
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Dict, List, Any, Optional, Tuple
+
+from sqlalchemy import select, insert, delete, func, text, tuple_, and_
+from sqlalchemy.engine import Connection
+
+from .database import engine
+from .models import HashtagTrend, SeoData
+from .generations import dataset_generations
+
+# Resolutions from finest to coarsest, "raw" being the collected rows
+RESOLUTIONS = ("raw", "day", "week")
+
+# Age in days after which rows are compacted to one row per day, 0 to keep them as collected
+COMPACTION_DAILY_AFTER_DAYS = int(os.getenv("COMPACTION_DAILY_AFTER_DAYS", "0"))
+
+# Age in days after which rows are compacted to one row per week, 0 to keep daily rows
+COMPACTION_WEEKLY_AFTER_DAYS = int(os.getenv("COMPACTION_WEEKLY_AFTER_DAYS", "0"))
+
+# Number of hashtags or keywords compacted per transaction
+COMPACTION_BATCH_SIZE = int(os.getenv("COMPACTION_BATCH_SIZE", "500"))
+
+# Number of row ids per DELETE statement
+DELETE_CHUNK_SIZE = 1000
+
+# Whether to VACUUM the tables after a pass on PostgreSQL, so the freed space is reused
+COMPACTION_VACUUM = os.getenv("COMPACTION_VACUUM", "true").lower() == "true"
+
+# How each table is compacted
+COMPACTION_TABLES = {
+    "hashtag_trends": {
+        "model": HashtagTrend,
+        # Columns identifying a series, one compacted row is kept per series and bucket
+        "key": ("platform", "hashtag_id"),
+        # Column deciding which bucket a row belongs to
+        "time": "bucket",
+        # Column summarized by the minimum, maximum and mean
+        "value": "engagement",
+        # Columns taken from the last row of the bucket
+        "last": ("engagement", "engagement_rate", "volume", "timestamp")
+    },
+    "seo_data": {
+        "model": SeoData,
+        "key": ("keyword_id", "source"),
+        "time": "timestamp",
+        "value": "trend_score",
+        "last": ("trend_score", "volume", "difficulty", "cpc", "competition", "timestamp")
+    }
+}
+
+def bucket_start(value: datetime, resolution: str) -> datetime:
+    """
+    Get the start of the day or week a time belongs to.
+    
+    Weeks start on Monday, but never before the first day of the month, so a
+    compacted row stays in the monthly partition of the rows it replaces.
+    
+    Args:
+        value (datetime): Time to truncate.
+        resolution (str): "day" or "week".
+    
+    Returns:
+        datetime: The start of the bucket.
+    """
+    day = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if resolution == "day":
+        return day
+    
+    return max(day - timedelta(days=day.weekday()), day.replace(day=1))
+
+def bucket_end(start: datetime, resolution: str) -> datetime:
+    """
+    Get the end of the day or week starting at a time.
+    
+    Args:
+        start (datetime): Start of the bucket, see bucket_start.
+        resolution (str): "day" or "week".
+    
+    Returns:
+        datetime: The start of the next bucket.
+    """
+    if resolution == "day":
+        return start + timedelta(days=1)
+    
+    # The week ends on the next Monday or at the end of the month, whichever comes first
+    next_monday = start + timedelta(days=7 - start.weekday())
+    next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return min(next_monday, next_month)
+
+def _local(value: datetime) -> datetime:
+    """
+    Convert a time read from the database to a naive local time, like the cutoffs.
+    
+    Args:
+        value (datetime): Time, with or without a time zone.
+    
+    Returns:
+        datetime: Naive local time.
+    """
+    if value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+def summarize(spec: Dict[str, Any], rows: List[Dict[str, Any]], resolution: str, bucket: datetime) -> Dict[str, Any]:
+    """
+    Summarize the rows of one series and bucket into a single compacted row.
+    
+    Rows that are compacted already contribute their own minimum, maximum, mean
+    and number of samples, so compacting days into weeks gives the same result as
+    compacting the collected rows into weeks directly.
+    
+    Args:
+        spec (Dict[str, Any]): Entry of COMPACTION_TABLES.
+        rows (List[Dict[str, Any]]): Rows of the series in the bucket, oldest first.
+        resolution (str): "day" or "week".
+        bucket (datetime): Start of the bucket.
+    
+    Returns:
+        Dict[str, Any]: The compacted row keyed by column name.
+    """
+    value = spec["value"]
+    minimum = maximum = None
+    total = 0.0
+    samples = 0
+    valued_samples = 0
+    
+    for row in rows:
+        count = row["sample_count"] or 1
+        samples += count
+        
+        if row[value] is None:
+            continue
+        
+        row_min = row[f"{value}_min"] if row[f"{value}_min"] is not None else row[value]
+        row_max = row[f"{value}_max"] if row[f"{value}_max"] is not None else row[value]
+        row_mean = row[f"{value}_mean"] if row[f"{value}_mean"] is not None else row[value]
+        
+        minimum = row_min if minimum is None else min(minimum, row_min)
+        maximum = row_max if maximum is None else max(maximum, row_max)
+        total += row_mean * count
+        valued_samples += count
+    
+    last = rows[-1]
+    compacted = {column: rows[0][column] for column in spec["key"]}
+    compacted.update({column: last[column] for column in spec["last"]})
+    compacted.update({
+        "resolution": resolution,
+        f"{value}_min": minimum,
+        f"{value}_max": maximum,
+        f"{value}_mean": total / valued_samples if valued_samples else None,
+        "sample_count": samples
+    })
+    
+    # Bucketed tables point at the start of the compacted bucket
+    if spec["time"] != "timestamp":
+        compacted[spec["time"]] = bucket
+    
+    return compacted
+
+def table_size(connection: Connection, table: str) -> Dict[str, Optional[int]]:
+    """
+    Get the size of a table, including all its partitions.
+    
+    Args:
+        connection (Connection): Database connection.
+        table (str): Name of the table.
+    
+    Returns:
+        Dict[str, Optional[int]]: Table and index size in bytes and the estimated number of rows,
+            or None values on databases other than PostgreSQL.
+    """
+    if connection.dialect.name != "postgresql":
+        return {"table_bytes": None, "index_bytes": None, "rows": None}
+    
+    table_bytes, index_bytes, rows = connection.execute(text(
+        "SELECT coalesce(sum(pg_table_size(tree.relid)), 0), coalesce(sum(pg_indexes_size(tree.relid)), 0), "
+        "coalesce(sum(greatest(class.reltuples, 0)), 0) "
+        "FROM pg_partition_tree(to_regclass(:table)) tree JOIN pg_class class ON class.oid = tree.relid "
+        "WHERE tree.isleaf"
+    ), {"table": table}).one()
+    
+    return {"table_bytes": int(table_bytes), "index_bytes": int(index_bytes), "rows": int(rows)}
+
+def compact_table(
+    table_name: str, resolution: str, cutoff: datetime, batch_size: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Compact the rows of a table older than the cutoff to one row per series and day or week.
+    
+    Buckets are processed from the oldest, each batch of series in its own transaction,
+    so locks are held briefly and a failed pass can simply be run again.
+    
+    Args:
+        table_name (str): Name of a table in COMPACTION_TABLES.
+        resolution (str): "day" or "week".
+        cutoff (datetime): Rows in buckets starting before the bucket of this time are compacted.
+        batch_size (int, optional): Number of series per transaction. Defaults to COMPACTION_BATCH_SIZE.
+    
+    Returns:
+        Dict[str, Any]: Rows read, written and removed, and the space reclaimed.
+    """
+    spec = COMPACTION_TABLES[table_name]
+    table = spec["model"].__table__
+    time_column = table.c[spec["time"]]
+    key_columns = [table.c[column] for column in spec["key"]]
+    key = tuple_(*key_columns)
+    batch_size = batch_size or COMPACTION_BATCH_SIZE
+    
+    # Compacted rows are merged again when late rows arrive in their bucket, coarser rows are left alone
+    finer = RESOLUTIONS[:RESOLUTIONS.index(resolution)]
+    mergeable = RESOLUTIONS[:RESOLUTIONS.index(resolution) + 1]
+    
+    cutoff = bucket_start(cutoff, resolution)
+    report = {"resolution": resolution, "cutoff": cutoff.isoformat(), "buckets": 0, "rows_read": 0, "rows_written": 0}
+    
+    with engine.begin() as connection:
+        size_before = table_size(connection, table_name)
+    
+    window_from = None
+    while True:
+        # Find the oldest bucket that still has rows of a finer resolution
+        with engine.begin() as connection:
+            oldest = select(func.min(time_column)).where(
+                table.c.resolution.in_(finer), time_column < cutoff
+            )
+            if window_from is not None:
+                oldest = oldest.where(time_column >= window_from)
+            oldest = connection.execute(oldest).scalar()
+        
+        if oldest is None:
+            break
+        
+        window_start = bucket_start(_local(oldest), resolution)
+        window_end = bucket_end(window_start, resolution)
+        in_window = and_(time_column >= window_start, time_column < window_end)
+        report["buckets"] += 1
+        
+        last_key = None
+        while True:
+            with engine.begin() as connection:
+                series = select(*key_columns).where(
+                    in_window, table.c.resolution.in_(finer)
+                ).distinct().order_by(*key_columns).limit(batch_size)
+                if last_key is not None:
+                    series = series.where(key > tuple_(*last_key))
+                series = connection.execute(series).all()
+                
+                if not series:
+                    break
+                
+                # All series between the last batch and the last series of this one
+                in_batch = [in_window, table.c.resolution.in_(mergeable), key <= tuple_(*series[-1])]
+                if last_key is not None:
+                    in_batch.append(key > tuple_(*last_key))
+                
+                rows = connection.execute(
+                    select(table).where(*in_batch).order_by(*key_columns, table.c.timestamp, table.c.id)
+                ).mappings().all()
+                
+                # Series that only have compacted rows in the range are left as they are
+                compacted = []
+                replaced = []
+                for _, series_rows in groupby(rows, key=lambda row: tuple(row[column] for column in spec["key"])):
+                    series_rows = list(series_rows)
+                    if any(row["resolution"] in finer for row in series_rows):
+                        compacted.append(summarize(spec, series_rows, resolution, window_start))
+                        replaced.extend(row["id"] for row in series_rows)
+                
+                # Delete before inserting, the compacted row may take the key of a collected one
+                for start in range(0, len(replaced), DELETE_CHUNK_SIZE):
+                    connection.execute(delete(table).where(
+                        table.c.id.in_(replaced[start:start + DELETE_CHUNK_SIZE])
+                    ))
+                if compacted:
+                    connection.execute(insert(table), compacted)
+                
+                report["rows_read"] += len(replaced)
+                report["rows_written"] += len(compacted)
+                last_key = tuple(series[-1])
+        
+        window_from = window_end
+    
+    report["rows_removed"] = report["rows_read"] - report["rows_written"]
+    
+    # Make the space of the deleted rows reusable, VACUUM can't run inside a transaction
+    if report["rows_removed"] and COMPACTION_VACUUM and engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text(f"VACUUM (ANALYZE) {table_name}"))
+    
+    with engine.begin() as connection:
+        size_after = table_size(connection, table_name)
+    
+    report["size_before"] = size_before
+    report["size_after"] = size_after
+    report["bytes_reclaimed"] = _bytes_reclaimed(size_before, report["rows_removed"])
+    
+    return report
+
+def _bytes_reclaimed(size: Dict[str, Optional[int]], rows_removed: int) -> Optional[int]:
+    """
+    Estimate the table and index space freed by removing rows.
+    
+    PostgreSQL keeps the files at their size and reuses the freed space for new rows,
+    so the reclaimed space is estimated from the average size of a row.
+    
+    Args:
+        size (Dict[str, Optional[int]]): Size of the table before the pass, see table_size.
+        rows_removed (int): Number of rows removed by the pass.
+    
+    Returns:
+        Optional[int]: Estimated number of bytes, or None if the size isn't known.
+    """
+    if not size["rows"]:
+        return None
+    
+    bytes_per_row = (size["table_bytes"] + size["index_bytes"]) / size["rows"]
+    return int(bytes_per_row * min(rows_removed, size["rows"]))
+
+def compaction_passes(
+    daily_after_days: Optional[int] = None, weekly_after_days: Optional[int] = None
+) -> List[Tuple[str, int]]:
+    """
+    Get the resolutions to compact to and the age in days after which they apply.
+    
+    Args:
+        daily_after_days (int, optional): Age for daily rows. Defaults to COMPACTION_DAILY_AFTER_DAYS.
+        weekly_after_days (int, optional): Age for weekly rows. Defaults to COMPACTION_WEEKLY_AFTER_DAYS.
+    
+    Returns:
+        List[Tuple[str, int]]: Resolution and age of each pass, finest first.
+    """
+    daily = COMPACTION_DAILY_AFTER_DAYS if daily_after_days is None else daily_after_days
+    weekly = COMPACTION_WEEKLY_AFTER_DAYS if weekly_after_days is None else weekly_after_days
+    
+    passes = []
+    if daily > 0:
+        passes.append(("day", daily))
+    if weekly > 0:
+        passes.append(("week", weekly))
+    
+    return passes
+
+def compact(
+    daily_after_days: Optional[int] = None, weekly_after_days: Optional[int] = None,
+    tables: Optional[List[str]] = None, batch_size: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Downsample old hashtag trends and SEO data to daily and then weekly rows.
+    
+    Each compacted row keeps the minimum, maximum and mean of the engagement or trend
+    score in its bucket, the number of samples and the values of the last sample.
+    
+    Args:
+        daily_after_days (int, optional): Age in days after which rows are compacted per day.
+            Defaults to COMPACTION_DAILY_AFTER_DAYS.
+        weekly_after_days (int, optional): Age in days after which rows are compacted per week.
+            Defaults to COMPACTION_WEEKLY_AFTER_DAYS.
+        tables (List[str], optional): Tables to compact. Defaults to all tables in COMPACTION_TABLES.
+        batch_size (int, optional): Number of series per transaction. Defaults to COMPACTION_BATCH_SIZE.
+    
+    Returns:
+        Dict[str, Any]: Report of every pass per table.
+    """
+    now = datetime.now()
+    report = {}
+    
+    for table_name in tables or COMPACTION_TABLES:
+        report[table_name] = [
+            compact_table(table_name, resolution, now - timedelta(days=days), batch_size)
+            for resolution, days in compaction_passes(daily_after_days, weekly_after_days)
+        ]
+    
+    dataset_generations.bump(
+        table_name for table_name, passes in report.items()
+        if any(compaction_pass["rows_read"] for compaction_pass in passes)
+    )
+    
+    return report
@@ -1,10 +1,16 @@
 import os
 import sys
+import time
+import itertools
+from contextlib import asynccontextmanager
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
+from .pool_metrics import pool_metrics, pool_status
+
 # Load environment variables
 load_dotenv()
 
@@ -14,14 +20,55 @@ TESTING = os.getenv("TESTING", "false").lower() == "true"
 # Get the absolute path to the project directory
 PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Maximum duration of a single statement in milliseconds, 0 for no limit
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+def get_engine_options(database_url: str) -> dict:
+    """
+    Get the pool and connection options for an engine.
+    
+    Args:
+        database_url (str): Database URL, for the sync or async driver.
+    
+    Returns:
+        dict: Keyword arguments for create_engine or create_async_engine.
+    """
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    
+    if database_url.startswith("sqlite"):
+        if "aiosqlite" not in database_url:
+            options["connect_args"] = {"check_same_thread": False}
+        return options
+    
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_timeout=DB_POOL_TIMEOUT
+    )
+    
+    # Set the statement timeout for every connection of the pool
+    if DB_STATEMENT_TIMEOUT_MS and database_url.startswith("postgresql"):
+        if "asyncpg" in database_url:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    
+    return options
+
 # Database connection settings
 if TESTING:
     # Use SQLite for testing
     DB_FILE = os.path.join(PROJECT_DIR, "test.db")
     DATABASE_URL = f"sqlite:///{DB_FILE}"
-    engine = create_engine(
-        DATABASE_URL, connect_args={"check_same_thread": False}
-    )
+    engine = create_engine(DATABASE_URL, **get_engine_options(DATABASE_URL))
     print(f"Using SQLite database for testing: {DB_FILE}")
 else:
     # Use PostgreSQL for production
@@ -36,19 +83,62 @@ else:
 
     # Create the SQLAlchemy engine
     try:
-        engine = create_engine(DATABASE_URL)
+        engine = create_engine(DATABASE_URL, **get_engine_options(DATABASE_URL))
         print(f"Using PostgreSQL database at {DB_HOST}:{DB_PORT}/{DB_NAME}")
     except Exception as e:
         print(f"Error connecting to PostgreSQL: {e}")
         print("Falling back to SQLite database")
         DATABASE_URL = "sqlite:///./heimdal_data.db"
-        engine = create_engine(
-            DATABASE_URL, connect_args={"check_same_thread": False}
-        )
+        engine = create_engine(DATABASE_URL, **get_engine_options(DATABASE_URL))
 
 # Create a SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def get_async_database_url(database_url: str) -> str:
+    """
+    Get the URL for the async driver of a database.
+    
+    Args:
+        database_url (str): Database URL for the sync driver.
+    
+    Returns:
+        str: The same database with asyncpg for PostgreSQL or aiosqlite for SQLite.
+    """
+    if database_url.startswith("postgresql://"):
+        return database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if database_url.startswith("sqlite://"):
+        return database_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return database_url
+
+# Async engine on the primary database
+ASYNC_DATABASE_URL = get_async_database_url(DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **get_engine_options(ASYNC_DATABASE_URL))
+
+# Create an AsyncSessionLocal class
+AsyncSessionLocal = sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Comma-separated URLs of read replicas for the API routes, the primary is used if none are set
+DB_READER_URLS = [url.strip() for url in os.getenv("DB_READER_URL", "").split(",") if url.strip()]
+
+# Async engines for reads, kept apart from the pool the collectors write through
+if DB_READER_URLS and not TESTING:
+    reader_engines = []
+    for reader_url in DB_READER_URLS:
+        reader_url = get_async_database_url(reader_url)
+        reader_engines.append(create_async_engine(reader_url, **get_engine_options(reader_url)))
+    print(f"Using {len(reader_engines)} read replica(s) for API queries")
+else:
+    reader_engines = [async_engine]
+
+# Session factories for the reader engines, used in turn
+ReaderSessionLocals = [
+    sessionmaker(bind=reader_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    for reader_engine in reader_engines
+]
+_reader_sessions = itertools.cycle(ReaderSessionLocals)
+
 # Base class for models
 Base = declarative_base()
 
@@ -65,12 +155,77 @@ def get_db():
     finally:
         db.close()
 
+@asynccontextmanager
+async def reader_session():
+    """
+    Open an async database session on a reader engine.
+    
+    The connection is checked out up front, so the time spent waiting for the
+    pool is recorded in the reader pool metrics.
+    
+    Yields:
+        AsyncSession: A SQLAlchemy async session.
+    """
+    async with next(_reader_sessions)() as db:
+        start_time = time.perf_counter()
+        await db.connection()
+        pool_metrics["reader"].record(time.perf_counter() - start_time)
+        
+        yield db
+
+async def get_async_db():
+    """
+    Get an async database session on a reader engine, for use as a dependency.
+    
+    Yields:
+        AsyncSession: A SQLAlchemy async session.
+    """
+    async with reader_session() as db:
+        yield db
+
+def database_pool_stats() -> dict:
+    """
+    Get the usage and checkout wait times of the reader and writer pools.
+    
+    Returns:
+        dict: Pool status and checkout wait statistics per pool.
+    """
+    return {
+        "writer": {**pool_status(engine.pool), **pool_metrics["writer"].stats()},
+        "reader": {
+            **pool_metrics["reader"].stats(),
+            "engines": [pool_status(reader_engine.pool) for reader_engine in reader_engines]
+        }
+    }
+
+def run_migrations(database_url: str = None):
+    """
+    Upgrade the database schema to the latest Alembic revision.
+    
+    Args:
+        database_url (str, optional): URL of the database to migrate. Defaults to the application database.
+    """
+    from alembic import command
+    from alembic.config import Config
+    
+    config = Config(os.path.join(PROJECT_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(PROJECT_DIR, "migrations"))
+    
+    if database_url:
+        config.set_main_option("sqlalchemy.url", database_url.replace("%", "%%"))
+        command.upgrade(config, "head")
+        return
+    
+    # Migrate over the application engine, so fallbacks and connect args are kept
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+
 def init_db():
     """
-    Initialize the database by creating all tables.
+    Initialize the database by migrating it to the latest schema.
     """
-    from .models import Base
-    Base.metadata.create_all(bind=engine)
+    run_migrations()
 
 def check_db_connection():
     """
@@ -87,3 +242,13 @@ def check_db_connection():
     except Exception as e:
         print(f"Error connecting to the database: {e}")
         return False
+
+async def close_db():
+    """
+    Close the pooled connections of the async engines.
+    """
+    for reader_engine in reader_engines:
+        if reader_engine is not async_engine:
+            await reader_engine.dispose()
+    
+    await async_engine.dispose()
@@ -0,0 +1,76 @@
+import threading
+import logging
+from typing import Callable, Dict, Iterable, List
+
+logger = logging.getLogger("generations")
+
+class DatasetGenerations:
+    """
+    Counts the changes to each data table, so caches of data read from it can tell when they are stale.
+    
+    Writers bump the generation of the tables they changed after committing.
+    Listeners, such as the response cache of the API, are told which tables changed.
+    """
+    
+    def __init__(self):
+        """
+        Initialize the generations, all tables start at 0.
+        """
+        self.generations: Dict[str, int] = {}
+        self.listeners: List[Callable[[List[str]], None]] = []
+        self.lock = threading.Lock()
+    
+    def bump(self, tables: Iterable[str]):
+        """
+        Record that tables changed and tell the listeners.
+        
+        Args:
+            tables (Iterable[str]): Names of the changed tables.
+        """
+        tables = sorted(set(tables))
+        if not tables:
+            return
+        
+        with self.lock:
+            for table in tables:
+                self.generations[table] = self.generations.get(table, 0) + 1
+        
+        # The data is already committed, a failing listener mustn't fail the write
+        for listener in self.listeners:
+            try:
+                listener(tables)
+            except Exception as e:
+                logger.warning(f"Error notifying listener of changes to {', '.join(tables)}: {e}")
+    
+    def get(self, table: str) -> int:
+        """
+        Get the generation of a table.
+        
+        Args:
+            table (str): Name of the table.
+        
+        Returns:
+            int: Number of times the table changed since the process started.
+        """
+        return self.generations.get(table, 0)
+    
+    def subscribe(self, listener: Callable[[List[str]], None]):
+        """
+        Call a function with the names of the changed tables on every bump.
+        
+        Args:
+            listener (Callable[[List[str]], None]): Function to call.
+        """
+        self.listeners.append(listener)
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the generation of every table that changed.
+        
+        Returns:
+            Dict[str, int]: Generation per table.
+        """
+        return dict(self.generations)
+
+# Shared generations of the data tables
+dataset_generations = DatasetGenerations()
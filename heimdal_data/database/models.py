@@ -1,25 +1,74 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, ForeignKey, Text, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 
 Base = declarative_base()
 
+def trend_bucket(timestamp: Optional[datetime] = None) -> datetime:
+    """
+    Get the hour a hashtag trend snapshot belongs to.
+    
+    Args:
+        timestamp (datetime, optional): Time of the snapshot. Defaults to now.
+    
+    Returns:
+        datetime: The start of the hour.
+    """
+    return (timestamp or datetime.now()).replace(minute=0, second=0, microsecond=0)
+
+class Term(Base):
+    """
+    Model for storing each hashtag and keyword text once, referenced by id from the data tables.
+    """
+    __tablename__ = "terms"
+    __table_args__ = (
+        UniqueConstraint("text", name="uq_terms_text"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    text = Column(String(255), nullable=False)
+    
+    def __repr__(self):
+        return f"<Term(id={self.id}, text='{self.text}')>"
+
+
 class HashtagTrend(Base):
     """
     Model for storing trending hashtags from various social media platforms.
     """
     __tablename__ = "hashtag_trends"
+    __table_args__ = (
+        # One snapshot per hashtag, platform and hour, so re-collecting updates it in place
+        Index("uq_hashtag_trends_platform_hashtag_bucket", "platform", "hashtag_id", "bucket", unique=True),
+        # Latest trends by hour and engagement, and their next pages (/api/data/trends)
+        Index("ix_hashtag_trends_bucket_engagement_id", "bucket", "engagement", "id"),
+        # Latest trends of one platform (/api/data/trends?platform=...)
+        Index("ix_hashtag_trends_platform_bucket_engagement_id", "platform", "bucket", "engagement", "id"),
+        # Latest trends of one hashtag (/api/data/trends?hashtag=...)
+        Index("ix_hashtag_trends_hashtag_bucket_engagement_id", "hashtag_id", "bucket", "engagement", "id"),
+        # Rows still to be compacted (database/compaction.py)
+        Index("ix_hashtag_trends_resolution_bucket", "resolution", "bucket"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     platform = Column(String(50), nullable=False, index=True)  # Twitter, Facebook, TikTok, etc.
-    hashtag = Column(String(255), nullable=False, index=True)
+    hashtag_id = Column(Integer, ForeignKey("terms.id"), nullable=False)  # Hashtag text in the terms table
     engagement = Column(Integer, nullable=False)  # Number of posts, tweets, etc.
     engagement_rate = Column(Float, nullable=True)  # Engagement rate as a percentage
     volume = Column(Integer, nullable=True)  # Volume of posts
     timestamp = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    bucket = Column(DateTime(timezone=True), nullable=False)  # Hour the snapshot belongs to, see trend_bucket
+    resolution = Column(String(10), nullable=False, server_default="raw")  # raw, or day or week once compacted
+    engagement_min = Column(Integer, nullable=True)  # Lowest engagement in a compacted bucket
+    engagement_max = Column(Integer, nullable=True)  # Highest engagement in a compacted bucket
+    engagement_mean = Column(Float, nullable=True)  # Mean engagement in a compacted bucket
+    sample_count = Column(Integer, nullable=True)  # Number of snapshots in a compacted bucket
     
     def __repr__(self):
-        return f"<HashtagTrend(platform='{self.platform}', hashtag='{self.hashtag}', engagement={self.engagement})>"
+        return f"<HashtagTrend(platform='{self.platform}', hashtag_id={self.hashtag_id}, engagement={self.engagement})>"
 
 
 class SocialEngagement(Base):
@@ -27,6 +76,14 @@ class SocialEngagement(Base):
     Model for storing engagement data from social media posts.
     """
     __tablename__ = "social_engagement"
+    __table_args__ = (
+        # One row per post, so re-collecting a post updates its metrics in place
+        Index("uq_social_engagement_platform_post_id", "platform", "post_id", unique=True),
+        # Latest engagement, and its next pages (/api/data/engagement)
+        Index("ix_social_engagement_timestamp_id", "timestamp", "id"),
+        # Latest engagement of one platform (/api/data/engagement?platform=...)
+        Index("ix_social_engagement_platform_timestamp_id", "platform", "timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     platform = Column(String(50), nullable=False, index=True)  # Twitter, Facebook, TikTok, etc.
@@ -49,9 +106,17 @@ class SeoData(Base):
     Model for storing SEO data for keywords.
     """
     __tablename__ = "seo_data"
+    __table_args__ = (
+        # Top keywords, and their next pages (/api/data/seo)
+        Index("ix_seo_data_trend_score_id", "trend_score", "id"),
+        # Top scores of one keyword (/api/data/seo?keyword=...)
+        Index("ix_seo_data_keyword_trend_score_id", "keyword_id", "trend_score", "id"),
+        # Rows still to be compacted (database/compaction.py)
+        Index("ix_seo_data_resolution_timestamp", "resolution", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    keyword = Column(String(255), nullable=False, index=True)
+    keyword_id = Column(Integer, ForeignKey("terms.id"), nullable=False)  # Keyword text in the terms table
     trend_score = Column(Float, nullable=True)  # Score indicating how trending the keyword is
     volume = Column(Integer, nullable=True)  # Search volume
     difficulty = Column(Float, nullable=True)  # SEO difficulty score
@@ -59,6 +124,85 @@ class SeoData(Base):
     competition = Column(Float, nullable=True)  # Competition level
     source = Column(String(50), nullable=False)  # Google Trends, Ahrefs, Moz, etc.
     timestamp = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    resolution = Column(String(10), nullable=False, server_default="raw")  # raw, or day or week once compacted
+    trend_score_min = Column(Float, nullable=True)  # Lowest trend score in a compacted bucket
+    trend_score_max = Column(Float, nullable=True)  # Highest trend score in a compacted bucket
+    trend_score_mean = Column(Float, nullable=True)  # Mean trend score in a compacted bucket
+    sample_count = Column(Integer, nullable=True)  # Number of samples in a compacted bucket
+    
+    def __repr__(self):
+        return f"<SeoData(keyword_id={self.keyword_id}, trend_score={self.trend_score}, volume={self.volume})>"
+
+
+class CollectorWatermark(Base):
+    """
+    Model for storing how far each collector has got, so the next run only fetches what is new.
+    """
+    __tablename__ = "collector_watermarks"
+    __table_args__ = (
+        UniqueConstraint("collector", "account", "endpoint", name="uq_collector_watermarks_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    collector = Column(String(50), nullable=False)  # Twitter, Facebook, TikTok, etc.
+    account = Column(String(255), nullable=False)  # Page ID, location, account name, etc.
+    endpoint = Column(String(100), nullable=False)  # API endpoint the watermark applies to
+    value = Column(String(255), nullable=False)  # Last cursor, since_id, created time, etc.
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<CollectorWatermark(collector='{self.collector}', account='{self.account}', endpoint='{self.endpoint}', value='{self.value}')>"
+
+
+class HashtagTrendRollup(Base):
+    """
+    Model for storing hashtag trends aggregated per platform, hashtag and hour or day.
+    """
+    __tablename__ = "hashtag_trend_rollups"
+    __table_args__ = (
+        UniqueConstraint("resolution", "platform", "hashtag", "bucket", name="uq_hashtag_trend_rollups_key"),
+        Index("ix_hashtag_trend_rollups_resolution_bucket", "resolution", "bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    resolution = Column(String(10), nullable=False)  # hour or day
+    bucket = Column(DateTime(timezone=True), nullable=False)  # Start of the hour or day
+    platform = Column(String(50), nullable=False)
+    hashtag = Column(String(255), nullable=False)
+    engagement_sum = Column(BigInteger, nullable=False)
+    engagement_max = Column(Integer, nullable=False)
+    sample_count = Column(Integer, nullable=False)  # Number of snapshots in the bucket
+    latest_engagement = Column(Integer, nullable=True)  # Engagement of the newest snapshot
+    latest_timestamp = Column(DateTime(timezone=True), nullable=True)
+    
+    def __repr__(self):
+        return f"<HashtagTrendRollup(resolution='{self.resolution}', bucket='{self.bucket}', platform='{self.platform}', hashtag='{self.hashtag}')>"
+
+
+class EngagementRollup(Base):
+    """
+    Model for storing engagement data aggregated per platform, post type and day.
+    """
+    __tablename__ = "engagement_rollups"
+    __table_args__ = (
+        UniqueConstraint("resolution", "platform", "post_type", "bucket", name="uq_engagement_rollups_key"),
+        Index("ix_engagement_rollups_resolution_bucket", "resolution", "bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    resolution = Column(String(10), nullable=False)  # day
+    bucket = Column(DateTime(timezone=True), nullable=False)  # Start of the day
+    platform = Column(String(50), nullable=False)
+    post_type = Column(String(50), nullable=False)
+    likes_sum = Column(BigInteger, nullable=False)
+    comments_sum = Column(BigInteger, nullable=False)
+    shares_sum = Column(BigInteger, nullable=False)
+    reach_sum = Column(BigInteger, nullable=False)
+    engagement_sum = Column(BigInteger, nullable=False)  # Likes, comments and shares
+    engagement_max = Column(Integer, nullable=False)  # Highest engagement of a single post
+    post_count = Column(Integer, nullable=False)
+    latest_engagement = Column(Integer, nullable=True)  # Engagement of the newest post
+    latest_timestamp = Column(DateTime(timezone=True), nullable=True)
     
     def __repr__(self):
-        return f"<SeoData(keyword='{self.keyword}', trend_score={self.trend_score}, volume={self.volume})>"
+        return f"<EngagementRollup(resolution='{self.resolution}', bucket='{self.bucket}', platform='{self.platform}', post_type='{self.post_type}')>"
@@ -0,0 +1,330 @@
+import os
+import re
+from datetime import date, datetime
+from typing import Dict, List, Any, Optional
+
+from sqlalchemy import text, bindparam, DateTime
+from sqlalchemy.engine import Connection
+
+from .database import engine
+from .generations import dataset_generations
+
+# Partitioned tables and the column they are partitioned on
+PARTITIONED_TABLES = {
+    "hashtag_trends": "bucket",
+    "seo_data": "timestamp"
+}
+
+# Tables retention applies to and their time column
+RETENTION_TABLES = {
+    "hashtag_trends": "bucket",
+    "social_engagement": "timestamp",
+    "seo_data": "timestamp"
+}
+
+# Number of future months to keep partitions ready for
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+
+# Number of months of data to keep, 0 to keep everything
+RETENTION_MONTHS = int(os.getenv("RETENTION_MONTHS", "0"))
+
+# What to do with partitions past the retention period: "detach" keeps them as separate tables, "drop" removes them
+RETENTION_ACTION = os.getenv("RETENTION_ACTION", "detach").lower()
+
+# Number of rows deleted per statement from tables that aren't partitioned
+RETENTION_DELETE_BATCH_SIZE = int(os.getenv("RETENTION_DELETE_BATCH_SIZE", "10000"))
+
+# Suffix of monthly partition names, e.g. hashtag_trends_y2024m01
+PARTITION_SUFFIX = re.compile(r"_y(\d{4})m(\d{2})$")
+
+def month_start(value: Optional[datetime] = None) -> date:
+    """
+    Get the first day of the month of a date.
+    
+    Args:
+        value (datetime, optional): Date to get the month of. Defaults to now.
+    
+    Returns:
+        date: The first day of the month.
+    """
+    value = value or datetime.now()
+    return date(value.year, value.month, 1)
+
+def add_months(month: date, months: int) -> date:
+    """
+    Add a number of months to the first day of a month.
+    
+    Args:
+        month (date): First day of a month.
+        months (int): Number of months to add, may be negative.
+    
+    Returns:
+        date: The first day of the resulting month.
+    """
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    """
+    Get the name of the partition of a table for a month.
+    
+    Args:
+        table (str): Name of the partitioned table.
+        month (date): First day of the month.
+    
+    Returns:
+        str: Name of the partition.
+    """
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+def is_partitioned(connection: Connection, table: str) -> bool:
+    """
+    Check whether a table is partitioned.
+    
+    Args:
+        connection (Connection): Database connection.
+        table (str): Name of the table.
+    
+    Returns:
+        bool: True if the table is a partitioned PostgreSQL table.
+    """
+    if connection.dialect.name != "postgresql":
+        return False
+    
+    return connection.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"
+    ), {"table": table}).first() is not None
+
+def list_partitions(connection: Connection, table: str) -> Dict[date, str]:
+    """
+    List the monthly partitions attached to a table.
+    
+    Args:
+        connection (Connection): Database connection.
+        table (str): Name of the partitioned table.
+    
+    Returns:
+        Dict[date, str]: Partition names keyed by the first day of their month.
+    """
+    rows = connection.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass(:table)"
+    ), {"table": table}).scalars()
+    
+    partitions = {}
+    for name in rows:
+        match = PARTITION_SUFFIX.search(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    
+    return partitions
+
+def default_partition_name(table: str) -> str:
+    """
+    Get the name of the default partition of a table.
+    
+    Args:
+        table (str): Name of the partitioned table.
+    
+    Returns:
+        str: Name of the partition that holds rows no monthly partition covers.
+    """
+    return f"{table}_default"
+
+def _default_months(connection: Connection, table: str) -> List[date]:
+    """
+    List the months of the rows in the default partition of a table.
+    
+    Args:
+        connection (Connection): Database connection.
+        table (str): Name of the partitioned table.
+    
+    Returns:
+        List[date]: First day of each month, empty if the table has no default partition.
+    """
+    default = default_partition_name(table)
+    if connection.execute(text("SELECT to_regclass(:name)"), {"name": default}).scalar() is None:
+        return []
+    
+    return list(connection.execute(text(
+        f"SELECT DISTINCT date_trunc('month', {PARTITIONED_TABLES[table]})::date FROM {default}"
+    )).scalars())
+
+def _create_partition(connection: Connection, table: str, month: date, in_default: bool) -> str:
+    """
+    Create the partition of a table for a month.
+    
+    A partition can't be created while the default partition holds rows of its month,
+    so those rows are moved into the new table before it is attached.
+    
+    Args:
+        connection (Connection): Database connection.
+        table (str): Name of the partitioned table.
+        month (date): First day of the month.
+        in_default (bool): Whether the default partition holds rows of the month.
+    
+    Returns:
+        str: Name of the partition.
+    """
+    name = partition_name(table, month)
+    bounds = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    
+    if not in_default:
+        connection.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} FOR VALUES {bounds}"))
+        return name
+    
+    column = PARTITIONED_TABLES[table]
+    connection.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)"))
+    connection.execute(text(
+        f"WITH moved AS (DELETE FROM {default_partition_name(table)} "
+        f"WHERE {column} >= '{month.isoformat()}' AND {column} < '{add_months(month, 1).isoformat()}' RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ))
+    connection.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+    
+    return name
+
+def ensure_partitions(months_ahead: Optional[int] = None) -> List[str]:
+    """
+    Create the partitions for the current month and the months ahead where they are missing.
+    
+    Rows written to the default partition, because their month had no partition yet,
+    are moved to the partition created for it.
+    
+    Args:
+        months_ahead (int, optional): Number of future months to create partitions for.
+            Defaults to PARTITION_MONTHS_AHEAD.
+    
+    Returns:
+        List[str]: Names of the partitions that were created.
+    """
+    months_ahead = PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    created = []
+    
+    for table in PARTITIONED_TABLES:
+        # One transaction per table, so the default partition is locked briefly
+        with engine.begin() as connection:
+            if not is_partitioned(connection, table):
+                continue
+            
+            existing = list_partitions(connection, table)
+            this_month = month_start()
+            in_default = set(_default_months(connection, table))
+            months = {add_months(this_month, offset) for offset in range(months_ahead + 1)} | in_default
+            
+            for month in sorted(months):
+                if month in existing:
+                    continue
+                
+                created.append(_create_partition(connection, table, month, month in in_default))
+    
+    return created
+
+def apply_retention(months: Optional[int] = None, action: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Remove data older than the retention period.
+    
+    Partitions that lie entirely before the cutoff are detached or dropped as a whole.
+    Tables that aren't partitioned are cleaned up with batched DELETEs.
+    
+    Args:
+        months (int, optional): Number of months to keep. Defaults to RETENTION_MONTHS.
+        action (str, optional): "detach" or "drop" for old partitions. Defaults to RETENTION_ACTION.
+    
+    Returns:
+        Dict[str, Any]: The cutoff and what was removed per table.
+    """
+    months = RETENTION_MONTHS if months is None else months
+    action = (action or RETENTION_ACTION).lower()
+    
+    if months <= 0:
+        return {"cutoff": None, "tables": {}}
+    
+    if action not in ("detach", "drop"):
+        raise ValueError(f"Unknown retention action: {action}")
+    
+    cutoff = add_months(month_start(), -months)
+    report = {"cutoff": cutoff.isoformat(), "tables": {}}
+    
+    for table, column in RETENTION_TABLES.items():
+        with engine.begin() as connection:
+            partitioned = is_partitioned(connection, table)
+        
+        if partitioned:
+            report["tables"][table] = {action: _remove_partitions(table, cutoff, action)}
+        else:
+            report["tables"][table] = {"deleted": _delete_before(table, column, cutoff)}
+    
+    dataset_generations.bump(table for table, removed in report["tables"].items() if any(removed.values()))
+    
+    return report
+
+def _remove_partitions(table: str, cutoff: date, action: str) -> List[str]:
+    """
+    Detach or drop the partitions of a table that end before the cutoff.
+    
+    Args:
+        table (str): Name of the partitioned table.
+        cutoff (date): First month to keep.
+        action (str): "detach" or "drop".
+    
+    Returns:
+        List[str]: Names of the removed partitions.
+    """
+    removed = []
+    
+    with engine.begin() as connection:
+        for month, name in sorted(list_partitions(connection, table).items()):
+            if month >= cutoff:
+                continue
+            
+            if action == "drop":
+                connection.execute(text(f"DROP TABLE {name}"))
+            else:
+                connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            removed.append(name)
+    
+    return removed
+
+def _delete_before(table: str, column: str, cutoff: date) -> int:
+    """
+    Delete the rows of a table older than the cutoff in batches.
+    
+    Each batch is committed separately, so locks are held briefly.
+    
+    Args:
+        table (str): Name of the table.
+        column (str): Time column to compare with the cutoff.
+        cutoff (date): First month to keep.
+    
+    Returns:
+        int: Number of deleted rows.
+    """
+    deleted = 0
+    cutoff_value = datetime.combine(cutoff, datetime.min.time())
+    
+    while True:
+        with engine.begin() as connection:
+            result = connection.execute(text(
+                f"DELETE FROM {table} WHERE id IN ("
+                f"SELECT id FROM {table} WHERE {column} < :cutoff LIMIT :batch_size)"
+            ).bindparams(bindparam("cutoff", type_=DateTime)), {
+                "cutoff": cutoff_value, "batch_size": RETENTION_DELETE_BATCH_SIZE
+            })
+        
+        deleted += result.rowcount
+        if result.rowcount < RETENTION_DELETE_BATCH_SIZE:
+            return deleted
+
+def maintain_partitions() -> Dict[str, Any]:
+    """
+    Create upcoming partitions and apply the retention policy.
+    
+    Returns:
+        Dict[str, Any]: The created partitions and the retention report.
+    """
+    created = ensure_partitions()
+    retention = apply_retention()
+    
+    return {"created": created, "retention": retention}
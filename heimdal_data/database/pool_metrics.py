@@ -0,0 +1,74 @@
+import threading
+from typing import Dict, Any
+
+class PoolMetrics:
+    """
+    Tracks how long sessions wait to check a connection out of a pool.
+    """
+    
+    def __init__(self, name: str):
+        """
+        Initialize the metrics.
+        
+        Args:
+            name (str): Name of the pool, e.g. "reader" or "writer".
+        """
+        self.name = name
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+        self.lock = threading.Lock()
+    
+    def record(self, wait: float):
+        """
+        Record a connection checkout.
+        
+        Args:
+            wait (float): Seconds spent waiting for the connection.
+        """
+        with self.lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.last_wait = wait
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the checkout wait statistics.
+        
+        Returns:
+            Dict[str, Any]: Number of checkouts and the average, maximum and last wait in milliseconds.
+        """
+        with self.lock:
+            return {
+                "checkouts": self.checkouts,
+                "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "last_wait_ms": round(self.last_wait * 1000, 3)
+            }
+
+# Checkout metrics per pool
+pool_metrics = {
+    "reader": PoolMetrics("reader"),
+    "writer": PoolMetrics("writer")
+}
+
+def pool_status(pool) -> Dict[str, Any]:
+    """
+    Get the current usage of a connection pool.
+    
+    Args:
+        pool: SQLAlchemy connection pool.
+    
+    Returns:
+        Dict[str, Any]: Pool size, checked out connections and overflow, where the pool reports them.
+    """
+    status = {"class": type(pool).__name__}
+    
+    for name in ("size", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            status[name] = method()
+    
+    return status
@@ -0,0 +1,381 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+from sqlalchemy import select, delete, func, case, literal, true, tuple_, and_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+
+from .database import engine
+from .models import Term, HashtagTrend, SocialEngagement, HashtagTrendRollup, EngagementRollup
+
+# Resolutions the rollups are kept at, per source table
+ROLLUP_RESOLUTIONS = {
+    "hashtag_trends": ("hour", "day"),
+    "social_engagement": ("day",)
+}
+
+# Resolutions of hashtag trend rows that can be rolled up at each rollup resolution
+COMPACTED_RESOLUTIONS = {
+    "hour": ("raw",),
+    "day": ("raw", "day")
+}
+
+# Column of each source table that decides which bucket a row belongs to
+ROLLUP_TIME_COLUMNS = {
+    "hashtag_trends": "bucket",
+    "social_engagement": "timestamp"
+}
+
+# Source tables whose rollups are deleted and rebuilt for a touched range, rather than upserted.
+# Engagement rows move to another day when a post is collected again, leaving stale buckets behind.
+# Hashtag trends never change bucket, and their rollups have to outlive compaction, which
+# merges the rows of hours and days that can't be rolled up again.
+REBUILT_ROLLUPS = {
+    "social_engagement": EngagementRollup
+}
+
+def day_start(value: datetime) -> datetime:
+    """
+    Get the start of the day of a time.
+    
+    Args:
+        value (datetime): Time to truncate.
+    
+    Returns:
+        datetime: Midnight of the same day.
+    """
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def touched_range(table_name: str, records: Iterable[Dict[str, Any]]) -> Optional[Tuple[datetime, datetime]]:
+    """
+    Get the range of days a batch of records falls into.
+    
+    Args:
+        table_name (str): Name of the table the records are written to.
+        records (Iterable[Dict[str, Any]]): Records keyed by column name.
+    
+    Returns:
+        Optional[Tuple[datetime, datetime]]: Start of the first day and end of the last day,
+            or None if the table has no rollups.
+    """
+    column = ROLLUP_TIME_COLUMNS.get(table_name)
+    if not column:
+        return None
+    
+    # Rows without a time get the server default, which is now
+    times = [record.get(column) or record.get("timestamp") or datetime.now() for record in records]
+    if not times:
+        return None
+    
+    return day_start(min(times)), day_start(max(times)) + timedelta(days=1)
+
+def previous_days(session, table, records: List[Dict[str, Any]], key: Tuple[str, ...]) -> List[Tuple[datetime, datetime]]:
+    """
+    Get the days the stored rows an upsert is about to overwrite belong to.
+    
+    An upsert moves a row to the day of its new time, so the rollups of its old
+    day have to be refreshed as well. Only tables whose time column isn't part
+    of the natural key can move rows.
+    
+    Args:
+        session: Database session or connection, in the transaction of the upsert.
+        table: SQLAlchemy table the records are upserted into.
+        records (List[Dict[str, Any]]): Records keyed by column name.
+        key (Tuple[str, ...]): Natural key columns of the table.
+    
+    Returns:
+        List[Tuple[datetime, datetime]]: Start and end of each day.
+    """
+    column = ROLLUP_TIME_COLUMNS.get(table.name)
+    keys = [tuple(record.get(part) for part in key) for record in records]
+    if not column or column in key or not keys:
+        return []
+    
+    times = session.execute(
+        select(table.c[column]).where(tuple_(*(table.c[part] for part in key)).in_(keys))
+    ).scalars()
+    
+    days = {day_start(_local(value)) for value in times if value}
+    return [(day, day + timedelta(days=1)) for day in sorted(days)]
+
+def _local(value: datetime) -> datetime:
+    """
+    Get a time as a local time without time zone, like the times collectors write.
+    
+    Args:
+        value (datetime): Time read from or written to the database.
+    
+    Returns:
+        datetime: The local time.
+    """
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+
+def merge_ranges(
+    ranges: Optional[List[Tuple[datetime, datetime]]], *added: Optional[Tuple[datetime, datetime]]
+) -> List[Tuple[datetime, datetime]]:
+    """
+    Add ranges of days to a list of ranges, merging the ones that overlap or touch.
+    
+    Ranges are kept apart otherwise, so a post from last year collected again
+    refreshes one old day rather than every day since.
+    
+    Args:
+        ranges (Optional[List[Tuple[datetime, datetime]]]): Ranges, sorted and apart.
+        *added (Optional[Tuple[datetime, datetime]]): Ranges to add, None ones are skipped.
+    
+    Returns:
+        List[Tuple[datetime, datetime]]: The ranges, sorted and apart.
+    """
+    merged = []
+    
+    for start, end in sorted((_local(start), _local(end)) for start, end in filter(None, [*(ranges or []), *added])):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    
+    return merged
+
+def truncate(column, resolution: str, dialect: str):
+    """
+    Build an expression that truncates a time column to the start of its hour or day.
+    
+    Args:
+        column: Time column.
+        resolution (str): "hour" or "day".
+        dialect (str): Name of the database dialect.
+    
+    Returns:
+        ColumnElement: The truncated time.
+    """
+    if dialect == "postgresql":
+        return func.date_trunc(resolution, column)
+    
+    # Same format SQLAlchemy stores datetimes in on SQLite
+    if resolution == "hour":
+        return func.strftime("%Y-%m-%d %H:00:00.000000", column)
+    return func.strftime("%Y-%m-%d 00:00:00.000000", column)
+
+def _upsert(dialect: str, rollup, columns: List[str], query, key: List[str]):
+    """
+    Build an INSERT ... SELECT that replaces existing rollup rows.
+    
+    Args:
+        dialect (str): Name of the database dialect, "postgresql" or "sqlite".
+        rollup: Rollup model.
+        columns (List[str]): Columns in the order the query returns them.
+        query: Aggregate query.
+        key (List[str]): Unique key of the rollup table.
+    
+    Returns:
+        Insert: The statement.
+    """
+    dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = dialect_insert(rollup.__table__).from_select(columns, query)
+    
+    return statement.on_conflict_do_update(
+        index_elements=key,
+        set_={column: statement.excluded[column] for column in columns if column not in key}
+    )
+
+def trend_rollup_statement(resolution: str, start: datetime, end: datetime, dialect: str):
+    """
+    Build the statement that recomputes the hashtag trend rollups for a range of time.
+    
+    Args:
+        resolution (str): "hour" or "day".
+        start (datetime): Start of the range.
+        end (datetime): End of the range.
+        dialect (str): Name of the database dialect.
+    
+    Returns:
+        Insert: The statement.
+    """
+    bucket = truncate(HashtagTrend.bucket, resolution, dialect)
+    
+    # Compacted rows stand for several snapshots, see database/compaction.py
+    samples = func.coalesce(HashtagTrend.sample_count, 1)
+    
+    # Rank the snapshots in each bucket, newest first, to find the latest engagement
+    ranked = select(
+        HashtagTrend.platform,
+        Term.text.label("hashtag"),
+        bucket.label("bucket"),
+        HashtagTrend.engagement,
+        func.coalesce(
+            func.round(HashtagTrend.engagement_mean * samples), HashtagTrend.engagement
+        ).label("engagement_sum"),
+        func.coalesce(HashtagTrend.engagement_max, HashtagTrend.engagement).label("engagement_max"),
+        samples.label("samples"),
+        HashtagTrend.timestamp,
+        func.row_number().over(
+            partition_by=[HashtagTrend.platform, HashtagTrend.hashtag_id, bucket],
+            order_by=HashtagTrend.timestamp.desc()
+        ).label("rank")
+    ).join(
+        Term, Term.id == HashtagTrend.hashtag_id
+    ).where(
+        and_(
+            HashtagTrend.bucket >= start,
+            HashtagTrend.bucket < end,
+            # Rows compacted to a coarser resolution can't be split into hours or days again
+            HashtagTrend.resolution.in_(COMPACTED_RESOLUTIONS[resolution])
+        )
+    ).subquery()
+    
+    query = select(
+        literal(resolution),
+        ranked.c.bucket,
+        ranked.c.platform,
+        ranked.c.hashtag,
+        func.sum(ranked.c.engagement_sum),
+        func.max(ranked.c.engagement_max),
+        func.sum(ranked.c.samples),
+        func.max(case((ranked.c.rank == 1, ranked.c.engagement))),
+        func.max(ranked.c.timestamp)
+    ).where(true()).group_by(ranked.c.bucket, ranked.c.platform, ranked.c.hashtag)
+    
+    columns = [
+        "resolution", "bucket", "platform", "hashtag", "engagement_sum", "engagement_max",
+        "sample_count", "latest_engagement", "latest_timestamp"
+    ]
+    
+    return _upsert(dialect, HashtagTrendRollup, columns, query, ["resolution", "platform", "hashtag", "bucket"])
+
+def engagement_rollup_statement(resolution: str, start: datetime, end: datetime, dialect: str):
+    """
+    Build the statement that recomputes the engagement rollups for a range of time.
+    
+    Args:
+        resolution (str): "day".
+        start (datetime): Start of the range.
+        end (datetime): End of the range.
+        dialect (str): Name of the database dialect.
+    
+    Returns:
+        Insert: The statement.
+    """
+    bucket = truncate(SocialEngagement.timestamp, resolution, dialect)
+    engagement = (
+        func.coalesce(SocialEngagement.likes, 0)
+        + func.coalesce(SocialEngagement.comments, 0)
+        + func.coalesce(SocialEngagement.shares, 0)
+    )
+    
+    # Rank the posts in each bucket, newest first, to find the latest engagement
+    ranked = select(
+        SocialEngagement.platform,
+        SocialEngagement.post_type,
+        bucket.label("bucket"),
+        func.coalesce(SocialEngagement.likes, 0).label("likes"),
+        func.coalesce(SocialEngagement.comments, 0).label("comments"),
+        func.coalesce(SocialEngagement.shares, 0).label("shares"),
+        func.coalesce(SocialEngagement.reach, 0).label("reach"),
+        engagement.label("engagement"),
+        SocialEngagement.timestamp,
+        func.row_number().over(
+            partition_by=[SocialEngagement.platform, SocialEngagement.post_type, bucket],
+            order_by=SocialEngagement.timestamp.desc()
+        ).label("rank")
+    ).where(
+        and_(SocialEngagement.timestamp >= start, SocialEngagement.timestamp < end)
+    ).subquery()
+    
+    query = select(
+        literal(resolution),
+        ranked.c.bucket,
+        ranked.c.platform,
+        ranked.c.post_type,
+        func.sum(ranked.c.likes),
+        func.sum(ranked.c.comments),
+        func.sum(ranked.c.shares),
+        func.sum(ranked.c.reach),
+        func.sum(ranked.c.engagement),
+        func.max(ranked.c.engagement),
+        func.count(),
+        func.max(case((ranked.c.rank == 1, ranked.c.engagement))),
+        func.max(ranked.c.timestamp)
+    ).where(true()).group_by(ranked.c.bucket, ranked.c.platform, ranked.c.post_type)
+    
+    columns = [
+        "resolution", "bucket", "platform", "post_type", "likes_sum", "comments_sum", "shares_sum",
+        "reach_sum", "engagement_sum", "engagement_max", "post_count", "latest_engagement", "latest_timestamp"
+    ]
+    
+    return _upsert(dialect, EngagementRollup, columns, query, ["resolution", "platform", "post_type", "bucket"])
+
+# Statement builder per source table
+ROLLUP_STATEMENTS = {
+    "hashtag_trends": trend_rollup_statement,
+    "social_engagement": engagement_rollup_statement
+}
+
+def refresh_rollups_in_connection(
+    connection: Connection, touched: Dict[str, List[Tuple[datetime, datetime]]]
+) -> int:
+    """
+    Recompute the rollups for the days touched by a write, using an existing connection.
+    
+    The buckets are recomputed from the raw rows, so refreshing is idempotent and
+    stays correct when collected rows are updated in place. For the tables in
+    REBUILT_ROLLUPS the buckets of the range are deleted first, so buckets whose
+    rows moved away or were deleted don't keep their old totals.
+    
+    Args:
+        connection (Connection): Database connection.
+        touched (Dict[str, List[Tuple[datetime, datetime]]]): Ranges of days written per source table.
+    
+    Returns:
+        int: Number of statements run.
+    """
+    dialect = connection.dialect.name
+    
+    # Upserts from a query are only available on PostgreSQL and SQLite
+    if dialect not in ("postgresql", "sqlite"):
+        return 0
+    
+    statements = 0
+    for table_name, ranges in touched.items():
+        rollup = REBUILT_ROLLUPS.get(table_name)
+        
+        for start, end in ranges:
+            for resolution in ROLLUP_RESOLUTIONS.get(table_name, ()):
+                if rollup is not None:
+                    connection.execute(delete(rollup).where(
+                        rollup.resolution == resolution, rollup.bucket >= start, rollup.bucket < end
+                    ))
+                    statements += 1
+                
+                connection.execute(ROLLUP_STATEMENTS[table_name](resolution, start, end, dialect))
+                statements += 1
+    
+    return statements
+
+def refresh_rollups(touched: Dict[str, List[Tuple[datetime, datetime]]], bind=None) -> int:
+    """
+    Recompute the rollups for the days touched by a write in a new transaction.
+    
+    Args:
+        touched (Dict[str, List[Tuple[datetime, datetime]]]): Ranges of days written per source table.
+        bind (Engine, optional): Engine of the database written to. Defaults to the application engine.
+    
+    Returns:
+        int: Number of statements run.
+    """
+    with (bind or engine).begin() as connection:
+        return refresh_rollups_in_connection(connection, touched)
+
+def rebuild_rollups(days: Optional[int] = None) -> int:
+    """
+    Recompute the rollups for all data, or for the last days.
+    
+    Args:
+        days (int, optional): Number of days to rebuild. Defaults to all data.
+    
+    Returns:
+        int: Number of statements run.
+    """
+    end = day_start(datetime.now()) + timedelta(days=1)
+    start = end - timedelta(days=days + 1) if days else datetime(1970, 1, 1)
+    
+    return refresh_rollups({table_name: [(start, end)] for table_name in ROLLUP_RESOLUTIONS})
@@ -0,0 +1,383 @@
+import os
+import json
+import time
+import zlib
+import struct
+import logging
+import threading
+from datetime import datetime, date
+from typing import Dict, List, Any, Optional, Tuple, Type
+
+from sqlalchemy.exc import DBAPIError, DisconnectionError, InterfaceError, OperationalError, TimeoutError
+
+from .database import PROJECT_DIR
+from .models import HashtagTrend, SocialEngagement, SeoData
+
+# Directory the spool segments are stored in
+SPOOL_DIR = os.getenv("SPOOL_DIR") or os.path.join(PROJECT_DIR, "spool")
+
+# Whether saves fall back to the spool when the database is unavailable
+SPOOL_ENABLED = os.getenv("SPOOL_ENABLED", "true").lower() == "true"
+
+# Size in bytes after which a segment is closed and a new one is started
+SPOOL_SEGMENT_SIZE = int(os.getenv("SPOOL_SEGMENT_SIZE", str(16 * 1024 * 1024)))
+
+# Whether every frame is flushed to disk before the save returns
+SPOOL_FSYNC = os.getenv("SPOOL_FSYNC", "true").lower() == "true"
+
+# Seconds to skip the database and spool directly after a failed write
+SPOOL_RETRY_INTERVAL = float(os.getenv("SPOOL_RETRY_INTERVAL", "30"))
+
+# Frame header: magic, payload length and CRC32 of the payload
+FRAME_MAGIC = b"HS"
+FRAME_HEADER = struct.Struct(">2sII")
+
+# Models that can be spooled, by table name
+SPOOLED_MODELS = {model.__tablename__: model for model in (HashtagTrend, SocialEngagement, SeoData)}
+
+logger = logging.getLogger("spool")
+
+def is_connection_error(error: BaseException) -> bool:
+    """
+    Check whether a database error means the database couldn't be reached.
+    
+    Only these errors are worth spooling for, as the same write will succeed once
+    the database is back. Errors caused by the data itself, such as integrity or
+    data errors, fail the same way every time they are retried.
+    
+    Args:
+        error (BaseException): The error a write failed with.
+    
+    Returns:
+        bool: True for connection, pool and operational errors, False otherwise.
+    """
+    if isinstance(error, (OperationalError, InterfaceError, DisconnectionError, TimeoutError)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+def _encode(value: Any) -> Any:
+    """
+    Encode values JSON can't represent.
+    
+    Args:
+        value (Any): Value to encode.
+    
+    Returns:
+        Any: A JSON-serializable representation.
+    """
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Can't spool value of type {type(value).__name__}")
+
+def _decode(value: Dict[str, Any]) -> Any:
+    """
+    Decode values encoded by _encode.
+    
+    Args:
+        value (Dict[str, Any]): JSON object.
+    
+    Returns:
+        Any: The original value.
+    """
+    if len(value) == 1:
+        if "$datetime" in value:
+            return datetime.fromisoformat(value["$datetime"])
+        if "$date" in value:
+            return date.fromisoformat(value["$date"])
+    return value
+
+def encode_frame(table: str, records: List[Dict[str, Any]]) -> bytes:
+    """
+    Encode a batch of records as a compressed, checksummed frame.
+    
+    Args:
+        table (str): Name of the table the records belong to.
+        records (List[Dict[str, Any]]): Records keyed by column name.
+    
+    Returns:
+        bytes: The frame.
+    """
+    payload = zlib.compress(
+        json.dumps({"table": table, "records": records}, default=_encode, separators=(",", ":")).encode("utf-8")
+    )
+    return FRAME_HEADER.pack(FRAME_MAGIC, len(payload), zlib.crc32(payload)) + payload
+
+def read_segment(path: str) -> Tuple[List[Tuple[str, List[Dict[str, Any]]]], bool]:
+    """
+    Read the frames of a segment.
+    
+    Reading stops at the first incomplete or damaged frame, which is what a crash
+    in the middle of an append leaves behind.
+    
+    Args:
+        path (str): Path of the segment.
+    
+    Returns:
+        Tuple[List[Tuple[str, List[Dict[str, Any]]]], bool]: Table name and records of each frame,
+            and whether the whole segment could be read.
+    """
+    frames = []
+    
+    with open(path, "rb") as segment:
+        while True:
+            header = segment.read(FRAME_HEADER.size)
+            if not header:
+                return frames, True
+            
+            if len(header) < FRAME_HEADER.size:
+                logger.warning(f"Incomplete frame header at the end of {path}")
+                return frames, False
+            
+            magic, length, checksum = FRAME_HEADER.unpack(header)
+            payload = segment.read(length)
+            
+            if magic != FRAME_MAGIC or len(payload) < length or zlib.crc32(payload) != checksum:
+                logger.warning(f"Damaged frame in {path}, skipping the rest of the segment")
+                return frames, False
+            
+            frame = json.loads(zlib.decompress(payload), object_hook=_decode)
+            frames.append((frame["table"], frame["records"]))
+
+class Spool:
+    """
+    Append-only on-disk spool of collected records, for when the database can't take them.
+    
+    Records are appended as frames (length, CRC32 and zlib-compressed JSON) to
+    segment files. A segment is closed once it grows past the segment size, and
+    closed segments are replayed into the database oldest first and then removed.
+    """
+    
+    def __init__(self, directory: Optional[str] = None, segment_size: Optional[int] = None, fsync: Optional[bool] = None):
+        """
+        Initialize the spool.
+        
+        Args:
+            directory (str, optional): Directory for the segments. Defaults to SPOOL_DIR.
+            segment_size (int, optional): Size in bytes at which segments are rotated. Defaults to SPOOL_SEGMENT_SIZE.
+            fsync (bool, optional): Whether to flush every frame to disk. Defaults to SPOOL_FSYNC.
+        """
+        self.directory = directory or SPOOL_DIR
+        self.segment_size = segment_size or SPOOL_SEGMENT_SIZE
+        self.fsync = SPOOL_FSYNC if fsync is None else fsync
+        self.lock = threading.Lock()
+        self.replay_lock = threading.Lock()
+        self.current = None
+        
+        # Time until which saves go straight to the spool after a database failure
+        self.database_unavailable_until = 0.0
+        
+        # Counters for the status endpoint
+        self.frames_written = 0
+        self.records_written = 0
+        self.records_replayed = 0
+        self.last_replay = None
+        self.last_error = None
+    
+    def _segment_paths(self) -> List[str]:
+        """
+        Get the paths of all segments, oldest first.
+        
+        Returns:
+            List[str]: Paths of the segments.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        
+        return [
+            os.path.join(self.directory, name)
+            for name in sorted(os.listdir(self.directory))
+            if name.startswith("segment-") and name.endswith(".spool")
+        ]
+    
+    def _failed_segment_count(self) -> int:
+        """
+        Get the number of segments moved aside because they couldn't be written.
+        
+        Returns:
+            int: Number of .failed segments.
+        """
+        if not os.path.isdir(self.directory):
+            return 0
+        
+        return sum(1 for name in os.listdir(self.directory) if name.endswith(".spool.failed"))
+    
+    def _new_segment(self) -> str:
+        """
+        Get the path for a new segment.
+        
+        Returns:
+            str: Path of the segment, numbered after the newest existing one.
+        """
+        paths = self._segment_paths()
+        number = int(os.path.basename(paths[-1])[8:-6]) + 1 if paths else 1
+        return os.path.join(self.directory, f"segment-{number:012d}.spool")
+    
+    def append(self, table: str, records: List[Dict[str, Any]]) -> int:
+        """
+        Append a batch of records to the current segment.
+        
+        Args:
+            table (str): Name of the table the records belong to.
+            records (List[Dict[str, Any]]): Records keyed by column name.
+        
+        Returns:
+            int: Number of bytes written.
+        """
+        frame = encode_frame(table, records)
+        
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            
+            if self.current is None or not os.path.exists(self.current):
+                self.current = self._new_segment()
+            
+            with open(self.current, "ab") as segment:
+                segment.write(frame)
+                segment.flush()
+                if self.fsync:
+                    os.fsync(segment.fileno())
+                size = segment.tell()
+            
+            # Close the segment once it is large enough, so it can be replayed
+            if size >= self.segment_size:
+                self.current = None
+            
+            self.frames_written += 1
+            self.records_written += len(records)
+        
+        return len(frame)
+    
+    def rotate(self):
+        """
+        Close the current segment, so everything spooled so far can be replayed.
+        """
+        with self.lock:
+            self.current = None
+    
+    def pending_segments(self) -> List[str]:
+        """
+        Get the closed segments waiting to be replayed, oldest first.
+        
+        Returns:
+            List[str]: Paths of the segments.
+        """
+        with self.lock:
+            return [path for path in self._segment_paths() if path != self.current]
+    
+    def database_available(self) -> bool:
+        """
+        Check if saves should try the database or go straight to the spool.
+        
+        Returns:
+            bool: False for a while after a failed database write.
+        """
+        return time.monotonic() >= self.database_unavailable_until
+    
+    def mark_database_unavailable(self, error: Exception):
+        """
+        Send saves straight to the spool for a while after a failed database write.
+        
+        Args:
+            error (Exception): The error the write failed with.
+        """
+        self.database_unavailable_until = time.monotonic() + SPOOL_RETRY_INTERVAL
+        self.last_error = str(error)
+    
+    def replay(self, writer=None) -> Dict[str, Any]:
+        """
+        Drain the spool into the database.
+        
+        Each segment is written in a single transaction and removed once it is committed.
+        Replaying stops at the first segment that can't be written because the database
+        is unavailable. A segment that fails for another reason would fail on every replay,
+        so it is renamed to .failed for inspection and replaying goes on with the next one.
+        
+        Args:
+            writer (BulkWriter, optional): Writer to use. Defaults to the shared bulk writer.
+        
+        Returns:
+            Dict[str, Any]: Number of replayed and failed segments and records, and the error if replaying stopped early.
+        """
+        if writer is None:
+            from .bulk import bulk_writer
+            writer = bulk_writer
+        
+        report = {"segments": 0, "records": 0, "failed": 0, "error": None}
+        
+        # Only one replay at a time, so no segment is written twice
+        if not self.replay_lock.acquire(blocking=False):
+            return report
+        
+        try:
+            self.rotate()
+            
+            for path in self.pending_segments():
+                frames, complete = read_segment(path)
+                
+                batches: Dict[Type, List[Dict[str, Any]]] = {}
+                for table, records in frames:
+                    model = SPOOLED_MODELS.get(table)
+                    if model is None:
+                        logger.warning(f"Skipping spooled records for unknown table {table}")
+                        continue
+                    batches.setdefault(model, []).extend(records)
+                
+                try:
+                    counts = writer.write_many(batches) if batches else {}
+                except Exception as e:
+                    if is_connection_error(e):
+                        self.mark_database_unavailable(e)
+                        report["error"] = str(e)
+                        break
+                    
+                    logger.error(f"Moving spool segment {os.path.basename(path)} aside, it can't be written: {e}")
+                    os.replace(path, f"{path}.failed")
+                    self.last_error = str(e)
+                    report["failed"] += 1
+                    continue
+                
+                # Keep damaged segments around for inspection, they are not replayed again
+                if complete:
+                    os.remove(path)
+                else:
+                    os.replace(path, f"{path}.{int(time.time())}.damaged")
+                
+                replayed = sum(counts.values())
+                report["segments"] += 1
+                report["records"] += replayed
+                self.records_replayed += replayed
+            
+            if report["segments"] and not report["error"]:
+                self.database_unavailable_until = 0.0
+            
+            self.last_replay = datetime.now().isoformat()
+            return report
+        finally:
+            self.replay_lock.release()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the state of the spool.
+        
+        Returns:
+            Dict[str, Any]: Pending segments and bytes, counters and whether saves currently bypass the database.
+        """
+        paths = self._segment_paths()
+        
+        return {
+            "enabled": SPOOL_ENABLED,
+            "segments": len(paths),
+            "bytes": sum(os.path.getsize(path) for path in paths),
+            "frames_written": self.frames_written,
+            "records_written": self.records_written,
+            "records_replayed": self.records_replayed,
+            "failed_segments": self._failed_segment_count(),
+            "bypassing_database": not self.database_available(),
+            "last_replay": self.last_replay,
+            "last_error": self.last_error
+        }
+
+# Shared spool used by the collectors
+spool = Spool()
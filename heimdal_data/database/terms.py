@@ -0,0 +1,181 @@
+import os
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import select, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, aliased
+
+from .models import Term
+
+# Maximum number of term ids kept in memory per cache
+TERM_CACHE_SIZE = int(os.getenv("TERM_CACHE_SIZE", "100000"))
+
+# Number of terms looked up or inserted per statement
+TERM_CHUNK_SIZE = 1000
+
+# Text columns of the data tables that are stored as term ids, and the id column they are stored in
+INTERNED_COLUMNS = {
+    "hashtag_trends": {"hashtag": "hashtag_id"},
+    "seo_data": {"keyword": "keyword_id"}
+}
+
+class TermCache:
+    """
+    Maps hashtag and keyword text to the ids of their rows in the terms table.
+    
+    Known ids are kept in memory, least recently used first out, so ingestion only
+    queries the terms table for text it hasn't seen before. Terms inserted by a
+    transaction are kept in the session until it commits, so a rolled back
+    transaction never leaves ids in the cache that don't exist.
+    """
+    
+    def __init__(self, max_size: Optional[int] = None):
+        """
+        Initialize the term cache.
+        
+        Args:
+            max_size (int, optional): Maximum number of ids to keep. Defaults to TERM_CACHE_SIZE.
+        """
+        self.max_size = max_size or TERM_CACHE_SIZE
+        self.ids: "OrderedDict[str, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def resolve(self, session: Session, texts: Iterable[str]) -> Dict[str, int]:
+        """
+        Get the ids of terms, inserting the ones that don't exist yet.
+        
+        Args:
+            session (Session): Database session, new terms are inserted in its transaction.
+            texts (Iterable[str]): Hashtag or keyword text.
+        
+        Returns:
+            Dict[str, int]: Term id per text.
+        """
+        pending = session.info.setdefault("new_terms", {})
+        ids = {}
+        missing = []
+        
+        for text in set(texts):
+            if text in self.ids:
+                self.ids.move_to_end(text)
+                ids[text] = self.ids[text]
+                self.hits += 1
+            elif text in pending:
+                ids[text] = pending[text]
+            else:
+                missing.append(text)
+        
+        if not missing:
+            return ids
+        
+        self.misses += len(missing)
+        
+        for start in range(0, len(missing), TERM_CHUNK_SIZE):
+            chunk = missing[start:start + TERM_CHUNK_SIZE]
+            
+            # Terms stored by earlier transactions can be cached right away
+            existing = dict(session.execute(select(Term.text, Term.id).where(Term.text.in_(chunk))).all())
+            self.publish(existing)
+            ids.update(existing)
+            
+            new = [text for text in chunk if text not in existing]
+            if not new:
+                continue
+            
+            session.execute(_insert_statement(session.get_bind().dialect.name), [{"text": text} for text in new])
+            inserted = dict(session.execute(select(Term.text, Term.id).where(Term.text.in_(new))).all())
+            pending.update(inserted)
+            ids.update(inserted)
+        
+        return ids
+    
+    def publish(self, ids: Dict[str, int]):
+        """
+        Add committed term ids to the cache.
+        
+        Args:
+            ids (Dict[str, int]): Term id per text.
+        """
+        for text, term_id in ids.items():
+            self.ids[text] = term_id
+            self.ids.move_to_end(text)
+        
+        while len(self.ids) > self.max_size:
+            self.ids.popitem(last=False)
+    
+    def clear(self):
+        """
+        Forget all cached ids.
+        """
+        self.ids.clear()
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the size and hit rate of the cache.
+        
+        Returns:
+            Dict[str, int]: Number of cached ids, cache hits and misses.
+        """
+        return {"size": len(self.ids), "hits": self.hits, "misses": self.misses}
+
+def _insert_statement(dialect: str):
+    """
+    Build an INSERT for new terms that skips terms inserted concurrently.
+    
+    Args:
+        dialect (str): Name of the database dialect.
+    
+    Returns:
+        Insert: The statement.
+    """
+    if dialect == "postgresql":
+        return postgresql.insert(Term.__table__).on_conflict_do_nothing(index_elements=["text"])
+    if dialect == "sqlite":
+        return sqlite.insert(Term.__table__).on_conflict_do_nothing(index_elements=["text"])
+    return insert(Term.__table__)
+
+def term_id_query(text: str):
+    """
+    Build a subquery for the id of a term, so a lookup by hashtag or keyword resolves it once.
+    
+    Args:
+        text (str): Hashtag or keyword text.
+    
+    Returns:
+        ScalarSelect: The subquery.
+    """
+    return select(Term.id).where(Term.text == text).scalar_subquery()
+
+def select_with_terms(table):
+    """
+    Build a query for all columns of a data table, with its term id columns replaced by their text.
+    
+    Each term id column of INTERNED_COLUMNS is joined to its own alias of the terms
+    table, and its text is returned under the name of the text column, e.g. hashtag.
+    
+    Args:
+        table (Table): Data table, e.g. HashtagTrend.__table__.
+    
+    Returns:
+        Select: The query, without conditions or order.
+    """
+    interned = {id_column: text_column for text_column, id_column in INTERNED_COLUMNS.get(table.name, {}).items()}
+    
+    columns = []
+    joins = []
+    
+    for column in table.columns:
+        if column.name in interned:
+            term = aliased(Term)
+            joins.append((term, term.id == column))
+            columns.append(term.text.label(interned[column.name]))
+        else:
+            columns.append(column)
+    
+    query = select(*columns).select_from(table)
+    for term, condition in joins:
+        query = query.join(term, condition)
+    
+    return query
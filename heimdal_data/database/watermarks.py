@@ -0,0 +1,76 @@
+from typing import Dict, Optional
+
+from .database import SessionLocal
+from .models import CollectorWatermark
+
+def get_watermarks(collector: str, endpoint: str) -> Dict[str, str]:
+    """
+    Get the watermarks of all accounts for a collector endpoint.
+    
+    Args:
+        collector (str): Name of the collector.
+        endpoint (str): Name of the endpoint.
+    
+    Returns:
+        Dict[str, str]: Watermark value per account.
+    """
+    db = SessionLocal()
+    try:
+        watermarks = db.query(CollectorWatermark).filter(
+            CollectorWatermark.collector == collector,
+            CollectorWatermark.endpoint == endpoint
+        ).all()
+        
+        return {watermark.account: watermark.value for watermark in watermarks}
+    finally:
+        db.close()
+
+def get_watermark(collector: str, account: str, endpoint: str) -> Optional[str]:
+    """
+    Get the watermark of a single account for a collector endpoint.
+    
+    Args:
+        collector (str): Name of the collector.
+        account (str): Account, page or location the watermark belongs to.
+        endpoint (str): Name of the endpoint.
+    
+    Returns:
+        Optional[str]: The watermark value, or None if the account hasn't been collected yet.
+    """
+    return get_watermarks(collector, endpoint).get(account)
+
+def set_watermarks(collector: str, endpoint: str, values: Dict[str, str]):
+    """
+    Store the watermarks of several accounts for a collector endpoint.
+    
+    Args:
+        collector (str): Name of the collector.
+        endpoint (str): Name of the endpoint.
+        values (Dict[str, str]): New watermark value per account.
+    """
+    if not values:
+        return
+    
+    db = SessionLocal()
+    try:
+        existing = {
+            watermark.account: watermark
+            for watermark in db.query(CollectorWatermark).filter(
+                CollectorWatermark.collector == collector,
+                CollectorWatermark.endpoint == endpoint,
+                CollectorWatermark.account.in_(list(values))
+            )
+        }
+        
+        for account, value in values.items():
+            if account in existing:
+                existing[account].value = value
+            else:
+                db.add(CollectorWatermark(collector=collector, account=account, endpoint=endpoint, value=value))
+        
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
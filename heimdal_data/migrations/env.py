@@ -0,0 +1,70 @@
+"""
+Alembic environment for the Heimdal SoMe Data Collection module.
+"""
+
+import sys
+from pathlib import Path
+
+from alembic import context
+from sqlalchemy import create_engine
+
+# Add the parent directory to sys.path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from heimdal_data.database.models import Base
+
+config = context.config
+target_metadata = Base.metadata
+
+def get_url() -> str:
+    """
+    Get the database URL to migrate.
+    
+    Returns:
+        str: The URL set on the Alembic config, or the application's database URL.
+    """
+    url = config.get_main_option("sqlalchemy.url")
+    if url:
+        return url
+    
+    from heimdal_data.database.database import DATABASE_URL
+    return DATABASE_URL
+
+def run_migrations_offline():
+    """
+    Run migrations in 'offline' mode, emitting SQL instead of executing it.
+    """
+    context.configure(
+        url=get_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True
+    )
+    
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    """
+    Run migrations in 'online' mode against a live connection.
+    """
+    # Reuse the connection passed in by run_migrations if there is one
+    connection = config.attributes.get("connection")
+    
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+    
+    engine = create_engine(get_url())
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
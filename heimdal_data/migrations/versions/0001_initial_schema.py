@@ -0,0 +1,93 @@
+"""
+Initial schema.
+
+Creates the tables the application created with Base.metadata.create_all before
+migrations were introduced. Tables that already exist are left alone, so existing
+databases can be brought under migration control by simply upgrading them.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    
+    if "hashtag_trends" not in existing:
+        op.create_table(
+            "hashtag_trends",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("platform", sa.String(50), nullable=False),
+            sa.Column("hashtag", sa.String(255), nullable=False),
+            sa.Column("engagement", sa.Integer(), nullable=False),
+            sa.Column("engagement_rate", sa.Float(), nullable=True),
+            sa.Column("volume", sa.Integer(), nullable=True),
+            sa.Column("timestamp", sa.DateTime(timezone=True), server_default=sa.func.now())
+        )
+        op.create_index("ix_hashtag_trends_id", "hashtag_trends", ["id"])
+        op.create_index("ix_hashtag_trends_platform", "hashtag_trends", ["platform"])
+        op.create_index("ix_hashtag_trends_hashtag", "hashtag_trends", ["hashtag"])
+        op.create_index("ix_hashtag_trends_timestamp", "hashtag_trends", ["timestamp"])
+    
+    if "social_engagement" not in existing:
+        op.create_table(
+            "social_engagement",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("platform", sa.String(50), nullable=False),
+            sa.Column("post_type", sa.String(50), nullable=False),
+            sa.Column("post_id", sa.String(255), nullable=True),
+            sa.Column("likes", sa.Integer(), nullable=True),
+            sa.Column("comments", sa.Integer(), nullable=True),
+            sa.Column("shares", sa.Integer(), nullable=True),
+            sa.Column("reach", sa.Integer(), nullable=True),
+            sa.Column("impressions", sa.Integer(), nullable=True),
+            sa.Column("content_snippet", sa.Text(), nullable=True),
+            sa.Column("timestamp", sa.DateTime(timezone=True), server_default=sa.func.now())
+        )
+        op.create_index("ix_social_engagement_id", "social_engagement", ["id"])
+        op.create_index("ix_social_engagement_platform", "social_engagement", ["platform"])
+        op.create_index("ix_social_engagement_timestamp", "social_engagement", ["timestamp"])
+    
+    if "seo_data" not in existing:
+        op.create_table(
+            "seo_data",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("keyword", sa.String(255), nullable=False),
+            sa.Column("trend_score", sa.Float(), nullable=True),
+            sa.Column("volume", sa.Integer(), nullable=True),
+            sa.Column("difficulty", sa.Float(), nullable=True),
+            sa.Column("cpc", sa.Float(), nullable=True),
+            sa.Column("competition", sa.Float(), nullable=True),
+            sa.Column("source", sa.String(50), nullable=False),
+            sa.Column("timestamp", sa.DateTime(timezone=True), server_default=sa.func.now())
+        )
+        op.create_index("ix_seo_data_id", "seo_data", ["id"])
+        op.create_index("ix_seo_data_keyword", "seo_data", ["keyword"])
+        op.create_index("ix_seo_data_timestamp", "seo_data", ["timestamp"])
+    
+    if "collector_watermarks" not in existing:
+        op.create_table(
+            "collector_watermarks",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("collector", sa.String(50), nullable=False),
+            sa.Column("account", sa.String(255), nullable=False),
+            sa.Column("endpoint", sa.String(100), nullable=False),
+            sa.Column("value", sa.String(255), nullable=False),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.UniqueConstraint("collector", "account", "endpoint", name="uq_collector_watermarks_key")
+        )
+        op.create_index("ix_collector_watermarks_id", "collector_watermarks", ["id"])
+
+def downgrade():
+    op.drop_table("collector_watermarks")
+    op.drop_table("seo_data")
+    op.drop_table("social_engagement")
+    op.drop_table("hashtag_trends")
@@ -0,0 +1,59 @@
+"""
+Natural keys for hashtag trends and social engagement.
+
+Adds the hourly bucket to hashtag_trends, removes existing duplicates and adds
+unique indexes on (platform, hashtag, bucket) and (platform, post_id), which the
+bulk writer uses to upsert re-collected rows instead of inserting them again.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    
+    op.add_column("hashtag_trends", sa.Column("bucket", sa.DateTime(timezone=True), nullable=True))
+    
+    # Backfill the bucket with the start of the hour of each snapshot
+    if dialect == "postgresql":
+        op.execute("UPDATE hashtag_trends SET bucket = date_trunc('hour', timestamp)")
+    else:
+        op.execute("UPDATE hashtag_trends SET bucket = strftime('%Y-%m-%d %H:00:00.000000', timestamp)")
+    
+    # Keep only the latest row for each natural key
+    op.execute("""
+        DELETE FROM hashtag_trends WHERE id NOT IN (
+            SELECT MAX(id) FROM hashtag_trends GROUP BY platform, hashtag, bucket
+        )
+    """)
+    op.execute("""
+        DELETE FROM social_engagement WHERE post_id IS NOT NULL AND id NOT IN (
+            SELECT MAX(id) FROM social_engagement WHERE post_id IS NOT NULL GROUP BY platform, post_id
+        )
+    """)
+    
+    with op.batch_alter_table("hashtag_trends") as batch_op:
+        batch_op.alter_column("bucket", existing_type=sa.DateTime(timezone=True), nullable=False)
+    
+    op.create_index(
+        "uq_hashtag_trends_platform_hashtag_bucket", "hashtag_trends", ["platform", "hashtag", "bucket"], unique=True
+    )
+    op.create_index(
+        "uq_social_engagement_platform_post_id", "social_engagement", ["platform", "post_id"], unique=True
+    )
+
+def downgrade():
+    op.drop_index("uq_social_engagement_platform_post_id", table_name="social_engagement")
+    op.drop_index("uq_hashtag_trends_platform_hashtag_bucket", table_name="hashtag_trends")
+    
+    with op.batch_alter_table("hashtag_trends") as batch_op:
+        batch_op.drop_column("bucket")
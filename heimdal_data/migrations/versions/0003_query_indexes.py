@@ -0,0 +1,38 @@
+"""
+Composite indexes for the API queries filtered by platform, hashtag or keyword.
+
+Each index starts with the filter column, followed by the sort columns of the
+endpoint and the id, so the rows of a page are read in order from the index
+instead of sorting the whole time range: trends by hour and engagement,
+engagement data by time and SEO data by trend score. The unfiltered queries are
+served by the indexes of revision 0008.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index(
+        "ix_hashtag_trends_platform_bucket_engagement_id", "hashtag_trends", ["platform", "bucket", "engagement", "id"]
+    )
+    op.create_index(
+        "ix_hashtag_trends_hashtag_bucket_engagement_id", "hashtag_trends", ["hashtag", "bucket", "engagement", "id"]
+    )
+    op.create_index(
+        "ix_social_engagement_platform_timestamp_id", "social_engagement", ["platform", "timestamp", "id"]
+    )
+    op.create_index("ix_seo_data_keyword_trend_score_id", "seo_data", ["keyword", "trend_score", "id"])
+
+def downgrade():
+    op.drop_index("ix_seo_data_keyword_trend_score_id", table_name="seo_data")
+    op.drop_index("ix_social_engagement_platform_timestamp_id", table_name="social_engagement")
+    op.drop_index("ix_hashtag_trends_hashtag_bucket_engagement_id", table_name="hashtag_trends")
+    op.drop_index("ix_hashtag_trends_platform_bucket_engagement_id", table_name="hashtag_trends")
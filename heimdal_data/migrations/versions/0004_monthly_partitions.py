@@ -0,0 +1,122 @@
+"""
+Monthly range partitions for hashtag trends and SEO data.
+
+Rebuilds hashtag_trends (partitioned on bucket, the hour of the timestamp) and
+seo_data (partitioned on timestamp) as partitioned tables with one partition per
+month, so old months can be detached or dropped instead of deleted row by row.
+The partition key has to be part of every unique index, which is why hashtag
+trends use the bucket. social_engagement stays a plain table: its natural key
+(platform, post_id) can't include a time column.
+
+Only applies to PostgreSQL; other databases are left unchanged.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# Number of future months to create partitions for
+MONTHS_AHEAD = 3
+
+# Partition column and indexes of each table, as of this revision
+TABLES = {
+    "hashtag_trends": {
+        "key": "bucket",
+        "indexes": [
+            "CREATE INDEX ix_hashtag_trends_id ON hashtag_trends (id)",
+            "CREATE INDEX ix_hashtag_trends_platform ON hashtag_trends (platform)",
+            "CREATE INDEX ix_hashtag_trends_hashtag ON hashtag_trends (hashtag)",
+            "CREATE INDEX ix_hashtag_trends_timestamp ON hashtag_trends (timestamp)",
+            "CREATE UNIQUE INDEX uq_hashtag_trends_platform_hashtag_bucket ON hashtag_trends (platform, hashtag, bucket)",
+            "CREATE INDEX ix_hashtag_trends_platform_bucket_engagement_id ON hashtag_trends "
+            "(platform, bucket, engagement, id)",
+            "CREATE INDEX ix_hashtag_trends_hashtag_bucket_engagement_id ON hashtag_trends "
+            "(hashtag, bucket, engagement, id)"
+        ]
+    },
+    "seo_data": {
+        "key": "timestamp",
+        "indexes": [
+            "CREATE INDEX ix_seo_data_id ON seo_data (id)",
+            "CREATE INDEX ix_seo_data_keyword ON seo_data (keyword)",
+            "CREATE INDEX ix_seo_data_timestamp ON seo_data (timestamp)",
+            "CREATE INDEX ix_seo_data_keyword_trend_score_id ON seo_data (keyword, trend_score, id)"
+        ]
+    }
+}
+
+def add_months(month, months):
+    """
+    Add a number of months to the first day of a month.
+    """
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def rebuild(table, partitioned):
+    """
+    Rebuild a table as a partitioned or a plain table, keeping its rows, sequence and indexes.
+    """
+    bind = op.get_bind()
+    key = TABLES[table]["key"]
+    old = f"{table}_old"
+    
+    op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+    op.execute(f"ALTER TABLE {old} DROP CONSTRAINT IF EXISTS {table}_pkey")
+    
+    if partitioned:
+        op.execute(f"UPDATE {old} SET {key} = now() WHERE {key} IS NULL")
+        op.execute(
+            f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE ({key})"
+        )
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {key} SET NOT NULL")
+        op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id, {key})")
+        
+        # One partition per month, from the oldest row to a few months ahead
+        oldest, newest = bind.execute(sa.text(f"SELECT min({key}), max({key}) FROM {old}")).one()
+        this_month = date.today().replace(day=1)
+        month = (oldest.date() if oldest else this_month).replace(day=1)
+        last = max(add_months(this_month, MONTHS_AHEAD), newest.date().replace(day=1) if newest else this_month)
+        
+        while month <= last:
+            next_month = add_months(month, 1)
+            op.execute(
+                f"CREATE TABLE {table}_y{month.year}m{month.month:02d} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+            )
+            month = next_month
+    else:
+        op.execute(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS)")
+        op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id)")
+    
+    # Keep the id sequence when the old table is dropped
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    
+    op.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+    op.execute(f"DROP TABLE {old} CASCADE")
+    
+    for index in TABLES[table]["indexes"]:
+        op.execute(index)
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    
+    for table in TABLES:
+        rebuild(table, partitioned=True)
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    
+    for table in TABLES:
+        rebuild(table, partitioned=False)
@@ -0,0 +1,112 @@
+"""
+Hourly and daily rollup tables for hashtag trends and engagement.
+
+Creates hashtag_trend_rollups (platform x hashtag x hour and day) and
+engagement_rollups (platform x post type x day) and fills them from the
+existing rows. From then on the bulk writer refreshes the touched buckets
+after each save.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def truncate(column, resolution, dialect):
+    """
+    SQL that truncates a time column to the start of its hour or day.
+    """
+    if dialect == "postgresql":
+        return f"date_trunc('{resolution}', {column})"
+    if resolution == "hour":
+        return f"strftime('%Y-%m-%d %H:00:00.000000', {column})"
+    return f"strftime('%Y-%m-%d 00:00:00.000000', {column})"
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    
+    op.create_table(
+        "hashtag_trend_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("resolution", sa.String(10), nullable=False),
+        sa.Column("bucket", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("platform", sa.String(50), nullable=False),
+        sa.Column("hashtag", sa.String(255), nullable=False),
+        sa.Column("engagement_sum", sa.BigInteger(), nullable=False),
+        sa.Column("engagement_max", sa.Integer(), nullable=False),
+        sa.Column("sample_count", sa.Integer(), nullable=False),
+        sa.Column("latest_engagement", sa.Integer(), nullable=True),
+        sa.Column("latest_timestamp", sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint("resolution", "platform", "hashtag", "bucket", name="uq_hashtag_trend_rollups_key")
+    )
+    op.create_index("ix_hashtag_trend_rollups_id", "hashtag_trend_rollups", ["id"])
+    op.create_index("ix_hashtag_trend_rollups_resolution_bucket", "hashtag_trend_rollups", ["resolution", "bucket"])
+    
+    op.create_table(
+        "engagement_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("resolution", sa.String(10), nullable=False),
+        sa.Column("bucket", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("platform", sa.String(50), nullable=False),
+        sa.Column("post_type", sa.String(50), nullable=False),
+        sa.Column("likes_sum", sa.BigInteger(), nullable=False),
+        sa.Column("comments_sum", sa.BigInteger(), nullable=False),
+        sa.Column("shares_sum", sa.BigInteger(), nullable=False),
+        sa.Column("reach_sum", sa.BigInteger(), nullable=False),
+        sa.Column("engagement_sum", sa.BigInteger(), nullable=False),
+        sa.Column("engagement_max", sa.Integer(), nullable=False),
+        sa.Column("post_count", sa.Integer(), nullable=False),
+        sa.Column("latest_engagement", sa.Integer(), nullable=True),
+        sa.Column("latest_timestamp", sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint("resolution", "platform", "post_type", "bucket", name="uq_engagement_rollups_key")
+    )
+    op.create_index("ix_engagement_rollups_id", "engagement_rollups", ["id"])
+    op.create_index("ix_engagement_rollups_resolution_bucket", "engagement_rollups", ["resolution", "bucket"])
+    
+    # Fill the rollups from the existing rows
+    for resolution in ("hour", "day"):
+        bucket = truncate("bucket", resolution, dialect)
+        op.execute(f"""
+            INSERT INTO hashtag_trend_rollups (
+                resolution, bucket, platform, hashtag, engagement_sum, engagement_max,
+                sample_count, latest_engagement, latest_timestamp
+            )
+            SELECT '{resolution}', bucket, platform, hashtag, SUM(engagement), MAX(engagement),
+                COUNT(*), MAX(CASE WHEN rank = 1 THEN engagement END), MAX(timestamp)
+            FROM (
+                SELECT platform, hashtag, {bucket} AS bucket, engagement, timestamp,
+                    ROW_NUMBER() OVER (PARTITION BY platform, hashtag, {bucket} ORDER BY timestamp DESC) AS rank
+                FROM hashtag_trends
+            ) ranked
+            GROUP BY bucket, platform, hashtag
+        """)
+    
+    bucket = truncate("timestamp", "day", dialect)
+    op.execute(f"""
+        INSERT INTO engagement_rollups (
+            resolution, bucket, platform, post_type, likes_sum, comments_sum, shares_sum, reach_sum,
+            engagement_sum, engagement_max, post_count, latest_engagement, latest_timestamp
+        )
+        SELECT 'day', bucket, platform, post_type, SUM(likes), SUM(comments), SUM(shares), SUM(reach),
+            SUM(engagement), MAX(engagement), COUNT(*), MAX(CASE WHEN rank = 1 THEN engagement END), MAX(timestamp)
+        FROM (
+            SELECT platform, post_type, {bucket} AS bucket,
+                COALESCE(likes, 0) AS likes, COALESCE(comments, 0) AS comments,
+                COALESCE(shares, 0) AS shares, COALESCE(reach, 0) AS reach,
+                COALESCE(likes, 0) + COALESCE(comments, 0) + COALESCE(shares, 0) AS engagement, timestamp,
+                ROW_NUMBER() OVER (PARTITION BY platform, post_type, {bucket} ORDER BY timestamp DESC) AS rank
+            FROM social_engagement
+        ) ranked
+        GROUP BY bucket, platform, post_type
+    """)
+
+def downgrade():
+    op.drop_table("engagement_rollups")
+    op.drop_table("hashtag_trend_rollups")
@@ -0,0 +1,46 @@
+"""
+Resolution and summary columns for compacting old hashtag trends and SEO data.
+
+Adds a resolution column to hashtag_trends and seo_data ("raw" for collected
+rows, "day" or "week" for compacted ones) and the minimum, maximum, mean and
+number of samples of the engagement or trend score the compacted row summarizes.
+The value columns of a compacted row keep the last sample of its bucket.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("hashtag_trends", sa.Column("resolution", sa.String(10), nullable=False, server_default="raw"))
+    op.add_column("hashtag_trends", sa.Column("engagement_min", sa.Integer(), nullable=True))
+    op.add_column("hashtag_trends", sa.Column("engagement_max", sa.Integer(), nullable=True))
+    op.add_column("hashtag_trends", sa.Column("engagement_mean", sa.Float(), nullable=True))
+    op.add_column("hashtag_trends", sa.Column("sample_count", sa.Integer(), nullable=True))
+    op.create_index("ix_hashtag_trends_resolution_bucket", "hashtag_trends", ["resolution", "bucket"])
+    
+    op.add_column("seo_data", sa.Column("resolution", sa.String(10), nullable=False, server_default="raw"))
+    op.add_column("seo_data", sa.Column("trend_score_min", sa.Float(), nullable=True))
+    op.add_column("seo_data", sa.Column("trend_score_max", sa.Float(), nullable=True))
+    op.add_column("seo_data", sa.Column("trend_score_mean", sa.Float(), nullable=True))
+    op.add_column("seo_data", sa.Column("sample_count", sa.Integer(), nullable=True))
+    op.create_index("ix_seo_data_resolution_timestamp", "seo_data", ["resolution", "timestamp"])
+
+def downgrade():
+    op.drop_index("ix_seo_data_resolution_timestamp", table_name="seo_data")
+    with op.batch_alter_table("seo_data") as batch:
+        for column in ("sample_count", "trend_score_mean", "trend_score_max", "trend_score_min", "resolution"):
+            batch.drop_column(column)
+    
+    op.drop_index("ix_hashtag_trends_resolution_bucket", table_name="hashtag_trends")
+    with op.batch_alter_table("hashtag_trends") as batch:
+        for column in ("sample_count", "engagement_mean", "engagement_max", "engagement_min", "resolution"):
+            batch.drop_column(column)
@@ -0,0 +1,101 @@
+"""
+Store hashtags and keywords once in a terms table and reference them by id.
+
+Creates the terms table from the distinct hashtags and keywords, replaces
+hashtag_trends.hashtag with hashtag_id and seo_data.keyword with keyword_id,
+and rebuilds the indexes on those columns over the integer ids.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# Text column, id column and the columns of the indexes on either, per table
+TABLES = {
+    "hashtag_trends": {
+        "text": "hashtag",
+        "id": "hashtag_id",
+        "text_indexes": {
+            "ix_hashtag_trends_hashtag": ["hashtag"],
+            "uq_hashtag_trends_platform_hashtag_bucket": ["platform", "hashtag", "bucket"],
+            "ix_hashtag_trends_hashtag_bucket_engagement_id": ["hashtag", "bucket", "engagement", "id"]
+        },
+        "id_indexes": {
+            "uq_hashtag_trends_platform_hashtag_bucket": ["platform", "hashtag_id", "bucket"],
+            "ix_hashtag_trends_hashtag_bucket_engagement_id": ["hashtag_id", "bucket", "engagement", "id"]
+        }
+    },
+    "seo_data": {
+        "text": "keyword",
+        "id": "keyword_id",
+        "text_indexes": {
+            "ix_seo_data_keyword": ["keyword"],
+            "ix_seo_data_keyword_trend_score_id": ["keyword", "trend_score", "id"]
+        },
+        "id_indexes": {
+            "ix_seo_data_keyword_trend_score_id": ["keyword_id", "trend_score", "id"]
+        }
+    }
+}
+
+def create_indexes(table, indexes):
+    """
+    Create indexes, unique for the names starting with uq_.
+    """
+    for name, columns in indexes.items():
+        op.create_index(name, table, columns, unique=name.startswith("uq_"))
+
+def drop_indexes(table, indexes):
+    """
+    Drop indexes by name.
+    """
+    for name in indexes:
+        op.drop_index(name, table_name=table)
+
+def upgrade():
+    op.create_table(
+        "terms",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("text", sa.String(255), nullable=False),
+        sa.UniqueConstraint("text", name="uq_terms_text")
+    )
+    op.execute("INSERT INTO terms (text) SELECT hashtag FROM hashtag_trends UNION SELECT keyword FROM seo_data")
+    
+    for table, spec in TABLES.items():
+        op.add_column(table, sa.Column(spec["id"], sa.Integer(), nullable=True))
+        op.execute(
+            f"UPDATE {table} SET {spec['id']} = (SELECT id FROM terms WHERE terms.text = {table}.{spec['text']})"
+        )
+        drop_indexes(table, spec["text_indexes"])
+        
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column(spec["id"], existing_type=sa.Integer(), nullable=False)
+            batch.create_foreign_key(f"fk_{table}_{spec['id']}_terms", "terms", [spec["id"]], ["id"])
+            batch.drop_column(spec["text"])
+        
+        create_indexes(table, spec["id_indexes"])
+
+def downgrade():
+    for table, spec in TABLES.items():
+        op.add_column(table, sa.Column(spec["text"], sa.String(255), nullable=True))
+        op.execute(
+            f"UPDATE {table} SET {spec['text']} = (SELECT text FROM terms WHERE terms.id = {table}.{spec['id']})"
+        )
+        drop_indexes(table, spec["id_indexes"])
+        
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column(spec["text"], existing_type=sa.String(255), nullable=False)
+            batch.drop_constraint(f"fk_{table}_{spec['id']}_terms", type_="foreignkey")
+            batch.drop_column(spec["id"])
+        
+        create_indexes(table, spec["text_indexes"])
+    
+    op.drop_table("terms")
@@ -0,0 +1,28 @@
+"""
+Indexes for the unfiltered queries of the data endpoints and their later pages.
+
+Each index is on the sort columns of an endpoint followed by the id, so the rows
+of a page are read in order from the index, and the next page starts with an
+index seek past the last row of the previous one.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-16
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index("ix_hashtag_trends_bucket_engagement_id", "hashtag_trends", ["bucket", "engagement", "id"])
+    op.create_index("ix_social_engagement_timestamp_id", "social_engagement", ["timestamp", "id"])
+    op.create_index("ix_seo_data_trend_score_id", "seo_data", ["trend_score", "id"])
+
+def downgrade():
+    op.drop_index("ix_seo_data_trend_score_id", table_name="seo_data")
+    op.drop_index("ix_social_engagement_timestamp_id", table_name="social_engagement")
+    op.drop_index("ix_hashtag_trends_bucket_engagement_id", table_name="hashtag_trends")
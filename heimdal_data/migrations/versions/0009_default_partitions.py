@@ -0,0 +1,78 @@
+"""
+Default partitions for hashtag trends and SEO data.
+
+Without a default partition, writing a row for a month that has no partition
+yet fails, e.g. a timestamp from a misconfigured clock or a backfill of an old
+month. Such rows are now kept in {table}_default until the partition
+maintenance creates the partition of their month and moves them there.
+
+Only applies to PostgreSQL; other databases are left unchanged.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-16
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+# Partitioned tables and the column they are partitioned on
+TABLES = {
+    "hashtag_trends": "bucket",
+    "seo_data": "timestamp"
+}
+
+def add_months(month, months):
+    """
+    Add a number of months to the first day of a month.
+    """
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def is_partitioned(table):
+    """
+    Check whether a table is partitioned.
+    """
+    return op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"
+    ), {"table": table}).first() is not None
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    
+    for table in TABLES:
+        if is_partitioned(table):
+            op.execute(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT")
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    
+    bind = op.get_bind()
+    
+    for table, key in TABLES.items():
+        if not is_partitioned(table):
+            continue
+        
+        # Give the rows of the default partition a monthly partition of their own before dropping it
+        op.execute(f"ALTER TABLE {table} DETACH PARTITION {table}_default")
+        months = bind.execute(sa.text(
+            f"SELECT DISTINCT date_trunc('month', {key})::date FROM {table}_default"
+        )).scalars().all()
+        
+        for month in months:
+            op.execute(
+                f"CREATE TABLE IF NOT EXISTS {table}_y{month.year}m{month.month:02d} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            )
+        
+        op.execute(f"INSERT INTO {table} SELECT * FROM {table}_default")
+        op.execute(f"DROP TABLE {table}_default")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Script to benchmark the bulk writer against the per-row ORM loop the collectors used to run.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import sessionmaker
+
+# Add the parent directory to sys.path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from heimdal_data.database.models import Base, HashtagTrend, trend_bucket
+from heimdal_data.database.bulk import BulkWriter
+from heimdal_data.database.terms import TermCache
+
+def generate_records(count):
+    """
+    Generate mock hashtag trend records with unique natural keys.
+    
+    Args:
+        count (int): Number of records to generate
+    
+    Returns:
+        list: Hashtag trend records
+    """
+    now = datetime.now()
+    records = []
+    
+    for i in range(count):
+        timestamp = now - timedelta(minutes=random.randint(0, 10000))
+        records.append({
+            "platform": random.choice(["Twitter", "TikTok"]),
+            "hashtag": f"hashtag{i}",
+            "engagement": random.randint(1000, 100000),
+            "timestamp": timestamp,
+            "bucket": trend_bucket(timestamp)
+        })
+    
+    return records
+
+def orm_loop(session_factory, records):
+    """
+    Insert records one ORM object at a time.
+    
+    The hashtags are stored as terms first, since the rows reference them by id.
+    
+    Args:
+        session_factory: Factory for database sessions
+        records (list): Records to insert
+    """
+    db = session_factory()
+    try:
+        hashtag_ids = TermCache().resolve(db, (record["hashtag"] for record in records))
+        for record in records:
+            record = dict(record)
+            db.add(HashtagTrend(hashtag_id=hashtag_ids[record.pop("hashtag")], **record))
+        db.commit()
+    finally:
+        db.close()
+
+def bulk_write(session_factory, records, chunk_size):
+    """
+    Insert records with the bulk writer.
+    
+    Args:
+        session_factory: Factory for database sessions
+        records (list): Records to insert
+        chunk_size (int): Number of rows per statement
+    """
+    BulkWriter(session_factory=session_factory, chunk_size=chunk_size).write(HashtagTrend, records)
+
+def clear_table(engine):
+    """
+    Remove all rows from the hashtag trends table.
+    
+    Args:
+        engine: SQLAlchemy engine
+    """
+    with engine.begin() as connection:
+        connection.execute(delete(HashtagTrend.__table__))
+
+def main():
+    """
+    Main function.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark bulk inserts against the per-row ORM loop")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="Comma-separated numbers of rows to insert")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Number of rows per bulk statement")
+    parser.add_argument("--database-url", default=None, help="Database to benchmark against (default: a temporary SQLite file)")
+    parser.add_argument("--skip-orm", action="store_true", help="Only benchmark the bulk writer")
+    
+    args = parser.parse_args()
+    
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.db')}"
+    engine = create_engine(database_url)
+    session_factory = sessionmaker(bind=engine)
+    Base.metadata.create_all(engine)
+    
+    print(f"Benchmarking against {engine.url.render_as_string(hide_password=True)}")
+    print(f"{'rows':>10} {'ORM loop rows/s':>18} {'bulk rows/s':>14} {'speedup':>9}")
+    
+    for size in [int(size) for size in args.sizes.split(",")]:
+        records = generate_records(size)
+        
+        orm_rate = None
+        if not args.skip_orm:
+            clear_table(engine)
+            start_time = time.perf_counter()
+            orm_loop(session_factory, records)
+            orm_rate = size / (time.perf_counter() - start_time)
+        
+        clear_table(engine)
+        start_time = time.perf_counter()
+        bulk_write(session_factory, records, args.chunk_size)
+        bulk_rate = size / (time.perf_counter() - start_time)
+        
+        if orm_rate:
+            print(f"{size:>10} {orm_rate:>18.0f} {bulk_rate:>14.0f} {bulk_rate / orm_rate:>8.1f}x")
+        else:
+            print(f"{size:>10} {'-':>18} {bulk_rate:>14.0f} {'-':>9}")
+    
+    clear_table(engine)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Script to benchmark the pooled async HTTP client against requests in a thread.
+
+A local stub server mimicking the TikTok trending hashtags endpoint is started,
+so the benchmark doesn't depend on external APIs or credentials.
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+# Add the parent directory to sys.path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from heimdal_data.utils.http_client import AsyncHTTPClient
+
+# Response body returned by the stub server
+STUB_RESPONSE = json.dumps({
+    "data": {
+        "hashtags": [
+            {"name": f"hashtag{i}", "view_count": i * 1000, "video_count": i * 10}
+            for i in range(20)
+        ]
+    }
+}).encode()
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Request handler returning a fixed JSON response with keep-alive enabled.
+    """
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(STUB_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(STUB_RESPONSE)
+    
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_server():
+    """
+    Start the stub server on a free local port.
+    
+    Returns:
+        ThreadingHTTPServer: The running server.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+async def run_requests_in_thread(url, total, concurrency):
+    """
+    Send requests with requests.get in a thread, the way the collectors used to.
+    
+    Args:
+        url (str): URL to request.
+        total (int): Total number of requests.
+        concurrency (int): Number of requests in flight at the same time.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def fetch():
+        async with semaphore:
+            response = await asyncio.to_thread(requests.get, url)
+            response.json()
+    
+    await asyncio.gather(*[fetch() for _ in range(total)])
+
+async def run_pooled_client(url, total, concurrency):
+    """
+    Send requests with the shared pooled AsyncHTTPClient.
+    
+    Args:
+        url (str): URL to request.
+        total (int): Total number of requests.
+        concurrency (int): Number of requests in flight at the same time.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async with AsyncHTTPClient(max_connections=concurrency, max_keepalive_connections=concurrency) as client:
+        async def fetch():
+            async with semaphore:
+                response = await client.get(url)
+                response.json()
+        
+        await asyncio.gather(*[fetch() for _ in range(total)])
+
+def benchmark(name, func, url, total, concurrency):
+    """
+    Run a benchmark and print the requests per second.
+    
+    Args:
+        name (str): Name of the benchmark.
+        func: Coroutine function to benchmark.
+        url (str): URL to request.
+        total (int): Total number of requests.
+        concurrency (int): Number of requests in flight at the same time.
+    
+    Returns:
+        float: Requests per second.
+    """
+    start_time = time.perf_counter()
+    asyncio.run(func(url, total, concurrency))
+    duration = time.perf_counter() - start_time
+    rps = total / duration
+    print(f"{name:<25} {total} requests in {duration:.2f} seconds ({rps:.0f} requests/s)")
+    return rps
+
+def main():
+    """
+    Main function.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the pooled async HTTP client against a local stub server")
+    parser.add_argument("--requests", type=int, default=2000, help="Total number of requests per benchmark")
+    parser.add_argument("--concurrency", type=int, default=10, help="Number of requests in flight at the same time")
+    
+    args = parser.parse_args()
+    
+    server = start_stub_server()
+    url = f"http://127.0.0.1:{server.server_address[1]}/hashtag/trending"
+    print(f"Stub server running at {url}")
+    
+    try:
+        baseline = benchmark("requests + to_thread", run_requests_in_thread, url, args.requests, args.concurrency)
+        pooled = benchmark("AsyncHTTPClient (pooled)", run_pooled_client, url, args.requests, args.concurrency)
+        print(f"Speedup: {pooled / baseline:.2f}x")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Script to benchmark serving data endpoint responses from projected columns with the fast JSON encoder
+against loading ORM entities and returning dictionaries for FastAPI to validate and encode.
+"""
+
+import os
+import sys
+import time
+import logging
+import random
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add the parent directory to sys.path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from heimdal_data.api.routes import trends_query, engagement_query
+from heimdal_data.api.pagination import MAX_PAGE_SIZE, page_size
+from heimdal_data.api.serialization import orjson, json_response, row_dicts
+from heimdal_data.database.database import get_async_database_url
+from heimdal_data.database.models import Base, Term, HashtagTrend, SocialEngagement, trend_bucket
+from heimdal_data.database.terms import TermCache
+
+def generate_data(session_factory, count):
+    """
+    Store mock hashtag trends and engagement records from the last days.
+    
+    Args:
+        session_factory: Factory for database sessions
+        count (int): Number of records of each kind to store
+    """
+    now = datetime.now()
+    current_bucket = trend_bucket(now)
+    hashtags = [f"hashtag{i}" for i in range(500)]
+    trends = []
+    engagements = []
+    
+    for i in range(count):
+        # One snapshot per hashtag and hour, going back from the current hour
+        bucket = current_bucket - timedelta(hours=i // len(hashtags))
+        trends.append({
+            "platform": random.choice(["Twitter", "TikTok"]),
+            "hashtag": hashtags[i % len(hashtags)],
+            "engagement": random.randint(1000, 100000),
+            "timestamp": bucket + timedelta(minutes=random.randint(0, 59)),
+            "bucket": bucket
+        })
+        engagements.append({
+            "platform": random.choice(["Facebook", "TikTok"]),
+            "post_type": random.choice(["text", "image", "video"]),
+            "post_id": f"post{i}",
+            "likes": random.randint(0, 10000),
+            "comments": random.randint(0, 1000),
+            "shares": random.randint(0, 500),
+            "reach": random.randint(1000, 100000),
+            "content_snippet": f"Mock post {i} about digital marketing and social media trends",
+            "timestamp": now - timedelta(minutes=random.randint(0, 5 * 24 * 60))
+        })
+    
+    db = session_factory()
+    try:
+        hashtag_ids = TermCache().resolve(db, hashtags)
+        for trend in trends:
+            trend["hashtag_id"] = hashtag_ids[trend.pop("hashtag")]
+        db.execute(insert(HashtagTrend.__table__), trends)
+        db.execute(insert(SocialEngagement.__table__), engagements)
+        db.commit()
+    finally:
+        db.close()
+
+def create_app(session_factory):
+    """
+    Create an app serving the trends and engagement endpoints both ways.
+    
+    The routes only differ in how responses are built, they skip the response cache
+    and validators of the real endpoints. Like the real endpoints, they return at most
+    API_MAX_PAGE_SIZE rows.
+    
+    Args:
+        session_factory: Factory for async database sessions
+    
+    Returns:
+        FastAPI: The app
+    """
+    app = FastAPI()
+    
+    @app.get("/before/trends", response_model=List[Dict[str, Any]])
+    async def trends_before(limit: int):
+        async with session_factory() as db:
+            query = trends_query(30, page_size(limit)).with_only_columns(HashtagTrend, Term.text)
+            trends = (await db.execute(query)).all()
+        
+        result = []
+        for trend, hashtag_text in trends:
+            result.append({
+                "id": trend.id,
+                "platform": trend.platform,
+                "hashtag": hashtag_text,
+                "engagement": trend.engagement,
+                "timestamp": trend.timestamp.isoformat(),
+                "bucket": trend.bucket.isoformat()
+            })
+        return result
+    
+    @app.get("/after/trends", response_model=List[Dict[str, Any]])
+    async def trends_after(limit: int):
+        async with session_factory() as db:
+            trends = (await db.execute(trends_query(30, page_size(limit)))).all()
+        return json_response(row_dicts(trends))
+    
+    @app.get("/before/engagement", response_model=List[Dict[str, Any]])
+    async def engagement_before(limit: int):
+        async with session_factory() as db:
+            query = engagement_query(30, page_size(limit)).with_only_columns(SocialEngagement)
+            engagements = (await db.execute(query)).scalars().all()
+        
+        result = []
+        for engagement in engagements:
+            result.append({
+                "id": engagement.id,
+                "platform": engagement.platform,
+                "post_type": engagement.post_type,
+                "post_id": engagement.post_id,
+                "likes": engagement.likes,
+                "comments": engagement.comments,
+                "shares": engagement.shares,
+                "reach": engagement.reach,
+                "content_snippet": engagement.content_snippet,
+                "timestamp": engagement.timestamp.isoformat()
+            })
+        return result
+    
+    @app.get("/after/engagement", response_model=List[Dict[str, Any]])
+    async def engagement_after(limit: int):
+        async with session_factory() as db:
+            engagements = (await db.execute(engagement_query(30, page_size(limit)))).all()
+        return json_response(row_dicts(engagements))
+    
+    return app
+
+def percentile(durations, fraction):
+    """
+    Get a percentile of request durations.
+    
+    Args:
+        durations (list): Sorted durations in seconds
+        fraction (float): Percentile as a fraction, e.g. 0.99
+    
+    Returns:
+        float: The duration in milliseconds
+    """
+    return durations[min(len(durations) - 1, int(fraction * len(durations)))] * 1000
+
+async def measure(client, path, limit, requests):
+    """
+    Request an endpoint repeatedly, one request at a time.
+    
+    Args:
+        client: HTTP client for the app
+        path (str): Path of the endpoint
+        limit (int): Number of rows per response
+        requests (int): Number of timed requests
+    
+    Returns:
+        tuple: p50 and p99 in milliseconds, and the size of the response in bytes
+    """
+    # Warm up the connection pool and the compiled query cache
+    for _ in range(5):
+        response = await client.get(path, params={"limit": limit})
+        response.raise_for_status()
+    
+    durations = []
+    for _ in range(requests):
+        start_time = time.perf_counter()
+        await client.get(path, params={"limit": limit})
+        durations.append(time.perf_counter() - start_time)
+    
+    durations.sort()
+    return percentile(durations, 0.5), percentile(durations, 0.99), len(response.content)
+
+async def run(app, sizes, requests):
+    """
+    Benchmark both ways of serving each endpoint.
+    
+    Args:
+        app: App from create_app
+        sizes (list): Numbers of rows per response
+        requests (int): Number of timed requests per endpoint and size
+    """
+    print(f"{'endpoint':<12} {'rows':>6} {'bytes':>9} {'before p50':>11} {'before p99':>11} "
+          f"{'after p50':>10} {'after p99':>10} {'speedup':>8}")
+    
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for endpoint in ("trends", "engagement"):
+            for size in sizes:
+                before_p50, before_p99, _ = await measure(client, f"/before/{endpoint}", size, requests)
+                after_p50, after_p99, length = await measure(client, f"/after/{endpoint}", size, requests)
+                
+                print(f"{endpoint:<12} {size:>6} {length:>9} {before_p50:>9.2f}ms {before_p99:>9.2f}ms "
+                      f"{after_p50:>8.2f}ms {after_p99:>8.2f}ms {before_p50 / after_p50:>7.1f}x")
+
+def main():
+    """
+    Main function.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark serving data endpoint responses")
+    parser.add_argument(
+        "--sizes", default=f"50,{MAX_PAGE_SIZE}",
+        help="Comma-separated numbers of rows per response, at most API_MAX_PAGE_SIZE (default: 50 and API_MAX_PAGE_SIZE)"
+    )
+    parser.add_argument("--requests", type=int, default=200, help="Number of timed requests per endpoint and size")
+    parser.add_argument("--rows", type=int, default=20000, help="Number of records of each kind to store")
+    parser.add_argument("--database-url", default=None, help="Database to benchmark against (default: a temporary SQLite file)")
+    
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    
+    # The endpoints never return more rows than this, so larger responses don't happen in production
+    if max(sizes) > MAX_PAGE_SIZE:
+        parser.error(f"sizes can't be larger than API_MAX_PAGE_SIZE ({MAX_PAGE_SIZE})")
+    
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.db')}"
+    engine = create_engine(database_url)
+    Base.metadata.create_all(engine)
+    
+    if not args.database_url:
+        generate_data(sessionmaker(bind=engine), max(args.rows, max(sizes)))
+    
+    async_engine = create_async_engine(get_async_database_url(database_url))
+    session_factory = sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+    
+    print(f"Benchmarking against {engine.url.render_as_string(hide_password=True)}")
+    print(f"JSON encoder: {'orjson' if orjson is not None else 'json (orjson is not installed)'}")
+    
+    # Don't log every request
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    
+    asyncio.run(run(create_app(session_factory), sizes, args.requests))
+
+if __name__ == "__main__":
+    main()
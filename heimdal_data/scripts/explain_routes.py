@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Script to check that the queries of the data endpoints are served by index seeks, without sorting.
+"""
+
+import sys
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine
+
+# Add the parent directory to sys.path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from heimdal_data.api.routes import trends_query, engagement_query, seo_query, summary_query
+from heimdal_data.database.models import HashtagTrend, SocialEngagement, SeoData
+
+def get_route_queries(platform, hashtag, keyword):
+    """
+    Get the queries run by the data endpoints.
+    
+    Args:
+        platform (str): Platform used for the queries filtered by platform
+        hashtag (str): Hashtag used for the queries filtered by hashtag
+        keyword (str): Keyword used for the queries filtered by keyword
+    
+    Returns:
+        dict: Queries keyed by endpoint
+    """
+    return {
+        "/api/data/trends": trends_query(),
+        f"/api/data/trends?platform={platform}": trends_query(platform=platform),
+        f"/api/data/trends?hashtag={hashtag}": trends_query(hashtag=hashtag),
+        "/api/data/engagement": engagement_query(),
+        f"/api/data/engagement?platform={platform}": engagement_query(platform=platform),
+        "/api/data/seo": seo_query(),
+        f"/api/data/seo?keyword={keyword}": seo_query(keyword=keyword),
+        # Later pages, starting after a row in the middle of the data
+        "/api/data/trends?cursor=...": trends_query(after=((datetime.now() - timedelta(days=1), 1000), 1000000)),
+        "/api/data/engagement?cursor=...": engagement_query(after=(datetime.now() - timedelta(days=1), 1000000)),
+        "/api/data/seo?cursor=...": seo_query(after=(50.0, 1000000)),
+        # Validators checked before the data is read, for the ETag and Last-Modified headers
+        "/api/data/trends (validators)": summary_query(HashtagTrend, trends_query()),
+        "/api/data/engagement (validators)": summary_query(SocialEngagement, engagement_query()),
+        "/api/data/seo (validators)": summary_query(SeoData, seo_query())
+    }
+
+def explain(connection, query, analyze=False):
+    """
+    Get the query plan of a query.
+    
+    Args:
+        connection: SQLAlchemy connection
+        query: Query to explain
+        analyze (bool): Run the query to get actual row counts and timings (PostgreSQL only)
+    
+    Returns:
+        list: Lines of the query plan
+    """
+    dialect = connection.dialect
+    compiled = query.compile(dialect=dialect)
+    
+    # Pass the parameters in the form the driver expects
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    
+    if dialect.name == "postgresql":
+        prefix = "EXPLAIN (ANALYZE, BUFFERS)" if analyze else "EXPLAIN"
+    else:
+        prefix = "EXPLAIN QUERY PLAN"
+    
+    rows = connection.exec_driver_sql(f"{prefix} {compiled}", params).all()
+    
+    # SQLite returns (id, parent, notused, detail), PostgreSQL one line per row
+    return [str(row[-1]) for row in rows]
+
+def plan_nodes(plan):
+    """
+    Split a PostgreSQL query plan into its nodes.
+    
+    Args:
+        plan (list): Lines of the query plan
+    
+    Returns:
+        list: Name and detail lines of each node, e.g. ("Index Scan using ix on t", ["Index Cond: ..."])
+    """
+    nodes = []
+    
+    for line in plan:
+        line = line.strip()
+        if not nodes or line.startswith("->"):
+            nodes.append((line.lstrip("-> ").split("  (")[0], []))
+        else:
+            nodes[-1][1].append(line)
+    
+    return nodes
+
+def uses_index(plan, dialect_name):
+    """
+    Check whether a query plan reads its rows through index seeks, in the order they are returned.
+    
+    A plan fails if it scans a whole table or index, or sorts the rows it read,
+    since either way its cost grows with the size of the time range rather than
+    with the size of the page.
+    
+    Args:
+        plan (list): Lines of the query plan
+        dialect_name (str): Name of the database dialect
+    
+    Returns:
+        bool: True if every table is read with an index seek and nothing is sorted
+    """
+    if dialect_name == "postgresql":
+        nodes = plan_nodes(plan)
+        index_scans = [details for name, details in nodes if "Index Scan" in name or "Index Only Scan" in name]
+        return bool(index_scans) and all(
+            "Seq Scan" not in name and "Sort" not in name for name, details in nodes
+        ) and all(
+            any(line.startswith("Index Cond") for line in details) for details in index_scans
+        )
+    
+    # SQLite reads a whole table or index with SCAN, and sorts with a temporary B-tree
+    return any(line.startswith("SEARCH") for line in plan) and not any(
+        line.startswith("SCAN") or "TEMP B-TREE" in line for line in plan
+    )
+
+def main():
+    """
+    Main function.
+    """
+    parser = argparse.ArgumentParser(description="Check that the data endpoints are served by index seeks")
+    parser.add_argument("--database-url", default=None, help="Database to check (default: the application database)")
+    parser.add_argument("--platform", default="Twitter", help="Platform used for the queries filtered by platform")
+    parser.add_argument("--hashtag", default="ai", help="Hashtag used for the queries filtered by hashtag")
+    parser.add_argument("--keyword", default="digital marketing", help="Keyword used for the queries filtered by keyword")
+    parser.add_argument("--analyze", action="store_true", help="Run the queries with EXPLAIN ANALYZE (PostgreSQL only)")
+    parser.add_argument(
+        "--disable-seqscan", action="store_true",
+        help="Discourage sequential scans, to check the index plans on small development databases (PostgreSQL only)"
+    )
+    
+    args = parser.parse_args()
+    
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        from heimdal_data.database.database import engine
+    
+    failed = []
+    
+    with engine.connect() as connection:
+        if args.disable_seqscan and connection.dialect.name == "postgresql":
+            connection.exec_driver_sql("SET enable_seqscan = off")
+        
+        for endpoint, query in get_route_queries(args.platform, args.hashtag, args.keyword).items():
+            plan = explain(connection, query, args.analyze)
+            ok = uses_index(plan, connection.dialect.name)
+            
+            print(f"{'OK' if ok else 'NO INDEX SEEK'}  {endpoint}")
+            for line in plan:
+                print(f"    {line}")
+            
+            if not ok:
+                failed.append(endpoint)
+    
+    if failed:
+        print(f"\n{len(failed)} endpoint(s) not served by an index seek: {', '.join(failed)}")
+        sys.exit(1)
+    
+    print("\nAll endpoints are served by index seeks")
+
+if __name__ == "__main__":
+    main()
@@ -14,8 +14,10 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 # Import the database models
-from heimdal_data.database.database import SessionLocal, engine
-from heimdal_data.database.models import Base, HashtagTrend, SocialEngagement, SeoData
+from heimdal_data.database.database import SessionLocal, init_db
+from heimdal_data.database.models import HashtagTrend, SocialEngagement, SeoData
+from heimdal_data.database.bulk import bulk_writer
+from heimdal_data.database.rollups import rebuild_rollups
 
 def generate_hashtag_trends(db, count=20, platforms=None):
     """
@@ -40,36 +42,46 @@ def generate_hashtag_trends(db, count=20, platforms=None):
     
     print(f"Generating {count} hashtag trends...")
     
-    for i in range(count):
-        # Generate a random timestamp within the last 7 days
-        timestamp = datetime.now() - timedelta(
-            days=random.randint(0, 7),
-            hours=random.randint(0, 23),
-            minutes=random.randint(0, 59)
-        )
-        
-        # Select a random platform and hashtag
-        platform = random.choice(platforms)
-        hashtag = random.choice(popular_hashtags)
-        
-        # Generate a random engagement value
-        engagement = random.randint(1000, 100000)
-        
-        # Create a hashtag trend
-        hashtag_trend = HashtagTrend(
-            platform=platform,
-            hashtag=hashtag,
-            engagement=engagement,
-            timestamp=timestamp
-        )
-        
-        # Add to the database
-        db.add(hashtag_trend)
+    # Generate the records lazily and write them in bulk
+    records = (_hashtag_trend_record(platforms, popular_hashtags) for i in range(count))
+    bulk_writer.write_in_session(db, HashtagTrend, records)
     
     # Commit the changes
     db.commit()
     print(f"Generated {count} hashtag trends")
 
+def _hashtag_trend_record(platforms, popular_hashtags):
+    """
+    Generate a single mock hashtag trend record.
+    
+    Args:
+        platforms (list): List of platforms to pick from
+        popular_hashtags (list): List of hashtags to pick from
+    
+    Returns:
+        dict: Hashtag trend record
+    """
+    # Generate a random timestamp within the last 7 days
+    timestamp = datetime.now() - timedelta(
+        days=random.randint(0, 7),
+        hours=random.randint(0, 23),
+        minutes=random.randint(0, 59)
+    )
+    
+    # Select a random platform and hashtag
+    platform = random.choice(platforms)
+    hashtag = random.choice(popular_hashtags)
+    
+    # Generate a random engagement value
+    engagement = random.randint(1000, 100000)
+    
+    return {
+        "platform": platform,
+        "hashtag": hashtag,
+        "engagement": engagement,
+        "timestamp": timestamp
+    }
+
 def generate_social_engagement(db, count=20, platforms=None):
     """
     Generate mock social engagement data.
@@ -99,48 +111,54 @@ def generate_social_engagement(db, count=20, platforms=None):
     
     print(f"Generating {count} social engagement records...")
     
-    for i in range(count):
-        # Generate a random timestamp within the last 7 days
-        timestamp = datetime.now() - timedelta(
-            days=random.randint(0, 7),
-            hours=random.randint(0, 23),
-            minutes=random.randint(0, 59)
-        )
-        
-        # Select a random platform, post type, and content snippet
-        platform = random.choice(platforms)
-        post_type = random.choice(post_types)
-        content_snippet = random.choice(content_snippets)
-        
-        # Generate random engagement metrics
-        likes = random.randint(10, 1000)
-        comments = random.randint(0, 100)
-        shares = random.randint(0, 50)
-        reach = random.randint(100, 10000)
-        
-        # Generate a random post ID
-        post_id = f"{platform.lower()}_post_{random.randint(1000, 9999)}"
-        
-        # Create a social engagement record
-        social_engagement = SocialEngagement(
-            platform=platform,
-            post_type=post_type,
-            post_id=post_id,
-            likes=likes,
-            comments=comments,
-            shares=shares,
-            reach=reach,
-            content_snippet=content_snippet,
-            timestamp=timestamp
-        )
-        
-        # Add to the database
-        db.add(social_engagement)
+    # Generate the records lazily and write them in bulk
+    records = (_social_engagement_record(platforms, post_types, content_snippets) for i in range(count))
+    bulk_writer.write_in_session(db, SocialEngagement, records)
     
     # Commit the changes
     db.commit()
     print(f"Generated {count} social engagement records")
 
+def _social_engagement_record(platforms, post_types, content_snippets):
+    """
+    Generate a single mock social engagement record.
+    
+    Args:
+        platforms (list): List of platforms to pick from
+        post_types (list): List of post types to pick from
+        content_snippets (list): List of content snippets to pick from
+    
+    Returns:
+        dict: Social engagement record
+    """
+    # Generate a random timestamp within the last 7 days
+    timestamp = datetime.now() - timedelta(
+        days=random.randint(0, 7),
+        hours=random.randint(0, 23),
+        minutes=random.randint(0, 59)
+    )
+    
+    # Select a random platform, post type, and content snippet
+    platform = random.choice(platforms)
+    post_type = random.choice(post_types)
+    content_snippet = random.choice(content_snippets)
+    
+    # Generate a random post ID
+    post_id = f"{platform.lower()}_post_{random.randint(1000, 9999)}"
+    
+    # Generate random engagement metrics
+    return {
+        "platform": platform,
+        "post_type": post_type,
+        "post_id": post_id,
+        "likes": random.randint(10, 1000),
+        "comments": random.randint(0, 100),
+        "shares": random.randint(0, 50),
+        "reach": random.randint(100, 10000),
+        "content_snippet": content_snippet,
+        "timestamp": timestamp
+    }
+
 def generate_seo_data(db, count=20):
     """
     Generate mock SEO data.
@@ -163,43 +181,43 @@ def generate_seo_data(db, count=20):
     
     print(f"Generating {count} SEO data records...")
     
-    for i in range(count):
-        # Generate a random timestamp within the last 7 days
-        timestamp = datetime.now() - timedelta(
-            days=random.randint(0, 7),
-            hours=random.randint(0, 23),
-            minutes=random.randint(0, 59)
-        )
-        
-        # Select a random keyword
-        keyword = random.choice(keywords)
-        
-        # Generate random SEO metrics
-        trend_score = round(random.uniform(0, 100), 2)
-        volume = random.randint(1000, 10000)
-        difficulty = round(random.uniform(0, 100), 2)
-        cpc = round(random.uniform(0.1, 10.0), 2)
-        competition = round(random.uniform(0, 1), 2)
-        
-        # Create an SEO data record
-        seo_data = SeoData(
-            keyword=keyword,
-            trend_score=trend_score,
-            volume=volume,
-            difficulty=difficulty,
-            cpc=cpc,
-            competition=competition,
-            source="Mock Data Generator",
-            timestamp=timestamp
-        )
-        
-        # Add to the database
-        db.add(seo_data)
+    # Generate the records lazily and write them in bulk
+    records = (_seo_data_record(keywords) for i in range(count))
+    bulk_writer.write_in_session(db, SeoData, records)
     
     # Commit the changes
     db.commit()
     print(f"Generated {count} SEO data records")
 
+def _seo_data_record(keywords):
+    """
+    Generate a single mock SEO data record.
+    
+    Args:
+        keywords (list): List of keywords to pick from
+    
+    Returns:
+        dict: SEO data record
+    """
+    # Generate a random timestamp within the last 7 days
+    timestamp = datetime.now() - timedelta(
+        days=random.randint(0, 7),
+        hours=random.randint(0, 23),
+        minutes=random.randint(0, 59)
+    )
+    
+    # Generate random SEO metrics
+    return {
+        "keyword": random.choice(keywords),
+        "trend_score": round(random.uniform(0, 100), 2),
+        "volume": random.randint(1000, 10000),
+        "difficulty": round(random.uniform(0, 100), 2),
+        "cpc": round(random.uniform(0.1, 10.0), 2),
+        "competition": round(random.uniform(0, 1), 2),
+        "source": "Mock Data Generator",
+        "timestamp": timestamp
+    }
+
 def main():
     """
     Main function.
@@ -215,7 +233,7 @@ def main():
     # Initialize the database tables if requested
     if args.init_db:
         print("Initializing database tables...")
-        Base.metadata.create_all(engine)
+        init_db()
         print("Database tables initialized successfully")
     
     print("Generating mock data...")
@@ -229,6 +247,9 @@ def main():
         generate_social_engagement(db, args.social_engagement)
         generate_seo_data(db, args.seo_data)
         
+        # Aggregate the generated data into the rollup tables
+        rebuild_rollups()
+        
         print("Mock data generation completed successfully")
     except Exception as e:
         print(f"Error generating mock data: {e}")
@@ -74,19 +74,15 @@ def create_tables(host, port, user, password, dbname):
     Returns:
         bool: True if the tables were created successfully, False otherwise
     """
-    # Import the database models
-    from heimdal_data.database.models import Base
-    from sqlalchemy import create_engine
+    # Import the migration runner
+    from heimdal_data.database.database import run_migrations
     
     # Create the database URL
     database_url = f"postgresql://{user}:{password}@{host}:{port}/{dbname}"
     
     try:
-        # Create the SQLAlchemy engine
-        engine = create_engine(database_url)
-        
-        # Create the tables
-        Base.metadata.create_all(engine)
+        # Create the tables by migrating to the latest schema
+        run_migrations(database_url)
         print(f"Tables created successfully in database '{dbname}'")
         return True
     except Exception as e:
@@ -1,3 +1,18 @@
 """
 Utility functions for the Heimdal SoMe Data Collection Module.
 """
+from .http_client import AsyncHTTPClient
+from .rate_limiter import RateLimiter, TokenBucket, rate_limiter
+from .resilience import RetryPolicy, CircuitBreaker, TransientError, CircuitOpenError, get_circuit_breaker
+
+__all__ = [
+    'AsyncHTTPClient',
+    'RateLimiter',
+    'TokenBucket',
+    'rate_limiter',
+    'RetryPolicy',
+    'CircuitBreaker',
+    'TransientError',
+    'CircuitOpenError',
+    'get_circuit_breaker'
+]
@@ -0,0 +1,134 @@
+import os
+import logging
+from typing import Dict, Any, Optional
+
+import httpx
+
+logger = logging.getLogger("http_client")
+
+# Default connection pool settings
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+def _http2_available() -> bool:
+    """
+    Check if the h2 package needed for HTTP/2 is installed.
+    
+    Returns:
+        bool: True if HTTP/2 can be used, False otherwise.
+    """
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class AsyncHTTPClient:
+    """
+    Async HTTP client with a pooled keep-alive connection pool.
+    
+    One client is meant to be shared for the whole lifetime of a collector, so that
+    connections are reused between requests instead of being opened for every call.
+    HTTP/2 is used when the server offers it.
+    """
+    
+    def __init__(
+        self,
+        base_url: str = "",
+        headers: Optional[Dict[str, str]] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        timeout: Optional[float] = None,
+        http2: Optional[bool] = None
+    ):
+        """
+        Initialize the HTTP client.
+        
+        Args:
+            base_url (str, optional): Base URL prepended to relative request URLs. Defaults to "".
+            headers (Dict[str, str], optional): Headers sent with every request. Defaults to None.
+            max_connections (int, optional): Maximum number of open connections. Defaults to HTTP_MAX_CONNECTIONS.
+            max_keepalive_connections (int, optional): Maximum number of idle keep-alive connections.
+                Defaults to HTTP_MAX_KEEPALIVE_CONNECTIONS.
+            keepalive_expiry (float, optional): Seconds an idle connection is kept open. Defaults to HTTP_KEEPALIVE_EXPIRY.
+            timeout (float, optional): Request timeout in seconds. Defaults to HTTP_TIMEOUT.
+            http2 (bool, optional): Whether to use HTTP/2 when the server offers it. Defaults to HTTP2_ENABLED.
+        """
+        self.base_url = base_url
+        self.headers = headers or {}
+        self.limits = httpx.Limits(
+            max_connections=max_connections or HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive_connections or HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=keepalive_expiry or HTTP_KEEPALIVE_EXPIRY
+        )
+        self.timeout = timeout or HTTP_TIMEOUT
+        self.http2 = HTTP2_ENABLED if http2 is None else http2
+        
+        if self.http2 and not _http2_available():
+            logger.warning("HTTP/2 requested but the h2 package is not installed, falling back to HTTP/1.1")
+            self.http2 = False
+        
+        self._client = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Get the underlying httpx client, creating it on first use.
+        
+        Returns:
+            httpx.AsyncClient: The pooled httpx client.
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2
+            )
+        return self._client
+    
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """
+        Send a request using a pooled connection.
+        
+        Args:
+            method (str): HTTP method.
+            url (str): URL, relative to the base URL.
+            **kwargs: Additional arguments passed to httpx (params, json, headers, ...).
+        
+        Returns:
+            httpx.Response: The response.
+        """
+        return await self.client.request(method, url, **kwargs)
+    
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        """
+        Send a GET request using a pooled connection.
+        
+        Args:
+            url (str): URL, relative to the base URL.
+            **kwargs: Additional arguments passed to httpx (params, headers, ...).
+        
+        Returns:
+            httpx.Response: The response.
+        """
+        return await self.request("GET", url, **kwargs)
+    
+    async def aclose(self):
+        """
+        Close the client and all pooled connections.
+        """
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+    
+    async def __aenter__(self) -> "AsyncHTTPClient":
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Dict, Any, Tuple, Optional, Mapping
+
+logger = logging.getLogger("rate_limiter")
+
+# Default quotas as (requests, period in seconds) per (provider, endpoint).
+# They can be overridden with RATE_LIMITS to match the quota of your API keys.
+DEFAULT_RATE_LIMITS = {
+    ("twitter", "trends/place"): (75, 900),
+    ("facebook", "graph"): (4800, 3600),
+    ("tiktok", "hashtag/trending"): (600, 60),
+    ("tiktok", "video/list"): (600, 60),
+    ("googletrends", "api"): (60, 60)
+}
+
+# Quota used for endpoints without a configured limit
+DEFAULT_LIMIT = (60, 60)
+
+# Fraction of the remaining quota kept in reserve when pacing from response headers
+RATE_LIMIT_SAFETY_MARGIN = float(os.getenv("RATE_LIMIT_SAFETY_MARGIN", "0.05"))
+
+def parse_rate_limits(value: str) -> Dict[Tuple[str, str], Tuple[int, float]]:
+    """
+    Parse rate limits from a string like "twitter:trends/place=75/900,facebook:graph=200/3600".
+    
+    Args:
+        value (str): Comma-separated list of provider:endpoint=requests/seconds entries.
+    
+    Returns:
+        Dict[Tuple[str, str], Tuple[int, float]]: Rate limits per (provider, endpoint).
+    """
+    limits = {}
+    
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        
+        key, quota = entry.split("=")
+        provider, endpoint = key.split(":", 1)
+        requests, period = quota.split("/")
+        limits[(provider.strip().lower(), endpoint.strip())] = (int(requests), float(period))
+    
+    return limits
+
+class TokenBucket:
+    """
+    Token bucket allowing a number of requests per period.
+    
+    The bucket refills continuously, so requests are paced evenly instead of being
+    sent in bursts at the start of each period.
+    """
+    
+    def __init__(self, limit: int, period: float):
+        """
+        Initialize the token bucket.
+        
+        Args:
+            limit (int): Number of requests allowed per period.
+            period (float): Length of the period in seconds.
+        """
+        self.limit = limit
+        self.period = period
+        self.tokens = float(limit)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.acquired = 0
+        self.waited = 0.0
+    
+    @property
+    def rate(self) -> float:
+        """
+        Number of tokens added per second.
+        """
+        return self.limit / self.period
+    
+    def _refill(self, now: float):
+        """
+        Add the tokens accumulated since the last update.
+        
+        Args:
+            now (float): Current monotonic time.
+        """
+        self.tokens = min(float(self.limit), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    async def acquire(self, tokens: int = 1):
+        """
+        Wait until the requested number of tokens is available and take them.
+        
+        Args:
+            tokens (int, optional): Number of tokens to take. Defaults to 1.
+        """
+        tokens = min(tokens, self.limit)
+        
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+            
+            if now < self.paused_until:
+                wait = self.paused_until - now
+            elif self.tokens >= tokens:
+                self.tokens -= tokens
+                self.acquired += tokens
+                return
+            else:
+                wait = (tokens - self.tokens) / self.rate
+            
+            self.waited += wait
+            await asyncio.sleep(wait)
+    
+    def pause(self, seconds: float):
+        """
+        Stop handing out tokens for a number of seconds.
+        
+        Args:
+            seconds (float): Number of seconds to pause.
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+    
+    def update(self, remaining: Optional[int] = None, limit: Optional[int] = None, reset_in: Optional[float] = None):
+        """
+        Adjust the bucket to the quota reported by the API.
+        
+        Args:
+            remaining (int, optional): Number of requests left in the current window.
+            limit (int, optional): Number of requests allowed per window.
+            reset_in (float, optional): Seconds until the window resets.
+        """
+        self._refill(time.monotonic())
+        
+        if limit:
+            self.limit = limit
+        
+        if remaining is None:
+            return
+        
+        # Keep a small reserve so we stay just under the limit
+        allowed = remaining - max(1, int(self.limit * RATE_LIMIT_SAFETY_MARGIN))
+        
+        # Never hand out more tokens than the API has left
+        self.tokens = min(self.tokens, float(max(allowed, 0)))
+        
+        if allowed <= 0 and reset_in:
+            # The window is used up, wait for it to reset
+            self.pause(reset_in)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the current state of the bucket.
+        
+        Returns:
+            Dict[str, Any]: Limit, available tokens and totals.
+        """
+        self._refill(time.monotonic())
+        
+        return {
+            "limit": self.limit,
+            "period": self.period,
+            "tokens": round(self.tokens, 2),
+            "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 2),
+            "acquired": self.acquired,
+            "waited": round(self.waited, 2)
+        }
+
+class RateLimiter:
+    """
+    Central rate limiter with a token bucket per provider and endpoint.
+    
+    Collectors acquire permits before each API call and report the quota headers of
+    the responses back, so requests are paced to stay just under each API's limit.
+    """
+    
+    def __init__(self, limits: Optional[Dict[Tuple[str, str], Tuple[int, float]]] = None):
+        """
+        Initialize the rate limiter.
+        
+        Args:
+            limits (Dict[Tuple[str, str], Tuple[int, float]], optional): Quotas as (requests, seconds)
+                per (provider, endpoint). Defaults to DEFAULT_RATE_LIMITS.
+        """
+        self.limits = dict(DEFAULT_RATE_LIMITS if limits is None else limits)
+        self.buckets: Dict[Tuple[str, str], TokenBucket] = {}
+    
+    def bucket(self, provider: str, endpoint: str) -> TokenBucket:
+        """
+        Get the token bucket for a provider and endpoint, creating it on first use.
+        
+        Args:
+            provider (str): Name of the provider, e.g. "twitter".
+            endpoint (str): Name of the endpoint, e.g. "trends/place".
+        
+        Returns:
+            TokenBucket: The token bucket.
+        """
+        key = (provider.lower(), endpoint)
+        
+        if key not in self.buckets:
+            limit, period = self.limits.get(key, DEFAULT_LIMIT)
+            self.buckets[key] = TokenBucket(limit, period)
+        
+        return self.buckets[key]
+    
+    async def acquire(self, provider: str, endpoint: str, tokens: int = 1):
+        """
+        Wait for permission to send requests to an endpoint.
+        
+        Args:
+            provider (str): Name of the provider.
+            endpoint (str): Name of the endpoint.
+            tokens (int, optional): Number of requests about to be sent. Defaults to 1.
+        """
+        await self.bucket(provider, endpoint).acquire(tokens)
+    
+    def update_from_headers(self, provider: str, endpoint: str, headers: Mapping[str, str]):
+        """
+        Update the pacing of an endpoint from the quota headers of a response.
+        
+        Understands the x-rate-limit-* headers (Twitter), x-ratelimit-* headers,
+        Retry-After and Facebook's x-app-usage header.
+        
+        Args:
+            provider (str): Name of the provider.
+            endpoint (str): Name of the endpoint.
+            headers (Mapping[str, str]): Response headers.
+        """
+        headers = {key.lower(): value for key, value in headers.items()}
+        bucket = self.bucket(provider, endpoint)
+        
+        try:
+            remaining = headers.get("x-rate-limit-remaining", headers.get("x-ratelimit-remaining"))
+            limit = headers.get("x-rate-limit-limit", headers.get("x-ratelimit-limit"))
+            reset = headers.get("x-rate-limit-reset", headers.get("x-ratelimit-reset"))
+            
+            reset_in = None
+            if reset is not None:
+                reset = float(reset)
+                # The reset is either an epoch timestamp or a number of seconds
+                reset_in = max(0.0, reset - time.time()) if reset > 1e9 else reset
+            
+            if remaining is not None:
+                bucket.update(int(remaining), int(limit) if limit else None, reset_in)
+            
+            if "retry-after" in headers:
+                bucket.pause(float(headers["retry-after"]))
+            
+            if "x-app-usage" in headers:
+                # Facebook reports the used share of the quota as percentages
+                usage = json.loads(headers["x-app-usage"])
+                used = max(usage.values()) if usage else 0
+                bucket.update(int(bucket.limit * (100 - used) / 100))
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Could not parse rate limit headers for {provider}:{endpoint}: {e}")
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the state of all token buckets.
+        
+        Returns:
+            Dict[str, Dict[str, Any]]: State per "provider:endpoint".
+        """
+        return {f"{provider}:{endpoint}": bucket.stats() for (provider, endpoint), bucket in self.buckets.items()}
+
+# Shared rate limiter used by all collectors
+rate_limiter = RateLimiter({**DEFAULT_RATE_LIMITS, **parse_rate_limits(os.getenv("RATE_LIMITS", ""))})
@@ -0,0 +1,201 @@
+import os
+import time
+import random
+import logging
+from typing import Dict, Any
+
+logger = logging.getLogger("resilience")
+
+# Retry settings
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "4"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "30"))
+
+# Circuit breaker settings
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "60"))
+
+class TransientError(Exception):
+    """
+    Error that is expected to go away when the request is retried, e.g. HTTP 429 or 503.
+    """
+    pass
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a provider whose circuit breaker is open.
+    """
+    pass
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter.
+    """
+    
+    def __init__(self, max_attempts: int = None, base_delay: float = None, max_delay: float = None):
+        """
+        Initialize the retry policy.
+        
+        Args:
+            max_attempts (int, optional): Maximum number of attempts, including the first one.
+                Defaults to RETRY_MAX_ATTEMPTS.
+            base_delay (float, optional): Delay before the first retry in seconds. Defaults to RETRY_BASE_DELAY.
+            max_delay (float, optional): Maximum delay between attempts in seconds. Defaults to RETRY_MAX_DELAY.
+        """
+        self.max_attempts = max_attempts or RETRY_MAX_ATTEMPTS
+        self.base_delay = base_delay or RETRY_BASE_DELAY
+        self.max_delay = max_delay or RETRY_MAX_DELAY
+    
+    def delay(self, attempt: int) -> float:
+        """
+        Get the delay before the next attempt.
+        
+        Args:
+            attempt (int): Number of attempts made so far.
+        
+        Returns:
+            float: Delay in seconds, chosen at random up to the exponential backoff.
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+class CircuitBreaker:
+    """
+    Circuit breaker for a single provider.
+    
+    After a number of consecutive failures the circuit opens and calls fail fast
+    until the reset timeout has passed. Then a single trial call is let through:
+    if it succeeds the circuit closes again, otherwise it opens for another period.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, name: str, failure_threshold: int = None, reset_timeout: float = None):
+        """
+        Initialize the circuit breaker.
+        
+        Args:
+            name (str): Name of the provider.
+            failure_threshold (int, optional): Consecutive failures before the circuit opens.
+                Defaults to CIRCUIT_FAILURE_THRESHOLD.
+            reset_timeout (float, optional): Seconds the circuit stays open. Defaults to CIRCUIT_RESET_TIMEOUT.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold or CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or CIRCUIT_RESET_TIMEOUT
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        
+        # Counters for monitoring
+        self.calls = 0
+        self.retries = 0
+        self.total_failures = 0
+        self.short_circuited = 0
+        self.times_opened = 0
+    
+    def allow(self) -> bool:
+        """
+        Check if a call may be made.
+        
+        Returns:
+            bool: True if the call may be made, False if it should fail fast.
+        """
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self.trial_in_flight = False
+        
+        if self.state == self.CLOSED:
+            return True
+        
+        if self.state == self.HALF_OPEN and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        
+        self.short_circuited += 1
+        return False
+    
+    def release_trial(self):
+        """
+        End a trial call that neither succeeded nor failed, so the next call is let through as the trial.
+        
+        Used when the trial raised an error that says nothing about the provider's
+        health, or was cancelled, e.g. by the collector timeout.
+        """
+        if self.state == self.HALF_OPEN:
+            self.trial_in_flight = False
+    
+    def record_success(self):
+        """
+        Record a successful call.
+        """
+        self.calls += 1
+        self.failures = 0
+        
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit breaker for {self.name} closed")
+        
+        self.state = self.CLOSED
+        self.trial_in_flight = False
+    
+    def record_failure(self):
+        """
+        Record a failed call.
+        """
+        self.calls += 1
+        self.failures += 1
+        self.total_failures += 1
+        
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+                logger.warning(f"Circuit breaker for {self.name} opened after {self.failures} failures")
+            
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the state and counters of the circuit breaker.
+        
+        Returns:
+            Dict[str, Any]: State and counters.
+        """
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.total_failures,
+            "short_circuited": self.short_circuited,
+            "times_opened": self.times_opened
+        }
+
+# Circuit breakers per provider
+circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+def get_circuit_breaker(provider: str) -> CircuitBreaker:
+    """
+    Get the circuit breaker for a provider, creating it on first use.
+    
+    Args:
+        provider (str): Name of the provider.
+    
+    Returns:
+        CircuitBreaker: The circuit breaker.
+    """
+    if provider not in circuit_breakers:
+        circuit_breakers[provider] = CircuitBreaker(provider)
+    return circuit_breakers[provider]
+
+def circuit_breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Get the state and counters of all circuit breakers.
+    
+    Returns:
+        Dict[str, Dict[str, Any]]: State and counters per provider.
+    """
+    return {provider: breaker.stats() for provider, breaker in circuit_breakers.items()}